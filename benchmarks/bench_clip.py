@@ -0,0 +1,83 @@
+"""Benchmark time-range clip downloads against full downloads of an HLS stream
+
+Downloads a synthetic HLS video from a throttled local media server once
+in full and once per clip setting, and reports the wall time, the bytes
+fetched and the bytes the clips saved compared with the full download.
+Clips of fragmented formats fetch only the segments overlapping their
+range, so no ffmpeg is needed.
+
+Usage:
+    python benchmarks/bench_clip.py [--segments 60] [--rate 4000000] [--clips "20-30" "20-30,120-130"]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp_download import download_video  # noqa: E402
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+def run_download(url: str, time_ranges, cache_dir: str) -> dict:
+    params = {
+        'quality': '360p',
+        'time_ranges': time_ranges,
+        'cache_dir': cache_dir,
+        'metadata_cache': False,
+        'download_archive': False,
+        'resume_jobs': False,
+        'metrics': False,
+    }
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            result = download_video(url, params, output_dir, BenchmarkContext())
+        seconds = time.perf_counter() - start
+        files = sorted(path.name for path in Path(output_dir).iterdir())
+    clips = result['info'].get('clips')
+    return {
+        'seconds': round(seconds, 3),
+        'files': files,
+        'downloaded_bytes': clips['downloaded_bytes'] if clips else result['info']['download_stats']['downloaded_bytes'],
+        'bytes_saved': clips['bytes_saved'] if clips else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=60, help='4-second segments of the video')
+    parser.add_argument('--segment-size', type=int, default=256 * 1024)
+    parser.add_argument('--rate', type=float, default=4 * 1024 * 1024, help='Per-connection bandwidth, in bytes/s')
+    parser.add_argument('--latency', type=float, default=0.02, help='Delay before each response, in seconds')
+    parser.add_argument('--clips', nargs='+', default=['20-30', '20-30,120-130'])
+    args = parser.parse_args()
+
+    config = MediaServerConfig(segment_count=args.segments, segment_size=args.segment_size, rate=args.rate,
+                               latency=args.latency, heights=(360,))
+    report = {'segments': args.segments, 'segment_size': args.segment_size, 'rate': args.rate}
+    with MediaServer(config) as server, tempfile.TemporaryDirectory() as cache_dir:
+        url = f'{server.base_url}/watch/hls'
+        report['full'] = run_download(url, None, cache_dir)
+        report['clips'] = {clips: run_download(url, clips, cache_dir) for clips in args.clips}
+    for clips, result in report['clips'].items():
+        result['speedup'] = round(report['full']['seconds'] / result['seconds'], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
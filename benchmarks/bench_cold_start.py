@@ -0,0 +1,135 @@
+"""Measure the cold start of the task and enforce an import-time budget
+
+Every measurement runs in a fresh interpreter, as oocana starts one per
+invocation:
+
+* import: wall time of ``import yt_dlp_download``, the cumulative time
+  reported by ``python -X importtime``, and whether yt-dlp got loaded.
+* cached_info: a whole info-only run served from the metadata cache.
+* extraction: an info-only run that extracts (metadata cache off) from the
+  local media server, once with an empty extractor index and once warm.
+
+With ``--baseline REV`` the same measurements run against the task as of a
+git revision, to show the difference. The script exits with status 1 when
+the import exceeds ``--budget-ms`` or loads yt-dlp.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--baseline HEAD~1] [--runs 5] [--budget-ms 60]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SCRIPT = '''
+import sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import yt_dlp_download
+print(time.perf_counter() - start, 'yt_dlp' in sys.modules)
+'''
+
+RUN_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from yt_dlp_download import download_video
+
+class Context:
+    def report_progress(self, percent):
+        pass
+
+url, cache_dir, metadata_cache = sys.argv[2], sys.argv[3], sys.argv[4] == '1'
+params = {'info_only': True, 'cache_dir': cache_dir, 'metadata_cache': metadata_cache}
+download_video(url, params, cache_dir, Context())
+print(time.perf_counter() - start)
+'''
+
+
+def run_python(args) -> str:
+    result = subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def measure_import(tasks_dir: str, runs: int) -> dict:
+    seconds = []
+    yt_dlp_loaded = False
+    for _ in range(runs):
+        elapsed, loaded = run_python(['-c', IMPORT_SCRIPT, tasks_dir]).split()
+        seconds.append(float(elapsed))
+        yt_dlp_loaded = yt_dlp_loaded or loaded == 'True'
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import sys; sys.path.insert(0, {tasks_dir!r}); import yt_dlp_download'],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative = re.search(r'\|\s*(\d+)\s*\|\s*yt_dlp_download\s*$', result.stderr, re.M)
+    return {
+        'median_ms': round(statistics.median(seconds) * 1000, 1),
+        'importtime_cumulative_ms': round(int(cumulative.group(1)) / 1000, 1) if cumulative else None,
+        'yt_dlp_loaded': yt_dlp_loaded,
+    }
+
+
+def measure_run(tasks_dir: str, url: str, cache_dir: str, metadata_cache: bool) -> float:
+    output = run_python(['-c', RUN_SCRIPT, tasks_dir, url, cache_dir, '1' if metadata_cache else '0'])
+    return round(float(output) * 1000, 1)
+
+
+def measure_tree(tasks_dir: str, url: str, runs: int) -> dict:
+    report = {'import': measure_import(tasks_dir, runs)}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        measure_run(tasks_dir, url, cache_dir, True)
+        report['cached_info_ms'] = statistics.median(measure_run(tasks_dir, url, cache_dir, True) for _ in range(runs))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        report['extraction_cold_index_ms'] = measure_run(tasks_dir, url, cache_dir, False)
+        report['extraction_warm_index_ms'] = statistics.median(measure_run(tasks_dir, url, cache_dir, False) for _ in range(runs))
+    return report
+
+
+def export_revision(revision: str, target: str) -> str:
+    """Extract the task package of a git revision into a directory"""
+    archive = subprocess.run(['git', '-C', str(REPO_ROOT), 'archive', revision, 'tasks'], capture_output=True, check=True)
+    subprocess.run(['tar', '-x', '-C', target], input=archive.stdout, check=True)
+    return os.path.join(target, 'tasks')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=60.0, help='Largest acceptable median import time')
+    parser.add_argument('--baseline', help='Git revision to compare against, e.g. HEAD~1')
+    args = parser.parse_args()
+
+    report = {'budget_ms': args.budget_ms}
+    with MediaServer(MediaServerConfig(file_size=1024 * 1024)) as server, tempfile.TemporaryDirectory() as root:
+        url = f'{server.base_url}/video.mp4'
+        start = time.perf_counter()
+        report['current'] = measure_tree(str(REPO_ROOT / 'tasks'), url, args.runs)
+        if args.baseline:
+            report['baseline'] = measure_tree(export_revision(args.baseline, root), url, args.runs)
+            report['baseline']['revision'] = args.baseline
+        report['benchmark_seconds'] = round(time.perf_counter() - start, 1)
+
+    current = report['current']['import']
+    report['within_budget'] = current['median_ms'] <= args.budget_ms and not current['yt_dlp_loaded']
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['within_budget'] else 1)
+
+
+if __name__ == '__main__':
+    main()
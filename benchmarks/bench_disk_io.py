@@ -0,0 +1,153 @@
+"""Benchmark staged downloads against direct writes to a slow output directory
+
+Downloads a synthetic progressive file (ranged, over several connections)
+and an HLS stream (fragments) from a local media server into a slow target
+directory, once writing partial files there directly and once staging them
+on local scratch with a single move at the end, and reports the wall time
+and the I/O time staging saved. A first direct download, with nothing
+learned about the host, shows the default read buffer size; it also lets
+both modes start from the buffer size learned for the host. Each mode then
+runs --repeat times, and the median is reported.
+
+Without --target-dir the benchmark makes a slow directory itself: an ext4
+image on a loop device, mounted with the sync option so every write waits
+for the device, whose writes are throttled (cgroup v1 blkio) to a number of
+operations and bytes per second, much like a network mount. That needs
+root on Linux; elsewhere pass a slow directory (e.g. an NFS or SMB mount)
+with --target-dir.
+
+Usage:
+    python benchmarks/bench_disk_io.py [--target-dir PATH | --write-iops 100 --write-mbps 50] [--size-mb 32] [--segments 80] [--sources progressive hls] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp_download import download_video  # noqa: E402
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+BLKIO_DIR = '/sys/fs/cgroup/blkio'
+
+
+def set_write_throttle(device: str, iops: int, bps: int) -> None:
+    """Throttle writes to a block device; zero removes the limit"""
+    rdev = os.stat(device).st_rdev
+    for name, limit in (('write_iops_device', iops), ('write_bps_device', bps)):
+        with open(os.path.join(BLKIO_DIR, f'blkio.throttle.{name}'), 'w') as f:
+            f.write(f'{os.major(rdev)}:{os.minor(rdev)} {limit}')
+
+
+@contextlib.contextmanager
+def slow_mount(size_mb: int, write_iops: int, write_bps: int):
+    """A fresh ext4 file system with synchronous, throttled writes"""
+    work_dir = tempfile.mkdtemp()
+    image, mount_point = os.path.join(work_dir, 'target.img'), os.path.join(work_dir, 'target')
+    os.makedirs(mount_point)
+    try:
+        with open(image, 'wb') as f:
+            f.truncate(size_mb * 1024 * 1024)
+        subprocess.run(['mkfs.ext4', '-q', '-F', image], check=True, capture_output=True)
+        device = subprocess.run(['losetup', '--find', '--show', image], check=True, capture_output=True, text=True).stdout.strip()
+        try:
+            subprocess.run(['mount', '-o', 'sync', device, mount_point], check=True, capture_output=True)
+            try:
+                set_write_throttle(device, write_iops, write_bps)
+                yield mount_point
+            finally:
+                set_write_throttle(device, 0, 0)
+                subprocess.run(['umount', mount_point], check=False)
+        finally:
+            subprocess.run(['losetup', '--detach', device], check=False)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_download(url: str, target_dir: str, cache_dir: str, io_mode: str) -> dict:
+    params = {
+        'quality': '360p',
+        'io_mode': io_mode,
+        'cache_dir': cache_dir,
+        'metadata_cache': False,
+        'download_archive': False,
+        'resume_jobs': False,
+        'metrics': False,
+    }
+    output_dir = tempfile.mkdtemp(dir=target_dir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            result = download_video(url, params, output_dir, BenchmarkContext())
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(result['video_path'])
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    disk_io = result['info']['disk_io']
+    return {
+        'seconds': round(seconds, 3),
+        'bytes': size,
+        'move_seconds': disk_io['move_seconds'],
+        'move_method': disk_io['move_method'],
+        'buffer_size': disk_io['buffer_size'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target-dir', help='Slow directory to download into (default: a throttled ext4 image)')
+    parser.add_argument('--write-iops', type=int, default=100, help='Write operations per second of the default target')
+    parser.add_argument('--write-mbps', type=float, default=50, help='Write MB/s of the default target')
+    parser.add_argument('--size-mb', type=float, default=32, help='Size of the progressive file')
+    parser.add_argument('--segments', type=int, default=80, help='Segments of the HLS stream, 256 KiB each')
+    parser.add_argument('--sources', nargs='+', default=['progressive', 'hls'], choices=['progressive', 'hls'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    config = MediaServerConfig(file_size=int(args.size_mb * 1024 * 1024), segment_count=args.segments, heights=(360,))
+    with contextlib.ExitStack() as stack:
+        target_dir = args.target_dir or stack.enter_context(
+            slow_mount(int(args.size_mb) * 4 + 64, args.write_iops, int(args.write_mbps * 1024 * 1024)))
+        server = stack.enter_context(MediaServer(config))
+        cache_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        report = {'target_dir': target_dir, 'scratch_dir': os.path.join(cache_dir, 'scratch')}
+        for source in args.sources:
+            url = f'{server.base_url}/watch/{source}'
+            cold = run_download(url, target_dir, cache_dir, 'direct')
+            runs = {'direct': [], 'staged': []}
+            for _ in range(args.repeat):
+                for mode, results in runs.items():
+                    results.append(run_download(url, target_dir, cache_dir, mode))
+            direct, staged = (min(results, key=lambda result: abs(result['seconds'] - statistics.median(r['seconds'] for r in results)))
+                              for results in runs.values())
+            report[source] = {
+                'direct_default_buffer': cold,
+                'direct': direct,
+                'staged': staged,
+                'io_seconds_saved': round(direct['seconds'] - staged['seconds'], 3),
+                'speedup': round(direct['seconds'] / staged['seconds'], 2),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
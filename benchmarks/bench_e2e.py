@@ -0,0 +1,273 @@
+"""End-to-end benchmark of the task across a matrix of settings, fully offline
+
+Starts the local media server and runs the task's ``main`` in a fresh
+interpreter per job, as oocana does, against the synthetic video site.
+Jobs share a cache directory but not the metadata cache, download archive
+or job journal, so every job extracts and downloads. The
+``synthetic`` test extractor in ``benchmarks/yt_dlp_plugins`` is loaded as
+a yt-dlp plugin. Every cell of the matrix of source (progressive, HLS,
+DASH), ``quality``, ``codec_preference``, ``audio_only`` and
+``subtitle_langs`` is run ``--runs`` times. Each job records:
+
+* the time per phase: importing the task, importing yt-dlp, extraction,
+  download, post-processing, and the rest of ``main``;
+* download throughput and the bytes written;
+* peak RSS and CPU time of the job's process.
+
+The report is JSON, with the environment (git revision, yt-dlp and Python
+versions, whether ffmpeg is available) so runs can be compared over time.
+With ``--compare`` the median wall time of each cell is compared against an
+earlier report, and the script exits with status 1 when a cell regressed
+beyond ``--threshold``. Cells that need ffmpeg (merging DASH streams,
+extracting audio out of HLS) fail when it is not installed; that is
+recorded per cell rather than aborting the run.
+
+Usage:
+    python benchmarks/bench_e2e.py [--runs 3] [--sources progressive,hls] [--output e2e.json] [--compare old.json]
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import SOURCES, MediaServer, MediaServerConfig  # noqa: E402
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCHMARKS_DIR.parent
+TASKS_DIR = REPO_ROOT / 'tasks'
+
+SCHEMA_VERSION = 1
+
+JOB_SCRIPT = '''
+import json, os, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from yt_dlp_download import main
+
+class Context:
+    def __init__(self, session_dir):
+        self.session_dir = session_dir
+
+    def report_progress(self, percent):
+        pass
+
+params, result_path = json.loads(sys.argv[2]), sys.argv[3]
+imported = time.perf_counter()
+# The task defers this import into main; done here, it is measured as its own phase
+import yt_dlp
+yt_dlp_imported = time.perf_counter()
+try:
+    output = main(params, Context(params['output_dir']))
+    path = output['video_path']
+    result = {'status': 'ok', 'info': output['info'], 'output_bytes': os.path.getsize(path) if path else 0}
+except Exception as e:
+    result = {'status': 'error', 'error': str(e)}
+finished = time.perf_counter()
+
+usage = resource.getrusage(resource.RUSAGE_SELF)
+result.update(
+    import_seconds=imported - start,
+    yt_dlp_import_seconds=yt_dlp_imported - imported,
+    main_seconds=finished - yt_dlp_imported,
+    cpu_seconds=usage.ru_utime + usage.ru_stime,
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    max_rss_kb=usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss,
+    yt_dlp_version=yt_dlp.version.__version__,
+)
+with open(result_path, 'w') as f:
+    json.dump(result, f, default=str)
+'''
+
+
+def get_cells(args) -> list:
+    """Expand the matrix; audio-only cells ignore quality and codec"""
+    cells = []
+    for source, audio_only, subtitles in itertools.product(args.sources, args.audio_only, args.subtitles):
+        video_settings = [(None, None)] if audio_only else itertools.product(args.quality, args.codec)
+        for quality, codec in video_settings:
+            params = {'quality': quality or 'best', 'audio_only': audio_only}
+            if codec != 'any' and codec:
+                params['codec_preference'] = codec
+            if subtitles != 'none':
+                params['subtitle_langs'] = subtitles
+            key = '|'.join([source, 'audio' if audio_only else params['quality'], params.get('codec_preference', 'any'), subtitles])
+            cells.append({'key': key, 'source': source, 'params': params})
+    return cells
+
+
+def get_phases(result: dict) -> dict:
+    """Split a job's wall time into phases from the timings the task reports"""
+    info = result.get('info') or {}
+    extraction = info.get('extraction_time') or 0.0
+    download = (info.get('download_stats') or {}).get('elapsed') or 0.0
+    postprocess = ((info.get('postprocessing') or {}).get('seconds') or {}).get('total') or 0.0
+    return {
+        'startup': result['import_seconds'],
+        'yt_dlp_import': result['yt_dlp_import_seconds'],
+        'extraction': extraction,
+        'download': download,
+        'postprocess': postprocess,
+        'other': max(0.0, result['main_seconds'] - extraction - download - postprocess),
+    }
+
+
+def run_job(url: str, params: dict, cache_dir: str) -> dict:
+    with tempfile.TemporaryDirectory() as root:
+        job_params = dict(params, url=url, output_dir=os.path.join(root, 'out'), cache_dir=cache_dir,
+                          metadata_cache=False, download_archive=False, resume_jobs=False)
+        os.makedirs(job_params['output_dir'])
+        result_path = os.path.join(root, 'result.json')
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, '-c', JOB_SCRIPT, str(TASKS_DIR), json.dumps(job_params), result_path],
+                                 capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        try:
+            with open(result_path) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return {'status': 'error', 'error': (process.stderr or process.stdout).strip()[-500:], 'wall_ms': round(wall * 1000, 1)}
+
+    run = {'status': result['status'], 'wall_ms': round(wall * 1000, 1)}
+    if result['status'] != 'ok':
+        run['error'] = result['error']
+    downloaded = ((result.get('info') or {}).get('download_stats') or {}).get('downloaded_bytes') or 0
+    phases = get_phases(result)
+    run.update(
+        phases_ms={name: round(seconds * 1000, 1) for name, seconds in phases.items()},
+        downloaded_bytes=downloaded,
+        output_bytes=result.get('output_bytes', 0),
+        throughput_mib_s=round(downloaded / phases['download'] / 2 ** 20, 2) if phases['download'] > 0 else None,
+        cpu_seconds=round(result['cpu_seconds'], 3),
+        max_rss_kb=result['max_rss_kb'],
+        yt_dlp_version=result['yt_dlp_version'],
+    )
+    return run
+
+
+def summarize(runs: list) -> dict:
+    """Median of every numeric measurement over the successful runs"""
+    ok = [run for run in runs if run['status'] == 'ok']
+    if not ok:
+        return {}
+    median = lambda values: round(statistics.median(values), 3)  # noqa: E731
+    summary = {key: median([run[key] for run in ok]) for key in ('wall_ms', 'cpu_seconds', 'max_rss_kb', 'downloaded_bytes')}
+    throughputs = [run['throughput_mib_s'] for run in ok if run['throughput_mib_s'] is not None]
+    summary['throughput_mib_s'] = median(throughputs) if throughputs else None
+    summary['phases_ms'] = {phase: median([run['phases_ms'][phase] for run in ok]) for phase in ok[0]['phases_ms']}
+    return summary
+
+
+def get_environment() -> dict:
+    def git(*args):
+        result = subprocess.run(['git', '-C', str(REPO_ROOT), *args], capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    return {
+        'git_commit': git('rev-parse', 'HEAD'),
+        'git_dirty': bool(git('status', '--porcelain', '--', 'tasks')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ffmpeg': shutil.which('ffmpeg') is not None,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> dict:
+    """Compare the median wall time of the cells both reports ran successfully"""
+    previous = {cell['key']: cell for cell in baseline.get('cells', [])}
+    cells = []
+    for cell in report['cells']:
+        old = previous.get(cell['key'], {}).get('median', {}).get('wall_ms')
+        new = cell['median'].get('wall_ms')
+        if old and new:
+            cells.append({'key': cell['key'], 'baseline_ms': old, 'current_ms': new, 'ratio': round(new / old, 3)})
+    return {
+        'baseline_commit': baseline.get('environment', {}).get('git_commit'),
+        'threshold': threshold,
+        'cells': cells,
+        'regressions': [cell['key'] for cell in cells if cell['ratio'] > threshold],
+    }
+
+
+def split(value: str) -> list:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--sources', type=split, default=list(SOURCES))
+    parser.add_argument('--quality', type=split, default=['best', '720p'])
+    parser.add_argument('--codec', type=split, default=['any', 'h264', 'vp9'], help='codec_preference values; "any" for none')
+    parser.add_argument('--audio-only', type=lambda value: [item == 'yes' for item in split(value)], default=[False, True], help='e.g. "no,yes"')
+    parser.add_argument('--subtitles', type=split, default=['none', 'en'], help='subtitle_langs values; "none" for none')
+    parser.add_argument('--file-size', type=int, default=4 * 1024 * 1024, help='Size of the largest progressive format')
+    parser.add_argument('--segment-count', type=int, default=20)
+    parser.add_argument('--segment-size', type=int, default=128 * 1024, help='HLS/DASH segment size of the largest height')
+    parser.add_argument('--latency', type=float, default=0.0, help='Delay before each response, in seconds')
+    parser.add_argument('--rate', type=float, default=None, help='Per-connection bandwidth, in bytes/s')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of media requests failed with HTTP 429')
+    parser.add_argument('--output', help='Write the JSON report to this file as well')
+    parser.add_argument('--compare', help='Earlier JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Wall-time ratio counted as a regression')
+    args = parser.parse_args()
+
+    # Lets the job processes load the synthetic extractor as a yt-dlp plugin
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [str(BENCHMARKS_DIR), os.environ.get('PYTHONPATH')]))
+
+    config = MediaServerConfig(file_size=args.file_size, segment_count=args.segment_count, segment_size=args.segment_size,
+                               latency=args.latency, rate=args.rate, error_rate=args.error_rate)
+    report = {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'environment': get_environment(),
+        'server': {'file_size': args.file_size, 'segment_count': args.segment_count, 'segment_size': args.segment_size,
+                   'latency': args.latency, 'rate': args.rate, 'error_rate': args.error_rate},
+        'runs': args.runs,
+        'cells': [],
+    }
+    start = time.perf_counter()
+    with MediaServer(config) as server, tempfile.TemporaryDirectory() as cache_dir:
+        # Warm the extractor index, so no cell pays for the one-off scan of every extractor
+        run_job(f'{server.base_url}/watch/progressive', {'info_only': True}, cache_dir)
+        for cell in get_cells(args):
+            url = f'{server.base_url}/watch/{cell["source"]}'
+            runs = [run_job(url, cell['params'], cache_dir) for _ in range(args.runs)]
+            errors = sorted({run['error'] for run in runs if run['status'] != 'ok'})
+            cell.update(status='ok' if not errors else 'error', errors=errors, median=summarize(runs), results=runs)
+            report['cells'].append(cell)
+            print(f'{cell["key"]:<32} {cell["status"]:<6} {cell["median"].get("wall_ms", "-")} ms', file=sys.stderr)
+
+    versions = {run.get('yt_dlp_version') for cell in report['cells'] for run in cell['results']} - {None}
+    report['environment']['yt_dlp'] = versions.pop() if len(versions) == 1 else sorted(versions)
+    report['summary'] = {
+        'cells': len(report['cells']),
+        'ok': sum(cell['status'] == 'ok' for cell in report['cells']),
+        'failed': [cell['key'] for cell in report['cells'] if cell['status'] != 'ok'],
+        'benchmark_seconds': round(time.perf_counter() - start, 1),
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(report, json.load(f), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    print(output)
+    sys.exit(1 if report.get('comparison', {}).get('regressions') else 0)
+
+
+if __name__ == '__main__':
+    main()
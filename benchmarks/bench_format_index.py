@@ -0,0 +1,141 @@
+"""Benchmark format analysis and selection on info dicts with many formats
+
+Compares the indexed analysis/selection path against the previous
+implementation, which walked the format list once for the feature summary
+and again (with uncompiled regular expressions) for the selection.
+
+Usage:
+    python benchmarks/bench_format_index.py [--formats 200 1000] [--selections 1 3]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp_download.formatters import FormatIndex  # noqa: E402
+
+VIDEO_CODECS = ('avc1.640028', 'vp09.00.51.08', 'av01.0.12M.08', 'hev1.2.4.L153')
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+
+
+def make_info(format_count: int, seed: int = 0) -> dict:
+    """Build a synthetic info dict with the given number of formats"""
+    rng = random.Random(seed)
+    formats = []
+    for index in range(format_count):
+        if index % 5 == 0:
+            formats.append({
+                'format_id': f'a{index}', 'ext': rng.choice(('m4a', 'webm')), 'vcodec': 'none',
+                'acodec': rng.choice(('mp4a.40.2', 'opus')), 'abr': rng.randint(48, 256),
+            })
+            continue
+        formats.append({
+            'format_id': f'v{index}', 'ext': rng.choice(('mp4', 'webm')), 'height': rng.choice(HEIGHTS),
+            'fps': rng.choice((24, 30, 60)), 'vcodec': rng.choice(VIDEO_CODECS), 'acodec': 'none',
+            'dynamic_range': rng.choice(('SDR', 'SDR', 'HDR10')), 'tbr': rng.uniform(100, 20000),
+        })
+    return {'formats': formats}
+
+
+# (quality, hdr, high_fps, codec_preference) queries; the broad one matches most formats
+QUERIES = {
+    'selective': ('1080p', True, True, 'vp9'),
+    'broad': ('1080p', False, False, None),
+}
+
+
+def legacy_analyze(info: dict):
+    """The previous feature summary pass, kept here as the baseline"""
+    qualities, hdr_available, high_fps_available = set(), False, False
+    for fmt in info['formats']:
+        height = fmt.get('height')
+        if height:
+            if height >= 2160:
+                qualities.add('4K')
+            elif height >= 1440:
+                qualities.add('1440p')
+            elif height >= 1080:
+                qualities.add('1080p')
+            elif height >= 720:
+                qualities.add('720p')
+        if 'HDR' in (fmt.get('dynamic_range') or ''):
+            hdr_available = True
+        if (fmt.get('fps') or 0) >= 50:
+            high_fps_available = True
+    return qualities, hdr_available, high_fps_available
+
+
+def legacy_select(info: dict, quality: str, hdr: bool, high_fps: bool, codec_preference: str):
+    """The previous selection pass, kept here as the baseline"""
+    patterns = {'h265': r'(hevc|h265|x265)', 'av1': r'av01', 'vp9': r'vp9', 'h264': r'(avc|h264|x264)'}
+    suitable = []
+    for fmt in info['formats']:
+        if quality == '1080p' and (fmt.get('height') or 0) < 1080:
+            continue
+        if hdr and 'HDR' not in (fmt.get('dynamic_range') or ''):
+            continue
+        if high_fps and (fmt.get('fps') or 0) < 50:
+            continue
+        if codec_preference and not re.search(patterns[codec_preference], fmt.get('vcodec', ''), re.I):
+            continue
+        suitable.append(fmt)
+    suitable.sort(key=lambda fmt: (fmt.get('height') or 0, fmt.get('tbr') or 0), reverse=True)
+    return suitable[0]['format_id'] if suitable else None
+
+
+def run_legacy(info: dict, query: tuple, selections: int):
+    legacy_analyze(info)
+    for _ in range(selections):
+        legacy_select(info, *query)
+
+
+def run_indexed(info: dict, query: tuple, selections: int):
+    index = FormatIndex(info['formats'])
+    index.summary()
+    for _ in range(selections):
+        index.select(*query)
+
+
+def measure(func, info: dict, query: tuple, selections: int, repeat: int) -> float:
+    """Return the mean time per call in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(info, query, selections)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--formats', type=int, nargs='+', default=[50, 200, 500, 1000])
+    parser.add_argument('--selections', type=int, nargs='+', default=[1, 3],
+                        help='Selections per info dict (one per rendition)')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    results = []
+    for format_count in args.formats:
+        info = make_info(format_count)
+        for query_name, query in QUERIES.items():
+            for selections in args.selections:
+                legacy_ms = measure(run_legacy, info, query, selections, args.repeat)
+                indexed_ms = measure(run_indexed, info, query, selections, args.repeat)
+                results.append({
+                    'formats': format_count,
+                    'query': query_name,
+                    'selections': selections,
+                    'legacy_ms': round(legacy_ms, 4),
+                    'indexed_ms': round(indexed_ms, 4),
+                    'speedup': round(legacy_ms / indexed_ms, 2) if indexed_ms else None,
+                })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark fragment concurrency on a synthetic HLS stream with injected latency
+
+Downloads the same HLS stream from a local media server with fixed fragment
+concurrency levels and with the adaptive controller. The adaptive runs share
+a state directory, so later runs start from what earlier runs learned.
+
+Usage:
+    python benchmarks/bench_fragment_concurrency.py [--latency 0.1] [--runs 3] [--settings 1 4 auto]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp_download import download_video  # noqa: E402
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+def run_download(url: str, setting: str, cache_dir: str) -> dict:
+    params = {
+        'concurrent_fragments': setting,
+        'max_concurrent_fragments': 16,
+        'cache_dir': cache_dir,
+        'metadata_cache': False,
+        'download_archive': False,
+    }
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        result = download_video(url, params, output_dir, BenchmarkContext())
+        elapsed = time.perf_counter() - start
+    info = result['info']
+    return {
+        'seconds': round(elapsed, 3),
+        # Time spent transferring, without extraction and the anti-throttling sleep
+        'download_seconds': info['download_stats'].get('elapsed'),
+        'fragment_concurrency': info.get('fragment_concurrency'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.1, help='Delay before each response, in seconds')
+    parser.add_argument('--rate', type=float, default=4 * 1024 * 1024, help='Per-connection bandwidth, in bytes/s')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--segments', type=int, default=40)
+    parser.add_argument('--segment-size', type=int, default=256 * 1024)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--settings', nargs='+', default=['1', '2', '4', '8', 'auto'])
+    args = parser.parse_args()
+
+    config = MediaServerConfig(
+        segment_count=args.segments, segment_size=args.segment_size,
+        latency=args.latency, rate=args.rate, error_rate=args.error_rate,
+    )
+    results = []
+    with MediaServer(config) as server:
+        url = f'{server.base_url}/hls/index.m3u8'
+        for setting in args.settings:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                runs = [run_download(url, setting, cache_dir) for _ in range(args.runs)]
+            seconds = [run['download_seconds'] for run in runs]
+            results.append({
+                'setting': setting,
+                'download_seconds': seconds,
+                'total_seconds': [run['seconds'] for run in runs],
+                'best_download_seconds': min(seconds),
+                'last_download_seconds': seconds[-1],
+                'concurrency_per_run': [run['fragment_concurrency'].get('initial', run['fragment_concurrency']['settled']) for run in runs],
+                'settled': runs[-1]['fragment_concurrency'].get('settled'),
+            })
+
+    print(json.dumps({
+        'latency': args.latency,
+        'rate': args.rate,
+        'error_rate': args.error_rate,
+        'stream_bytes': args.segments * args.segment_size,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Peak RSS of holding and planning a large playlist of fully extracted entries
+
+Builds a synthetic playlist whose entries look like a YouTube extraction:
+dozens of formats with signed URLs and HTTP headers, HLS formats with
+fragment lists, automatic captions in a hundred languages, a heatmap and
+thumbnails. Each mode runs in a fresh interpreter:
+
+* raw: the previous path. Every entry waits in the batch queue as the
+  sanitized extraction result; a job analyses the raw dict and keeps it and
+  the planned copy alive through its download.
+* compact: entries are compacted when resolved (compact_entry); a job reads
+  an InfoRecord and slims the dicts once planned (slim_info).
+
+``--workers`` jobs are kept in flight at a time, as the batch pool does.
+Planning uses yt-dlp's real format selection, offline.
+
+Usage:
+    python benchmarks/bench_info_memory.py [--entries 1000] [--workers 4]
+"""
+
+import argparse
+import json
+import random
+import string
+import subprocess
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+VIDEO_CODECS = ('avc1.640028', 'vp09.00.51.08', 'av01.0.12M.08')
+CAPTION_EXTS = ('json3', 'srv1', 'srv2', 'srv3', 'ttml', 'vtt')
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choices(string.ascii_letters + string.digits, k=length))
+
+
+def make_entry(index: int, caption_langs: int = 100, fragments: int = 150) -> dict:
+    """Build one synthetic, fully extracted playlist entry
+
+    Strings are generated per entry, as parsing JSON responses would, so
+    nothing is shared between entries by accident.
+    """
+    rng = random.Random(index)
+    video_id = random_text(rng, 11)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-us,en;q=0.5',
+        'Sec-Fetch-Mode': 'navigate',
+    }
+    formats = []
+    for audio in range(4):
+        formats.append({
+            'format_id': f'a{audio}', 'ext': ('m4a', 'webm')[audio % 2], 'vcodec': 'none',
+            'acodec': ('mp4a.40.2', 'opus')[audio % 2], 'abr': 48 + audio * 40, 'protocol': 'https',
+            'url': f'https://cdn.example.com/videoplayback?id={video_id}&sig={random_text(rng, 800)}',
+            'http_headers': dict(headers), 'filesize': rng.randint(10 ** 6, 10 ** 7),
+        })
+    for height in HEIGHTS:
+        for codec in VIDEO_CODECS:
+            formats.append({
+                'format_id': f'{height}{codec[:4]}', 'ext': 'webm' if codec.startswith('vp') else 'mp4',
+                'vcodec': codec, 'acodec': 'none', 'height': height, 'width': height * 16 // 9, 'fps': 30,
+                'dynamic_range': 'SDR', 'tbr': height * 2.5, 'protocol': 'https',
+                'url': f'https://cdn.example.com/videoplayback?id={video_id}&sig={random_text(rng, 800)}',
+                'http_headers': dict(headers), 'filesize': rng.randint(10 ** 6, 10 ** 8),
+            })
+    for height in HEIGHTS[:6]:
+        manifest = f'https://manifest.example.com/{video_id}/{height}/index.m3u8'
+        formats.append({
+            'format_id': f'hls-{height}', 'ext': 'mp4', 'vcodec': 'avc1.4d401f', 'acodec': 'mp4a.40.2',
+            'height': height, 'tbr': height * 3.0, 'protocol': 'm3u8_native', 'url': manifest, 'manifest_url': manifest,
+            'fragments': [{'path': f'seg{n}-{random_text(rng, 40)}.ts', 'duration': 5.0} for n in range(fragments)],
+            'http_headers': dict(headers),
+        })
+    return {
+        '_type': 'video', 'id': video_id, 'title': f'Video {index} {random_text(rng, 40)}',
+        'description': random_text(rng, 2000), 'uploader': 'Uploader', 'duration': 600, 'view_count': index,
+        'upload_date': '20240101', 'webpage_url': f'https://www.example.com/watch?v={video_id}',
+        'extractor': 'example', 'extractor_key': 'Example',
+        'thumbnail': f'https://i.example.com/vi/{video_id}/maxresdefault.jpg',
+        'thumbnails': [{'url': f'https://i.example.com/vi/{video_id}/{n}.jpg', 'id': str(n)} for n in range(40)],
+        'heatmap': [{'start_time': n * 6.0, 'end_time': n * 6.0 + 6, 'value': rng.random()} for n in range(100)],
+        'automatic_captions': {
+            f'l{lang}': [{'ext': ext, 'url': f'https://www.example.com/api/timedtext?v={video_id}&lang=l{lang}&fmt={ext}&sig={random_text(rng, 300)}'}
+                         for ext in CAPTION_EXTS]
+            for lang in range(caption_langs)
+        },
+        'subtitles': {},
+        'formats': formats,
+    }
+
+
+def get_max_rss_kb() -> int:
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+def run_mode(mode: str, entries: int, workers: int) -> dict:
+    """Resolve, analyse and plan every entry; runs in its own interpreter"""
+    from yt_dlp_download.downloaders import TaskYoutubeDL
+    from yt_dlp_download.formatters import InfoRecord, compact_entry, get_format_index, get_optimal_format_for_hd, slim_info
+    from yt_dlp_download.handlers import prepare_video_info
+
+    ydl = TaskYoutubeDL({'quiet': True, 'format': 'bv*+ba/b', 'simulate': True})
+    baseline_kb = get_max_rss_kb()
+    start = time.perf_counter()
+
+    # Resolution: every entry waits in the batch queue
+    queue = deque()
+    for index in range(entries):
+        info = ydl.sanitize_info(make_entry(index))
+        queue.append(compact_entry(info, keep_subtitles=False) if mode == 'compact' else info)
+    queued_kb = get_max_rss_kb()
+
+    # Downloads: jobs keep what they hold through the download, ``workers`` at a time
+    in_flight = deque(maxlen=workers)
+    results = []
+    while queue:
+        info = queue.popleft()
+        if mode == 'compact':
+            record = InfoRecord(info)
+            get_optimal_format_for_hd(record, '1080p')
+            planned = ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=False)
+            held = (slim_info(info, planned), slim_info(planned, planned))
+            results.append(prepare_video_info(record))
+        else:
+            get_format_index(info).summary()
+            get_optimal_format_for_hd(info, '1080p')
+            planned = ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=False)
+            held = (info, planned)
+            results.append(prepare_video_info(info))
+        in_flight.append(held)
+        del info, planned, held
+
+    return {
+        'baseline_kb': baseline_kb,
+        'after_resolve_kb': queued_kb,
+        'peak_kb': get_max_rss_kb(),
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--mode', choices=('raw', 'compact'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.entries, args.workers)))
+        return
+
+    report = {'entries': args.entries, 'workers': args.workers}
+    for mode in ('raw', 'compact'):
+        output = subprocess.run([sys.executable, __file__, '--mode', mode, '--entries', str(args.entries), '--workers', str(args.workers)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['peak_mb'] = round(result['peak_kb'] / 1024, 1)
+        result['entries_mb'] = round((result['after_resolve_kb'] - result['baseline_kb']) / 1024, 1)
+        report[mode] = result
+    report['peak_reduction'] = round(1 - report['compact']['peak_kb'] / report['raw']['peak_kb'], 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
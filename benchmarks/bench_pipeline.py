@@ -0,0 +1,118 @@
+"""Benchmark pipelined transfers and post-processing on a throttled local server
+
+Downloads a batch of progressive videos from the local media server with a
+bandwidth cap per connection. Every download is followed by a synthetic
+post-processor that burns CPU in a child process for ``--cpu`` seconds,
+standing in for an ffmpeg transcode (ffmpeg is not needed). Both modes run
+the batch through ``run_batch`` and TaskYoutubeDL, as the task does:
+
+* serial: a worker downloads, then post-processes, then takes the next job;
+* pipelined: a job hands its transfer slot to the next job while it waits
+  for one of ``--postprocess-workers`` post-processing slots.
+
+The report compares wall time and the network and CPU utilisation recorded
+by PostprocessPipeline.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--videos 8] [--workers 2] [--postprocess-workers 2] [--cpu 1.0]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp.postprocessor.common import PostProcessor  # noqa: E402
+from yt_dlp_download.downloaders import TaskYoutubeDL  # noqa: E402
+from yt_dlp_download.handlers import PostprocessPipeline, get_url_host, run_batch  # noqa: E402
+
+BURN_SCRIPT = 'import sys, time\nend = time.process_time() + float(sys.argv[1])\nwhile time.process_time() < end: pass\n'
+
+
+class SyntheticTranscodePP(PostProcessor):
+    """Burn CPU in a child process, as an ffmpeg transcode would"""
+
+    def __init__(self, downloader, cpu_seconds: float):
+        super().__init__(downloader)
+        self.cpu_seconds = cpu_seconds
+
+    def run(self, info):
+        subprocess.run([sys.executable, '-c', BURN_SCRIPT, str(self.cpu_seconds)], check=True)
+        return [], info
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+def download_item(url, info, reporter, output_dir: str, pipeline: PostprocessPipeline, cpu_seconds: float) -> dict:
+    job = pipeline.job(get_url_host(url))
+    opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        'format': 'b',
+        'outtmpl': f'{output_dir}/%(id)s.%(ext)s',
+        'postprocess_pipeline': job,
+    }
+    try:
+        with TaskYoutubeDL(opts) as ydl:
+            ydl.add_post_processor(SyntheticTranscodePP(ydl, cpu_seconds), when='post_process')
+            job.begin_transfer()
+            ydl.download([url])
+    finally:
+        job.finish()
+    return {'video_path': url, 'info': {}}
+
+
+def run_mode(base_url: str, args, postprocess_workers: int) -> dict:
+    urls = [f'{base_url}/watch/progressive-{n}' for n in range(1, args.videos + 1)]
+    pipeline = PostprocessPipeline(args.workers, postprocess_workers, args.workers)
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        results = run_batch(
+            urls,
+            lambda url: {'url': url, 'info': None},
+            lambda url, info, reporter: download_item(url, info, reporter, output_dir, pipeline, args.cpu),
+            BenchmarkContext(),
+            max_workers=args.workers + postprocess_workers,
+            max_per_host=args.workers + postprocess_workers,
+        )
+        seconds = time.perf_counter() - start
+    errors = [r['error'] for r in results if r['error']]
+    if errors:
+        raise RuntimeError(f'{len(errors)} download(s) failed: {errors[0]}')
+    return dict(pipeline.report(), wall_seconds=round(seconds, 3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2, help='concurrent transfers')
+    parser.add_argument('--postprocess-workers', type=int, default=2)
+    parser.add_argument('--cpu', type=float, default=1.0, help='CPU seconds of post-processing per video')
+    parser.add_argument('--size', type=int, default=4 * 1024 * 1024, help='bytes per video')
+    parser.add_argument('--rate', type=int, default=4 * 1024 * 1024, help='bytes per second per connection')
+    args = parser.parse_args()
+
+    config = MediaServerConfig(file_size=args.size, rate=args.rate, heights=(360,))
+    report = {'videos': args.videos, 'workers': args.workers, 'cpu_seconds': args.cpu, 'size': args.size, 'rate': args.rate}
+    with MediaServer(config) as server:
+        report['serial'] = run_mode(server.base_url, args, 0)
+        report['pipelined'] = run_mode(server.base_url, args, args.postprocess_workers)
+    report['speedup'] = round(report['serial']['wall_seconds'] / report['pipelined']['wall_seconds'], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark multi-connection ranged downloads of a progressive file
+
+Downloads a progressive file from a local media server that throttles every
+connection, once per connection count. Connection count 1 is the regular
+single-stream download.
+
+Usage:
+    python benchmarks/bench_ranged_download.py [--size-mb 32] [--rate 2000000] [--connections 1 2 4 8]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp_download import download_video  # noqa: E402
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+def run_download(url: str, connections: int) -> dict:
+    with tempfile.TemporaryDirectory() as output_dir:
+        params = {
+            'download_connections': connections,
+            'cache_dir': output_dir,
+            'metadata_cache': False,
+            'download_archive': False,
+        }
+        start = time.perf_counter()
+        result = download_video(url, params, output_dir, BenchmarkContext())
+        elapsed = time.perf_counter() - start
+        size = Path(result['video_path']).stat().st_size
+    stats = result['info']['download_stats']
+    return {
+        'connections': connections,
+        'bytes': size,
+        'seconds': round(elapsed, 3),
+        # Time spent transferring, without extraction and the anti-throttling sleep
+        'download_seconds': stats.get('elapsed'),
+        'average_speed': stats.get('average_speed'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=32)
+    parser.add_argument('--rate', type=float, default=2 * 1024 * 1024, help='Per-connection bandwidth, in bytes/s')
+    parser.add_argument('--latency', type=float, default=0.05, help='Delay before each response, in seconds')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Fraction of responses cut off halfway')
+    parser.add_argument('--no-range', action='store_true', help='Serve without Range support')
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    config = MediaServerConfig(
+        file_size=args.size_mb * 1024 * 1024, latency=args.latency, rate=args.rate,
+        drop_rate=args.drop_rate, honor_range=not args.no_range,
+    )
+    with MediaServer(config) as server:
+        results = [run_download(f'{server.base_url}/video.mp4', connections) for connections in args.connections]
+
+    print(json.dumps({
+        'size_mb': args.size_mb,
+        'rate': args.rate,
+        'latency': args.latency,
+        'drop_rate': args.drop_rate,
+        'range_support': not args.no_range,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark the shared rate scheduler with concurrent jobs in separate processes
+
+Three scenarios run against the local media server:
+
+* unthrottled: jobs download HLS streams from a server without limits.
+* pushback: the same, from a server that refuses requests above a fixed
+  rate with HTTP 429.
+* bandwidth: jobs download progressive files under a shared rate_limit; the
+  aggregate throughput should stay at the limit however many jobs run.
+
+The first two compare the scheduler with the previous fixed 1-5s sleep
+before each download and no coordination between jobs.
+
+Usage:
+    python benchmarks/bench_rate_scheduler.py [--jobs 4] [--server-rate 40]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+class NoScheduler:
+    """Baseline without coordination between jobs"""
+
+    def before_request(self, url):
+        pass
+
+    def on_response(self, url, status, retry_after=None):
+        pass
+
+    def wrap_response(self, response):
+        return response
+
+
+def use_fixed_sleeps():
+    """Restore the previous behaviour: fixed sleeps, no shared scheduler"""
+    import yt_dlp_download
+    from yt_dlp_download.downloaders import youtube_dl
+
+    create_ydl_options = yt_dlp_download.create_ydl_options
+
+    def create_with_sleeps(*args, **kwargs):
+        return dict(create_ydl_options(*args, **kwargs), sleep_interval=1, max_sleep_interval=5)
+
+    yt_dlp_download.create_ydl_options = create_with_sleeps
+    youtube_dl.get_rate_scheduler = lambda **kwargs: NoScheduler()
+
+
+def run_job(url: str, params: dict, baseline: bool) -> dict:
+    if baseline:
+        use_fixed_sleeps()
+    from yt_dlp_download import download_video
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        try:
+            result = download_video(url, dict(params, metadata_cache=False, download_archive=False), output_dir, BenchmarkContext())
+            size = Path(result['video_path']).stat().st_size
+            error = None
+        except ValueError as e:
+            size, error = 0, str(e)
+        return {'seconds': time.perf_counter() - start, 'bytes': size, 'error': error}
+
+
+def run_jobs(url: str, params: dict, jobs: int, baseline: bool = False) -> dict:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(run_job, [url] * jobs, [params] * jobs, [baseline] * jobs))
+    wall = time.perf_counter() - start
+    total_bytes = sum(result['bytes'] for result in results)
+    return {
+        'wall_seconds': round(wall, 3),
+        'failed_jobs': sum(1 for result in results if result['error']),
+        'aggregate_bytes_per_second': round(total_bytes / wall),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=4)
+    parser.add_argument('--server-rate', type=float, default=40, help='Requests per second the server accepts')
+    parser.add_argument('--rate-limit', default='8M', help='Shared bandwidth limit for the bandwidth scenario')
+    parser.add_argument('--file-mb', type=int, default=16)
+    args = parser.parse_args()
+
+    report = {'jobs': args.jobs}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for scenario, server_rate in (('unthrottled', None), ('pushback', args.server_rate)):
+            config = MediaServerConfig(segment_count=60, segment_size=64 * 1024, latency=0.02, max_request_rate=server_rate)
+            with MediaServer(config) as server:
+                url = f'{server.base_url}/hls/index.m3u8'
+                for name, baseline in (('fixed_sleeps', True), ('scheduler', False)):
+                    config.requests = config.errors = 0
+                    params = {'cache_dir': f'{cache_dir}/{scenario}_{name}', 'concurrent_fragments': '4'}
+                    result = run_jobs(url, params, args.jobs, baseline)
+                    result.update(requests=config.requests, refused_429=config.errors)
+                    report[f'{scenario}_{name}'] = result
+
+        config = MediaServerConfig(file_size=args.file_mb * 1024 * 1024)
+        with MediaServer(config) as server:
+            params = {'cache_dir': cache_dir, 'rate_limit': args.rate_limit}
+            report['bandwidth'] = dict(run_jobs(f'{server.base_url}/video.mp4', params, args.jobs), rate_limit=args.rate_limit)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark multi-rendition downloads against one task run per rendition
+
+Downloads a synthetic video from a throttled local media server in several
+renditions, once as separate task runs (an extraction and every stream
+download per rendition) and once through the renditions input (one
+extraction, every distinct stream downloaded once). The default renditions
+derive an mp4 and an mp3 from the same DASH audio and need ffmpeg; pass
+e.g. --source progressive --renditions '[{"quality": "720p"}, {"quality": "720p", "name": "copy"}, {"quality": "360p"}]'
+to run without it.
+
+Usage:
+    python benchmarks/bench_renditions.py [--source dash] [--renditions JSON] [--rate 2000000] [--latency 0.05]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp_download import download_renditions, download_video  # noqa: E402
+from yt_dlp_download.handlers import get_rendition_params, parse_renditions  # noqa: E402
+
+DEFAULT_RENDITIONS = [
+    {'quality': '1080p'},
+    {'audio_only': True, 'audio_format': 'mp3'},
+    {'quality': '480p', 'name': 'preview'},
+]
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+def run_separate(url: str, params: dict, renditions: list) -> dict:
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        for spec in parse_renditions(renditions):
+            download_video(url, get_rendition_params(params, spec, '%(title)s.%(ext)s'), output_dir, BenchmarkContext())
+        seconds = time.perf_counter() - start
+    return {'seconds': round(seconds, 3)}
+
+
+def run_shared(url: str, params: dict, renditions: list) -> dict:
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        result = download_renditions(url, dict(params, renditions=renditions), output_dir, BenchmarkContext())
+        seconds = time.perf_counter() - start
+    return {'seconds': round(seconds, 3), 'shared_streams': result['info']['shared_streams']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default='dash', choices=['progressive', 'hls', 'dash'])
+    parser.add_argument('--renditions', type=json.loads, default=DEFAULT_RENDITIONS)
+    parser.add_argument('--size-mb', type=float, default=8, help='Size of the largest progressive format')
+    parser.add_argument('--rate', type=float, default=2_000_000, help='Per-connection bandwidth, in bytes/s')
+    parser.add_argument('--latency', type=float, default=0.05, help='Delay before each response, in seconds')
+    args = parser.parse_args()
+
+    config = MediaServerConfig(file_size=int(args.size_mb * 1024 * 1024), segment_count=20, segment_size=256 * 1024,
+                               rate=int(args.rate), latency=args.latency)
+    report = {'source': args.source, 'renditions': args.renditions}
+    with MediaServer(config) as server, tempfile.TemporaryDirectory() as cache_dir:
+        url = f'{server.base_url}/watch/{args.source}'
+        params = {'cache_dir': cache_dir, 'metadata_cache': False, 'download_archive': False, 'resume_jobs': False, 'metrics': False}
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            requests = config.requests
+            report['separate'] = run_separate(url, params, args.renditions)
+            report['separate']['requests'] = config.requests - requests
+            requests = config.requests
+            report['shared'] = run_shared(url, params, args.renditions)
+            report['shared']['requests'] = config.requests - requests
+    report['speedup'] = round(report['separate']['seconds'] / report['shared']['seconds'], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Kill a download midway and measure how much the re-run resumes
+
+Starts a job in a subprocess against the throttled local media server,
+SIGKILLs it once partial data is on disk, then runs the same job again in a
+fresh output directory (as a retried flow node would) and checks that the
+partial files were adopted and the result is byte-exact.
+
+Usage:
+    python benchmarks/bench_resume.py [--source hls] [--kill-after 3]
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig, payload  # noqa: E402
+
+JOB_SCRIPT = '''
+import json, sys
+sys.path.insert(0, {tasks!r})
+from yt_dlp_download import download_video
+
+class Context:
+    def report_progress(self, percent):
+        pass
+
+url, output_dir, cache_dir = sys.argv[1:4]
+params = {{'cache_dir': cache_dir, 'download_archive': False, 'metadata_cache': False, 'concurrent_fragments': '2'}}
+result = download_video(url, params, output_dir, Context())
+print(json.dumps({{'path': result['video_path'], 'resumed': result['info'].get('resumed')}}))
+'''
+
+SOURCES = {
+    'progressive': '/video.mp4',
+    'hls': '/hls/index.m3u8',
+}
+
+
+def run_job(url: str, output_dir: str, cache_dir: str, kill_after=None):
+    tasks_dir = str(Path(__file__).resolve().parent.parent / 'tasks')
+    command = [sys.executable, '-c', JOB_SCRIPT.format(tasks=tasks_dir), url, output_dir, cache_dir]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    if kill_after is not None:
+        time.sleep(kill_after)
+        os.kill(process.pid, signal.SIGKILL)
+        process.wait()
+        return None
+    stdout, _ = process.communicate()
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', choices=SOURCES, default='hls')
+    parser.add_argument('--kill-after', type=float, default=3.0, help='Seconds before the first run is killed')
+    parser.add_argument('--rate', type=float, default=1024 * 1024, help='Per-connection bandwidth, in bytes/s')
+    args = parser.parse_args()
+
+    config = MediaServerConfig(rate=args.rate)
+    with MediaServer(config) as server, tempfile.TemporaryDirectory() as root:
+        url = server.base_url + SOURCES[args.source]
+        first_dir, second_dir, cache_dir = (os.path.join(root, name) for name in ('first', 'second', 'cache'))
+        for path in (first_dir, second_dir):
+            os.makedirs(path)
+
+        run_job(url, first_dir, cache_dir, kill_after=args.kill_after)
+        left_behind = sum(path.stat().st_size for path in Path(first_dir).iterdir())
+
+        start = time.perf_counter()
+        result = run_job(url, second_dir, cache_dir)
+        rerun_seconds = time.perf_counter() - start
+
+        data = Path(result['path']).read_bytes()
+        if args.source == 'hls':
+            expected = b''.join(payload(index * config.segment_size, config.segment_size) for index in range(config.segment_count))
+        else:
+            expected = payload(0, config.file_size)
+
+    print(json.dumps({
+        'source': args.source,
+        'killed_after': args.kill_after,
+        'bytes_left_by_killed_run': left_behind,
+        'resumed': result['resumed'],
+        'rerun_seconds': round(rerun_seconds, 3),
+        'byte_exact': data == expected,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
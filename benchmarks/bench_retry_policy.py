@@ -0,0 +1,136 @@
+"""Benchmark the retry policy and circuit breaker against scripted failures
+
+Each scenario scripts the statuses the local media server answers with,
+then downloads through the task (classified retries, Retry-After, the
+per-host circuit breaker) and through plain yt-dlp with the flat settings
+the task used before (10 retries whatever the error, fragment backoff of
+0.5s doubling up to 10s, no backoff between HTTP retries):
+
+* forbidden: one HLS segment answers 403 for good. The task gives up at
+  once; flat retries sleep through ten attempts first.
+* retry_after: one segment answers 503 with Retry-After: 1, then 429 with
+  Retry-After: 2, then succeeds. Requests sent before the Retry-After
+  elapsed are counted as early retries.
+* blocked_host: every progressive file answers 503 for a batch of videos.
+  The circuit opens after a few failures and the remaining jobs fail fast
+  instead of each retrying ten times.
+
+Every scenario starts with an empty cache directory, so no circuit state
+carries over.
+
+Usage:
+    python benchmarks/bench_retry_policy.py [--scenarios forbidden,retry_after,blocked_host] [--workers 2]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import yt_dlp  # noqa: E402
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp_download import download_video  # noqa: E402
+
+SCENARIOS = {
+    'forbidden': {
+        'videos': ['hls'],
+        'script': {r'^/hls/v\d+/seg5\.ts$': ['403*']},
+    },
+    'retry_after': {
+        'videos': ['hls'],
+        'script': {r'^/hls/v\d+/seg3\.ts$': ['503:1', '429:2']},
+    },
+    'blocked_host': {
+        'videos': [f'progressive-{n}' for n in range(1, 9)],
+        'script': {r'^/progressive/': ['503:1*']},
+    },
+}
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+def download_with_policy(url: str, output_dir: str, cache_dir: str) -> None:
+    params = {
+        'quality': '360p',
+        'cache_dir': cache_dir,
+        'metadata_cache': False,
+        'download_archive': False,
+        'resume_jobs': False,
+        'metrics': False,
+    }
+    download_video(url, params, output_dir, BenchmarkContext())
+
+
+def download_flat(url: str, output_dir: str, cache_dir: str) -> None:
+    opts = {
+        'format': 'best[height<=360]/best',
+        'outtmpl': f'{output_dir}/%(id)s.%(ext)s',
+        'retries': 10,
+        'fragment_retries': 10,
+        'retry_sleep_functions': {'fragment': lambda n: min(0.5 * (2 ** n), 10.0)},
+        'quiet': True,
+        'noprogress': True,
+    }
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        ydl.download([url])
+
+
+def run_scenario(name: str, mode: str, workers: int) -> dict:
+    scenario = SCENARIOS[name]
+    config = MediaServerConfig(file_size=1024 * 1024, segment_count=8, segment_size=64 * 1024, heights=(360,),
+                               status_script=scenario['script'])
+    download = download_with_policy if mode == 'policy' else download_flat
+    errors = []
+    with MediaServer(config) as server, tempfile.TemporaryDirectory() as output_dir, tempfile.TemporaryDirectory() as cache_dir:
+        urls = [f'{server.base_url}/watch/{video}' for video in scenario['videos']]
+
+        def run(url):
+            try:
+                download(url, output_dir, cache_dir)
+            except Exception as e:
+                errors.append(' '.join(str(e).split())[:160])
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            with ThreadPoolExecutor(workers) as executor:
+                list(executor.map(run, urls))
+        seconds = time.perf_counter() - start
+    return {
+        'seconds': round(seconds, 2),
+        'jobs': len(urls),
+        'failed_jobs': len(errors),
+        'failed_requests': config.scripted,
+        'early_retries': config.early_retries,
+        'media_requests': config.scripted + config.requests,
+        'first_error': errors[0] if errors else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    report = {}
+    for name in args.scenarios.split(','):
+        report[name] = {mode: run_scenario(name, mode, args.workers) for mode in ('flat', 'policy')}
+        print(f'{name}: flat {report[name]["flat"]["seconds"]}s, policy {report[name]["policy"]["seconds"]}s', file=sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark latency-probing source selection across throttled CDN hosts
+
+Starts one local media server per simulated CDN host, each with its own
+response latency and per-connection bandwidth, and describes a video whose
+equivalent formats (same resolution and codec) are served by those hosts.
+The slowest host's format reports the highest bitrate, so ranking by
+(height, bitrate) alone picks it. The video is downloaded:
+
+* ranked: without probing, the top-ranked format;
+* probed: probing every candidate first, with an empty probe cache;
+* cached: probing again, with the results of the previous run cached.
+
+Usage:
+    python benchmarks/bench_source_probe.py [--size-mb 8] [--hosts "0.3:1000000,0.05:4000000,0.1:8000000"]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp_download import download_video  # noqa: E402
+
+
+class BenchmarkContext:
+    """Minimal stand-in for the OOMOL context"""
+
+    def report_progress(self, percent):
+        pass
+
+
+def parse_hosts(value: str) -> list:
+    """Parse "latency:rate,..." into (latency seconds, bytes per second) pairs"""
+    return [tuple(float(part) for part in host.split(':')) for host in value.split(',')]
+
+
+def build_info(servers: list, size: int) -> dict:
+    """A video whose equivalent 360p formats are each served by one host, the slowest ranked first"""
+    formats = []
+    for number, server in enumerate(servers):
+        formats.append({
+            'format_id': f'cdn{number}', 'url': f'{server.base_url}/progressive/360p-avc.mp4',
+            'ext': 'mp4', 'protocol': 'http', 'vcodec': 'avc1.64001F', 'acodec': 'mp4a.40.2',
+            'width': 640, 'height': 360, 'fps': 30, 'filesize': size,
+            # Bitrates rank the first (slowest) host highest
+            'tbr': 1000 - number,
+        })
+    return {
+        'id': 'source-probe', 'title': 'Synthetic multi-CDN video', 'duration': 60,
+        'extractor': 'generic', 'extractor_key': 'Generic', 'webpage_url': servers[0].base_url + '/watch/progressive',
+        'formats': formats,
+    }
+
+
+def run_mode(servers: list, size: int, cache_dir: str, probe: bool) -> dict:
+    params = {
+        'quality': '360p',
+        'probe_sources': probe,
+        'cache_dir': cache_dir,
+        'metadata_cache': False,
+        'download_archive': False,
+        'resume_jobs': False,
+        'metrics': False,
+    }
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            result = download_video(servers[0].base_url + '/watch/progressive', params, output_dir, BenchmarkContext(),
+                                    build_info(servers, size))
+        seconds = time.perf_counter() - start
+    source_probe = result['info'].get('source_probe') or {}
+    return {
+        'seconds': round(seconds, 3),
+        'chosen': source_probe.get('chosen'),
+        'probe_seconds': source_probe.get('seconds'),
+        'probed': source_probe.get('probed'),
+        'candidates': source_probe.get('candidates'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=8)
+    parser.add_argument('--hosts', default='0.3:1000000,0.05:4000000,0.1:8000000', help='latency:rate per simulated host')
+    args = parser.parse_args()
+
+    hosts = parse_hosts(args.hosts)
+    size = int(args.size_mb * 1024 * 1024)
+    with contextlib.ExitStack() as stack:
+        servers = [stack.enter_context(MediaServer(MediaServerConfig(file_size=size, latency=latency, rate=int(rate), heights=(360,))))
+                   for latency, rate in hosts]
+        cache_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        report = {
+            'hosts': [{'url': server.base_url, 'latency': latency, 'rate': int(rate)} for server, (latency, rate) in zip(servers, hosts)],
+            'ranked': run_mode(servers, size, cache_dir, probe=False),
+            'probed': run_mode(servers, size, cache_dir, probe=True),
+            'cached': run_mode(servers, size, cache_dir, probe=True),
+        }
+    report['speedup'] = round(report['ranked']['seconds'] / report['probed']['seconds'], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
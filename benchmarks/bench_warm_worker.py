@@ -0,0 +1,103 @@
+"""Compare per-job latency of the cold path and the warm worker
+
+Each job runs the task's ``main`` in a fresh interpreter, as oocana does,
+against the local media server:
+
+* info: an info-only run with the metadata cache off, so every job
+  extracts.
+* download: a full download of a small progressive file.
+
+The cold path runs everything in the task process; the warm path hands the
+job to the worker (``warm_worker``). The first warm job, which starts the
+worker, is reported separately. The worker is stopped at the end.
+
+Usage:
+    python benchmarks/bench_warm_worker.py [--jobs 10] [--file-size 1048576]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+
+TASKS_DIR = Path(__file__).resolve().parent.parent / 'tasks'
+
+JOB_SCRIPT = '''
+import json, sys
+sys.path.insert(0, sys.argv[1])
+from yt_dlp_download import main
+
+class Context:
+    def __init__(self, session_dir):
+        self.session_dir = session_dir
+
+    def report_progress(self, percent):
+        pass
+
+params = json.loads(sys.argv[2])
+result = main(params, Context(params['output_dir']))
+print(json.dumps(result['info'].get('worker') or {}))
+'''
+
+
+def run_job(params: dict) -> float:
+    """Run one job in a fresh interpreter and return its wall time in milliseconds"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', JOB_SCRIPT, str(TASKS_DIR), json.dumps(params)],
+                   capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(base_params: dict, jobs: int, warm: bool) -> dict:
+    with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as output_dir:
+        params = dict(base_params, cache_dir=cache_dir, output_dir=output_dir, warm_worker=warm,
+                      metadata_cache=False, download_archive=False, resume_jobs=False)
+        times = [run_job(params) for _ in range(jobs)]
+        if warm:
+            from yt_dlp_download.worker import get_socket_path, stop_worker
+            stop_worker(get_socket_path(cache_dir))
+
+    report = {'jobs': jobs}
+    if warm:
+        report['first_job_ms'] = round(times.pop(0), 1)
+    report['median_ms'] = round(statistics.median(times), 1)
+    report['p90_ms'] = round(sorted(times)[int(len(times) * 0.9) - 1], 1) if len(times) > 1 else report['median_ms']
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=10)
+    parser.add_argument('--file-size', type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(TASKS_DIR))
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [str(TASKS_DIR), os.environ.get('PYTHONPATH')]))
+
+    report = {'jobs': args.jobs, 'file_size': args.file_size}
+    with MediaServer(MediaServerConfig(file_size=args.file_size)) as server:
+        url = f'{server.base_url}/video.mp4'
+        for name, params in (('info', {'url': url, 'info_only': True}), ('download', {'url': url})):
+            cold = measure(params, args.jobs, warm=False)
+            warm = measure(params, args.jobs + 1, warm=True)
+            report[name] = {
+                'cold': cold,
+                'warm': warm,
+                'saved_per_job_ms': round(cold['median_ms'] - warm['median_ms'], 1),
+                'speedup': round(cold['median_ms'] / warm['median_ms'], 2) if warm['median_ms'] else None,
+            }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
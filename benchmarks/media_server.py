@@ -0,0 +1,475 @@
+"""Local synthetic media server for offline benchmarks
+
+Serves generated content, so benchmarks need neither network access nor
+real media files:
+
+    /video.mp4              progressive file, with Range support
+    /hls/index.m3u8         HLS media playlist
+    /hls/seg<N>.ts          HLS segments
+
+and a synthetic video site, read by the ``synthetic`` test extractor in
+``benchmarks/yt_dlp_plugins``:
+
+    /watch/<source>         video page (source: progressive, hls, dash or all)
+    /watch/<source>-<N>     the N-th video of a source, with its own date and duration
+    /api/<source>.json      video metadata and the paths of its formats
+    /playlist/<count>       playlist of <count> progressive videos
+    /api/playlist/<count>.json?page=<P>
+                            one page of flat playlist entries (no upload dates)
+    /progressive/<name>     muxed progressive formats per height and codec
+    /hls/master.m3u8        HLS master playlist, one variant per height
+    /dash/manifest.mpd      DASH manifest with separate video and audio streams
+    /subs/<lang>.vtt        subtitles
+
+Each response can be delayed (simulating a high-latency CDN), throttled per
+connection, failed with HTTP 429 or cut off halfway at a given rate. A
+request rate can be enforced, refusing excess requests with HTTP 429. Range
+support can be switched off to exercise single-stream fallbacks. Requests
+whose path matches a pattern can be answered with a scripted sequence of
+statuses (e.g. ``hls/seg=503,503,429:2`` fails the next three segment
+requests, the last one with ``Retry-After: 2``; ``*`` repeats a status
+forever).
+
+Usage:
+    python benchmarks/media_server.py [--port 8765] [--latency 0.2] [--rate 2000000]
+"""
+
+import argparse
+import datetime
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl
+
+CHUNK_SIZE = 64 * 1024
+
+# Video codecs of the synthetic site: codec string, container and paired audio codec
+VIDEO_CODECS = {
+    'avc': ('avc1.64001F', 'mp4', 'mp4a.40.2'),
+    'vp9': ('vp09.00.40.08', 'webm', 'opus'),
+}
+
+AUDIO_BANDWIDTH = 128_000
+
+SOURCES = ('progressive', 'hls', 'dash')
+
+THUMBNAIL = bytes.fromhex('ffd8ffe000104a46494600010100000100010000ffd9')
+
+# Entries per page of the playlist API
+PLAYLIST_PAGE_SIZE = 10
+
+
+class MediaServerConfig:
+    """Content and network conditions of a media server"""
+
+    def __init__(self, file_size=8 * 1024 * 1024, segment_count=40, segment_size=256 * 1024, segment_duration=4.0,
+                 latency=0.0, rate=None, error_rate=0.0, drop_rate=0.0, honor_range=True, max_request_rate=None, seed=0,
+                 heights=(360, 720, 1080), subtitle_langs=('en', 'zh-CN'), status_script=None):
+        self.file_size = file_size
+        self.segment_count = segment_count
+        self.segment_size = segment_size
+        self.segment_duration = segment_duration
+        self.latency = latency
+        self.rate = rate
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.honor_range = honor_range
+        self.max_request_rate = max_request_rate
+        self.heights = tuple(sorted(heights))
+        self.subtitle_langs = tuple(subtitle_langs)
+        self.status_script = [(re.compile(pattern), list(statuses)) for pattern, statuses in (status_script or {}).items()]
+        self.scripted = 0
+        self.retry_after_until = {}
+        self.early_retries = 0
+        self.request_tokens = max_request_rate or 0.0
+        self.tokens_updated = time.monotonic()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return True
+            if self.max_request_rate:
+                # Server-side token bucket: requests above the rate are refused
+                now = time.monotonic()
+                self.request_tokens = min(self.max_request_rate, self.request_tokens + (now - self.tokens_updated) * self.max_request_rate)
+                self.tokens_updated = now
+                if self.request_tokens < 1:
+                    self.errors += 1
+                    return True
+                self.request_tokens -= 1
+            return False
+
+    def scripted_status(self, path: str) -> Optional[tuple]:
+        """Take the next scripted (status, Retry-After) for a path, if any
+
+        Requests for a path sooner than a Retry-After it was answered with
+        are counted as early retries.
+        """
+        with self.lock:
+            if time.monotonic() < self.retry_after_until.get(path, 0):
+                self.early_retries += 1
+            for pattern, statuses in self.status_script:
+                if statuses and pattern.search(path):
+                    status = statuses[0]
+                    if not (isinstance(status, str) and status.endswith('*')):
+                        statuses.pop(0)
+                    self.scripted += 1
+                    status, retry_after = parse_scripted_status(status)
+                    if retry_after:
+                        self.retry_after_until[path] = time.monotonic() + float(retry_after)
+                    return status, retry_after
+        return None
+
+    def should_drop(self) -> bool:
+        with self.lock:
+            return bool(self.drop_rate) and self.random.random() < self.drop_rate
+
+    @property
+    def duration(self) -> float:
+        return self.segment_count * self.segment_duration
+
+    def scaled(self, size: int, height: int) -> int:
+        """Scale a size given for the largest height down to another height"""
+        return max(1, size * height // self.heights[-1])
+
+    def bandwidth(self, height: int) -> int:
+        return int(self.scaled(self.segment_size, height) * 8 / self.segment_duration)
+
+    def audio_segment_size(self) -> int:
+        return int(AUDIO_BANDWIDTH * self.segment_duration / 8)
+
+
+def get_video_date(number: int) -> str:
+    """Upload date of the N-th video: one a day, newest first, from 2024-12-31 back"""
+    return (datetime.date(2024, 12, 31) - datetime.timedelta(days=number)).strftime('%Y%m%d')
+
+
+def get_video_duration(number: int) -> int:
+    """Reported duration of the N-th video, cycling from 30 seconds to 10 minutes"""
+    return 30 + number * 37 % 570
+
+
+def format_timestamp(seconds: float) -> str:
+    return f'{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:06.3f}'
+
+
+def parse_scripted_status(status) -> tuple:
+    """Parse a scripted status like ``503``, ``429:2`` or ``403*``"""
+    code, _, retry_after = str(status).rstrip('*').partition(':')
+    return int(code), retry_after or None
+
+
+def parse_status_script(value: str) -> dict:
+    """Parse ``pattern=status,status;pattern=status`` into a status script"""
+    script = {}
+    for rule in filter(None, value.split(';')):
+        pattern, _, statuses = rule.partition('=')
+        script[pattern] = statuses.split(',')
+    return script
+
+
+def payload(offset: int, length: int) -> bytes:
+    """Deterministic content for a byte range"""
+    pattern = bytes(range(256))
+    start = offset % 256
+    repeated = pattern[start:] + pattern * (length // 256 + 1)
+    return repeated[:length]
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    config: MediaServerConfig
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        config = self.config
+        if config.latency:
+            time.sleep(config.latency)
+        path = self.path.split('?', 1)[0]
+
+        scripted = config.scripted_status(path)
+        if scripted:
+            status, retry_after = scripted
+            self.send_response(status)
+            if retry_after:
+                self.send_header('Retry-After', retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if path == '/hls/index.m3u8':
+            return self.send_content(self.playlist().encode(), 'application/vnd.apple.mpegurl', send_body)
+        if path == '/hls/master.m3u8':
+            return self.send_content(self.master_playlist().encode(), 'application/vnd.apple.mpegurl', send_body)
+        variant = re.fullmatch(r'/hls/v(\d+)/index\.m3u8', path)
+        if variant and int(variant.group(1)) in config.heights:
+            return self.send_content(self.playlist().encode(), 'application/vnd.apple.mpegurl', send_body)
+        if path == '/dash/manifest.mpd':
+            return self.send_content(self.manifest().encode(), 'application/dash+xml', send_body)
+        page = re.fullmatch(r'/(watch|api)/(\w+?)(?:-(\d+))?(\.json)?', path)
+        if page and page.group(2) in SOURCES + ('all',):
+            number = int(page.group(3)) if page.group(3) else None
+            if page.group(1) == 'api':
+                return self.send_content(json.dumps(self.metadata(page.group(2), number)).encode(), 'application/json', send_body)
+            return self.send_content(f'<html><title>{page.group(2)}</title></html>'.encode(), 'text/html', send_body)
+        playlist = re.fullmatch(r'/(playlist|api/playlist)/(\d+)(\.json)?', path)
+        if playlist:
+            if playlist.group(1) == 'playlist':
+                return self.send_content(f'<html><title>playlist {playlist.group(2)}</title></html>'.encode(), 'text/html', send_body)
+            query = dict(parse_qsl(self.path.split('?', 1)[1] if '?' in self.path else ''))
+            entries = self.playlist_page(int(playlist.group(2)), int(query.get('page', 0)))
+            return self.send_content(json.dumps(entries).encode(), 'application/json', send_body)
+        subtitle = re.fullmatch(r'/subs/([\w-]+)\.vtt', path)
+        if subtitle and subtitle.group(1) in config.subtitle_langs:
+            return self.send_content(self.subtitles(subtitle.group(1)).encode(), 'text/vtt', send_body)
+        if path == '/thumb.jpg':
+            return self.send_content(THUMBNAIL, 'image/jpeg', send_body)
+
+        if config.should_fail():
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        segment = re.fullmatch(r'/hls/seg(\d+)\.ts', path)
+        if segment and int(segment.group(1)) < config.segment_count:
+            offset = int(segment.group(1)) * config.segment_size
+            return self.send_range(offset, config.segment_size, 'video/mp2t', send_body)
+        if path == '/video.mp4':
+            return self.send_range(0, config.file_size, 'video/mp4', send_body)
+        progressive = re.fullmatch(r'/progressive/(\d+)p-(\w+)\.\w+', path)
+        if progressive and int(progressive.group(1)) in config.heights and progressive.group(2) in VIDEO_CODECS:
+            return self.send_range(0, config.scaled(config.file_size, int(progressive.group(1))), 'video/mp4', send_body)
+        if path == '/progressive/audio.m4a':
+            return self.send_range(0, int(AUDIO_BANDWIDTH * config.duration / 8), 'audio/mp4', send_body)
+        variant = re.fullmatch(r'/hls/v(\d+)/seg(\d+)\.ts', path)
+        if variant and int(variant.group(1)) in config.heights and int(variant.group(2)) < config.segment_count:
+            size = config.scaled(config.segment_size, int(variant.group(1)))
+            return self.send_range(int(variant.group(2)) * size, size, 'video/mp2t', send_body)
+        fragment = re.fullmatch(r'/dash/(v(\d+)-\w+|a-\w+)/(init\.mp4|seg(\d+)\.m4s)', path)
+        if fragment and (fragment.group(4) is None or int(fragment.group(4)) < config.segment_count):
+            size = config.scaled(config.segment_size, int(fragment.group(2))) if fragment.group(2) else config.audio_segment_size()
+            if fragment.group(4) is None:
+                return self.send_range(0, 1024, 'video/mp4', send_body)
+            return self.send_range(int(fragment.group(4)) * size, size, 'video/mp4', send_body)
+
+        self.send_error(404)
+
+    def playlist(self) -> str:
+        config = self.config
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{int(config.segment_duration + 1)}', '#EXT-X-MEDIA-SEQUENCE:0']
+        for index in range(config.segment_count):
+            lines += [f'#EXTINF:{config.segment_duration:.1f},', f'seg{index}.ts']
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    def master_playlist(self) -> str:
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+        for height in self.config.heights:
+            lines += [
+                f'#EXT-X-STREAM-INF:BANDWIDTH={self.config.bandwidth(height)},'
+                f'RESOLUTION={height * 16 // 9}x{height},CODECS="avc1.64001F,mp4a.40.2"',
+                f'v{height}/index.m3u8',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def manifest(self) -> str:
+        config = self.config
+        template = (f'<SegmentTemplate timescale="1" duration="{config.segment_duration:g}" startNumber="0" '
+                    'initialization="$RepresentationID$/init.mp4" media="$RepresentationID$/seg$Number$.m4s"/>')
+        sets = []
+        for name, (codec, container, audio_codec) in VIDEO_CODECS.items():
+            representations = ''.join(
+                f'<Representation id="v{height}-{name}" codecs="{codec}" width="{height * 16 // 9}" height="{height}" '
+                f'frameRate="30" bandwidth="{config.bandwidth(height)}"/>'
+                for height in config.heights
+            )
+            sets.append(f'<AdaptationSet contentType="video" mimeType="video/{container}">{template}{representations}</AdaptationSet>')
+            sets.append(
+                f'<AdaptationSet contentType="audio" mimeType="audio/{container}" lang="en">{template}'
+                f'<Representation id="a-{name}" codecs="{audio_codec}" audioSamplingRate="48000" bandwidth="{AUDIO_BANDWIDTH}"/>'
+                '</AdaptationSet>'
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" profiles="urn:mpeg:dash:profile:isoff-live:2011" '
+            f'minBufferTime="PT2S" mediaPresentationDuration="PT{config.duration:g}S"><Period>{"".join(sets)}</Period></MPD>\n'
+        )
+
+    def metadata(self, source: str, number: Optional[int] = None) -> dict:
+        """Describe a synthetic video whose formats come from one source, or all of them
+
+        Numbered videos share the media of their source but have their own
+        ID, title, upload date and reported duration.
+        """
+        config = self.config
+        metadata = {
+            'id': source if number is None else f'{source}-{number}',
+            'title': f'Synthetic {source} video' if number is None else f'Synthetic {source} video {number}',
+            'uploader': 'Media Server',
+            'upload_date': '20240101' if number is None else get_video_date(number),
+            'duration': config.duration if number is None else get_video_duration(number),
+            'view_count': 1000,
+            'thumbnail': '/thumb.jpg',
+            'subtitles': {lang: f'/subs/{lang}.vtt' for lang in config.subtitle_langs},
+        }
+        if source in ('progressive', 'all'):
+            formats = [
+                {
+                    'format_id': f'{height}p-{name}', 'path': f'/progressive/{height}p-{name}.{container}',
+                    'ext': container, 'vcodec': codec, 'acodec': audio_codec, 'width': height * 16 // 9,
+                    'height': height, 'fps': 30, 'filesize': config.scaled(config.file_size, height),
+                    'tbr': config.scaled(config.file_size, height) * 8 / config.duration / 1000,
+                }
+                for name, (codec, container, audio_codec) in VIDEO_CODECS.items()
+                for height in config.heights
+            ]
+            formats.append({
+                'format_id': 'audio', 'path': '/progressive/audio.m4a', 'ext': 'm4a', 'vcodec': 'none',
+                'acodec': 'mp4a.40.2', 'abr': AUDIO_BANDWIDTH / 1000, 'filesize': int(AUDIO_BANDWIDTH * config.duration / 8),
+            })
+            metadata['progressive'] = formats
+        if source in ('hls', 'all'):
+            metadata['hls'] = '/hls/master.m3u8'
+        if source in ('dash', 'all'):
+            metadata['dash'] = '/dash/manifest.mpd'
+        return metadata
+
+    def playlist_page(self, count: int, page: int) -> list:
+        """Flat entries of one playlist page: IDs, titles and durations, as listing pages show"""
+        first = page * PLAYLIST_PAGE_SIZE
+        return [
+            {'id': f'progressive-{number}', 'title': f'Synthetic progressive video {number}',
+             'url': f'/watch/progressive-{number}', 'duration': get_video_duration(number)}
+            for number in range(first, min(first + PLAYLIST_PAGE_SIZE, count))
+        ]
+
+    def subtitles(self, lang: str) -> str:
+        cues = ['WEBVTT', '']
+        for index in range(self.config.segment_count):
+            start = index * self.config.segment_duration
+            cues += [f'{format_timestamp(start)} --> {format_timestamp(start + self.config.segment_duration)}',
+                     f'[{lang}] Segment {index}', '']
+        return '\n'.join(cues)
+
+    def send_content(self, body, content_type, send_body):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_range(self, base, size, content_type, send_body):
+        start, end = 0, size - 1
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range') or '')
+        if match and self.config.honor_range:
+            start = int(match.group(1) or 0)
+            end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if send_body:
+            length = end - start + 1
+            if self.config.should_drop():
+                self.send_throttled(base + start, length // 2)
+                self.close_connection = True
+                return
+            self.send_throttled(base + start, length)
+
+    def send_throttled(self, offset, length):
+        rate = self.config.rate
+        started = time.monotonic()
+        sent = 0
+        while sent < length:
+            chunk = payload(offset + sent, min(CHUNK_SIZE, length - sent))
+            try:
+                self.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            sent += len(chunk)
+            if rate:
+                ahead = sent / rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+class MediaServer:
+    """Run a media server on a background thread"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or MediaServerConfig()
+        handler = type('Handler', (MediaRequestHandler,), {'config': self.config})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Delay before each response, in seconds')
+    parser.add_argument('--rate', type=float, default=None, help='Per-connection bandwidth, in bytes/s')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of media requests failed with HTTP 429')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Fraction of media responses cut off halfway')
+    parser.add_argument('--no-range', action='store_true', help='Ignore Range headers')
+    parser.add_argument('--max-request-rate', type=float, default=None, help='Requests per second before answering 429')
+    parser.add_argument('--status-script', default='', help='Scripted statuses, e.g. "hls/seg=503,429:2;watch/dash=403*"')
+    args = parser.parse_args()
+
+    config = MediaServerConfig(latency=args.latency, rate=args.rate, error_rate=args.error_rate,
+                               drop_rate=args.drop_rate, honor_range=not args.no_range,
+                               max_request_rate=args.max_request_rate, status_script=parse_status_script(args.status_script))
+    with MediaServer(config, port=args.port) as server:
+        print(f'Serving synthetic media on {server.base_url}')
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""yt-dlp extractor for the synthetic video site of benchmarks/media_server.py
+
+yt-dlp loads it as a plugin when the benchmarks directory is on PYTHONPATH.
+"""
+
+import functools
+from urllib.parse import urljoin
+
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.utils import OnDemandPagedList
+
+# Entries per page of the playlist API, as in media_server.PLAYLIST_PAGE_SIZE
+PLAYLIST_PAGE_SIZE = 10
+
+
+class SyntheticMediaIE(InfoExtractor):
+    IE_NAME = 'synthetic'
+    _VALID_URL = r'(?P<base>https?://(?:127\.0\.0\.1|localhost)(?::\d+)?)/watch/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        base, video_id = self._match_valid_url(url).group('base', 'id')
+        self._download_webpage(url, video_id)
+        metadata = self._download_json(f'{base}/api/{video_id}.json', video_id, 'Downloading video metadata')
+
+        formats = [
+            {key: value for key, value in dict(f, url=urljoin(base, f['path'])).items() if key != 'path'}
+            for f in metadata.get('progressive') or []
+        ]
+        if metadata.get('hls'):
+            formats.extend(self._extract_m3u8_formats(urljoin(base, metadata['hls']), video_id, 'mp4', m3u8_id='hls'))
+        if metadata.get('dash'):
+            formats.extend(self._extract_mpd_formats(urljoin(base, metadata['dash']), video_id, mpd_id='dash'))
+
+        return {
+            'id': video_id,
+            'title': metadata['title'],
+            'uploader': metadata.get('uploader'),
+            'upload_date': metadata.get('upload_date'),
+            'duration': metadata.get('duration'),
+            'view_count': metadata.get('view_count'),
+            'thumbnail': urljoin(base, metadata['thumbnail']) if metadata.get('thumbnail') else None,
+            'subtitles': {
+                lang: [{'url': urljoin(base, path), 'ext': 'vtt'}]
+                for lang, path in (metadata.get('subtitles') or {}).items()
+            },
+            'formats': formats,
+        }
+
+
+class SyntheticPlaylistIE(InfoExtractor):
+    IE_NAME = 'synthetic:playlist'
+    _VALID_URL = r'(?P<base>https?://(?:127\.0\.0\.1|localhost)(?::\d+)?)/playlist/(?P<id>\d+)'
+
+    def _fetch_page(self, base, playlist_id, page):
+        entries = self._download_json(
+            f'{base}/api/playlist/{playlist_id}.json', playlist_id, f'Downloading page {page + 1}', query={'page': page})
+        for entry in entries:
+            yield self.url_result(
+                urljoin(base, entry['url']), SyntheticMediaIE, entry['id'], entry['title'], duration=entry.get('duration'))
+
+    def _real_extract(self, url):
+        base, playlist_id = self._match_valid_url(url).group('base', 'id')
+        self._download_webpage(url, playlist_id)
+        entries = OnDemandPagedList(functools.partial(self._fetch_page, base, playlist_id), PLAYLIST_PAGE_SIZE)
+        return self.playlist_result(entries, playlist_id, f'Synthetic playlist {playlist_id}')
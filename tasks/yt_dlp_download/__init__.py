@@ -2,35 +2,81 @@
 import typing
 
 class Inputs(typing.TypedDict):
-    url: str
+    url: typing.Optional[str]
+    urls: typing.Optional[list[str]]
+    max_workers: typing.Optional[int]
+    max_per_host: typing.Optional[int]
+    worker_mode: typing.Optional[str]
+    postprocess_workers: typing.Optional[int]
+    postprocess_backlog: typing.Optional[int]
+    playlist_window: typing.Optional[int]
+    playlist_items: typing.Optional[str]
+    date_after: typing.Optional[str]
+    date_before: typing.Optional[str]
+    min_duration: typing.Optional[float]
+    max_duration: typing.Optional[float]
     format: typing.Optional[str]
     output_dir: typing.Optional[str]
     filename_template: typing.Optional[str]
     quality: typing.Optional[str]
     audio_only: typing.Optional[bool]
+    audio_format: typing.Optional[str]
+    container: typing.Optional[str]
+    renditions: typing.Optional[list[dict]]
     subtitle_langs: typing.Optional[str]
     proxy: typing.Optional[str]
     hdr: typing.Optional[bool]
     high_fps: typing.Optional[bool]
     codec_preference: typing.Optional[str]
     bitrate_limit: typing.Optional[str]
+    start_time: typing.Optional[str]
+    end_time: typing.Optional[str]
+    time_ranges: typing.Optional[str]
+    probe_sources: typing.Optional[bool]
+    probe_candidates: typing.Optional[int]
     cookies_file: typing.Optional[str]
+    info_only: typing.Optional[bool]
+    metadata_cache: typing.Optional[bool]
+    cache_dir: typing.Optional[str]
+    download_archive: typing.Optional[bool]
+    verify_archive_hash: typing.Optional[bool]
+    resume_jobs: typing.Optional[bool]
+    stale_partial_days: typing.Optional[int]
+    concurrent_fragments: typing.Optional[str]
+    max_concurrent_fragments: typing.Optional[int]
+    download_connections: typing.Optional[int]
+    io_mode: typing.Optional[str]
+    scratch_dir: typing.Optional[str]
+    rate_limit: typing.Optional[str]
+    max_requests_per_host: typing.Optional[float]
+    warm_worker: typing.Optional[bool]
+    worker_idle_seconds: typing.Optional[int]
+    metrics: typing.Optional[bool]
+    metrics_file: typing.Optional[str]
+    info_json: typing.Optional[str]
+    write_thumbnail: typing.Optional[bool]
 
 class Outputs(typing.TypedDict):
     video_path: str
     info: dict
+    results: typing.Optional[list[dict]]
+    renditions: typing.Optional[list[dict]]
+    sidecar_files: typing.Optional[dict]
 
 # endregion
 
 import os
-import yt_dlp
+import copy
+import time
+import functools
 from oocana import Context
 
 # Import modular components
 from .utils import ensure_output_dir, find_downloaded_file
-from .formatters import get_format_string, get_optimal_format_for_hd
-from .handlers import create_progress_hook, display_video_info, prepare_video_info, display_download_info
-from .config import create_ydl_options, configure_audio_options, configure_subtitle_options, get_default_filename_template
+from .formatters import get_format_string, get_optimal_format_for_hd, get_equivalent_formats, QUALITY_HEIGHTS, InfoRecord, slim_info
+from .handlers import create_progress_hook, display_video_info, prepare_video_info, display_download_info, download_with_info, get_batch_urls, get_url_host, resolve_batch_url, run_batch, create_fragment_controller, get_fragment_host, parse_fragment_concurrency, create_job_metrics, PostprocessPipeline, DEFAULT_POSTPROCESS_WORKERS, build_entry_filter, check_entry, is_playlist_result, parse_playlist_items, parse_info_json_mode, start_thumbnail_fetch, write_compact_info_json, create_source_prober, DEFAULT_PROBE_CANDIDATES, RenditionProgress, SharedStreams, get_rendition_params, parse_renditions, create_disk_io_controller
+from .cache import DownloadArchive, JobJournal, MetadataCache, get_archive_key, get_job_key
+from .config import create_ydl_options, configure_audio_options, configure_container_options, configure_subtitle_options, configure_sidecar_options, configure_rate_options, configure_retry_options, configure_clip_options, get_default_filename_template, plan_postprocessing, apply_postprocessing_plan, PostprocessTimer
 
 def main(params: Inputs, context: Context) -> Outputs:
     """
@@ -44,12 +90,206 @@ def main(params: Inputs, context: Context) -> Outputs:
         Dictionary containing video path and information
     """
     
-    url = params["url"]
     output_dir = params.get("output_dir") or context.session_dir
+    
+    # Ensure output directory exists
+    ensure_output_dir(output_dir)
+    
+    # Hand the job to the warm worker; fall back to running it here if that is not possible
+    if params.get("warm_worker"):
+        from .worker import run_in_worker
+        result = run_in_worker(dict(params, warm_worker=False), output_dir, context)
+        if result is not None:
+            return result
+    
+    return run_job(params, output_dir, context)
+
+
+def run_job(params: Inputs, output_dir: str, context) -> Outputs:
+    """Run a single or batch download, in the task process or in the warm worker"""
+    # Batch mode: several URLs and/or playlists on a worker pool
+    if params.get("urls"):
+        return download_batch(params, output_dir, context)
+    
+    if not params.get("url"):
+        raise ValueError("No video URL provided")
+    
+    if params.get("renditions"):
+        return download_renditions(params["url"], params, output_dir, context)
+    
+    return download_video(params["url"], params, output_dir, context)
+
+
+def create_resolve_options(params: Inputs, output_dir: str) -> dict:
+    """yt-dlp options for resolving URLs ahead of their downloads"""
+    resolve_opts = create_ydl_options(output_dir, get_default_filename_template(), 'best', params.get("proxy"), params.get("cookies_file"))
+    resolve_opts = configure_subtitle_options(resolve_opts, params.get("subtitle_langs"))
+    resolve_opts = configure_rate_options(resolve_opts, params.get("cache_dir"), params.get("rate_limit"), params.get("max_requests_per_host"))
+    resolve_opts = configure_retry_options(resolve_opts, params.get("cache_dir"))
+    resolve_opts['extractor_index'] = {'state_dir': params.get("cache_dir")}
+    resolve_opts['playlist_items'] = parse_playlist_items(params.get("playlist_items"))
+    return resolve_opts
+
+
+def download_batch(params: Inputs, output_dir: str, context: Context) -> Outputs:
+    """Download every URL of a batch and return per-item results"""
+    urls = get_batch_urls(params.get("url"), params.get("urls"))
+    worker_mode = params.get("worker_mode") or "thread"
+    max_workers = params.get("max_workers") or 4
+    max_per_host = params.get("max_per_host") or 2
+    postprocess_workers = params.get("postprocess_workers")
+    if postprocess_workers is None:
+        postprocess_workers = DEFAULT_POSTPROCESS_WORKERS
+    
+    # Jobs hand their transfer slot on while ffmpeg post-processes them; the
+    # pipeline's lock is shared by threads, so process workers stay serial
+    pipeline = None
+    if worker_mode == "process":
+        if postprocess_workers:
+            print('⚠️ Pipelined post-processing needs thread workers, post-processing inline')
+    else:
+        pipeline = PostprocessPipeline(max_workers, postprocess_workers, max_per_host, params.get("postprocess_backlog"))
+    extra_workers = postprocess_workers if pipeline else 0
+    
+    entry_filter = build_entry_filter(params.get("date_after"), params.get("date_before"), params.get("min_duration"), params.get("max_duration"))
+    
+    print(f'📦 Batch download: {len(urls)} URL(s), {max_workers} {worker_mode} worker(s), {max_per_host} per host'
+          + (f', {extra_workers} post-processing worker(s)' if extra_workers else ''))
+    
+    results = run_batch(
+        urls,
+        functools.partial(resolve_batch_url, ydl_opts=create_resolve_options(params, output_dir), entry_filter=entry_filter),
+        functools.partial(download_batch_item, params=params, output_dir=output_dir, pipeline=pipeline),
+        context,
+        max_workers=max_workers + extra_workers,
+        max_per_host=max_per_host + extra_workers,
+        worker_mode=worker_mode,
+        window=params.get("playlist_window"),
+    )
+    
+    skipped = [result for result in results if not result['error'] and result['info'].get('skipped')]
+    succeeded = [result for result in results if not result['error'] and not result['info'].get('skipped')]
+    failed = len(results) - len(succeeded) - len(skipped)
+    print(f'📦 Batch finished: {len(succeeded)} succeeded, {failed} failed, {len(skipped)} skipped by filters')
+    if failed and not succeeded:
+        raise ValueError(f"Batch download failed: no item could be downloaded ({len(results)} attempted)")
+    
+    info = dict(succeeded[0]['info']) if succeeded else {}
+    if pipeline:
+        info['pipeline'] = pipeline.report()
+        print(f'🔀 Network busy {info["pipeline"]["network_utilisation"]:.0%}, post-processing busy {info["pipeline"]["postprocess_utilisation"]:.0%} of {info["pipeline"]["seconds"]:.1f}s')
+    
+    return {
+        'video_path': succeeded[0]['video_path'] if succeeded else '',
+        'info': info,
+        'results': results
+    }
+
+
+def download_batch_item(url: str, info: typing.Optional[dict], reporter, params: Inputs, output_dir: str, pipeline=None) -> Outputs:
+    """Download a single batch item, run on a pool worker"""
+    if params.get("renditions"):
+        return download_renditions(url, params, output_dir, reporter, info, pipeline)
+    return download_video(url, params, output_dir, reporter, info, pipeline)
+
+
+def download_renditions(url: str, params: Inputs, output_dir: str, context, info: typing.Optional[dict] = None, pipeline=None) -> Outputs:
+    """Download several renditions of one video from a single extraction
+
+    Each rendition runs as its own download of the extracted info, with the
+    shared inputs overridden by its spec, and writes "<name> [<rendition>]".
+    A source stream is downloaded by the first rendition selecting it and
+    linked for the others, so e.g. the audio of a 1080p mp4 also feeds an
+    mp3 rendition.
+    """
+    renditions = parse_renditions(params.get("renditions"))
+    if info is None:
+        # Extract once; a playlist runs as a batch whose items each get every rendition
+        resolved = resolve_batch_url(url, create_resolve_options(params, output_dir))
+        if 'entries' in resolved:
+            resolved['entries'].close()
+            print(f'📃 {url} is a playlist, downloading its entries as a batch')
+            return download_batch(dict(params, url=url, urls=None), output_dir, context)
+        url, info = resolved.get('url') or url, resolved['info']
+    
+    # Video renditions go first, so renditions converting audio can take the audio they fetched
+    order = sorted(range(len(renditions)), key=lambda index: bool(renditions[index].get('audio_only')))
+    filename_template = params.get("filename_template") or get_default_filename_template()
+    # Streams are kept next to the partial files, on local scratch when downloads are staged
+    disk_io = create_disk_io_controller(url, output_dir, params.get("io_mode"), params.get("scratch_dir"), params.get("cache_dir"))
+    shared_streams = SharedStreams(disk_io.work_dir)
+    outputs = [None] * len(renditions)
+    try:
+        for position, index in enumerate(order):
+            spec = renditions[index]
+            print(f'🎚️ Rendition {spec["name"]}')
+            # Each rendition reports 0-100 on its own; the task's progress moves through their shares
+            progress = RenditionProgress(context, position, len(order))
+            result = download_video(url, get_rendition_params(params, spec, filename_template), output_dir, progress,
+                                    copy.deepcopy(info) if info is not None else None, pipeline, shared_streams)
+            outputs[index] = result
+    finally:
+        shared_streams.close()
+        disk_io.close()
+    
+    results = [
+        {
+            'name': spec['name'],
+            'video_path': result['video_path'],
+            'format_id': (result['info'].get('postprocessing') or {}).get('source_format'),
+        }
+        for spec, result in zip(renditions, outputs)
+    ]
+    first = outputs[0]
+    report = shared_streams.report()
+    print(f'🎚️ {len(renditions)} rendition(s) from {len(report["streams"])} stream(s), {report["bytes_reused"] / (1024 * 1024):.1f}MiB reused instead of downloaded again')
+    return {
+        'video_path': first['video_path'],
+        'info': dict(first['info'], renditions=results, shared_streams=report),
+        'renditions': results,
+        'sidecar_files': first.get('sidecar_files'),
+    }
+
+
+def download_video(url: str, params: Inputs, output_dir: str, context, info: typing.Optional[dict] = None, pipeline=None, shared_streams=None) -> Outputs:
+    """
+    Download a single video
+    
+    Args:
+        url: Video URL
+        params: Input parameters
+        output_dir: Directory to save the video in
+        context: Anything providing report_progress, usually the OOMOL context
+        info: Unprocessed extraction result, if the URL was already extracted
+        pipeline: The batch's PostprocessPipeline, if any
+        shared_streams: SharedStreams of the video's renditions, if any
+        
+    Returns:
+        Dictionary containing video path and information
+    """
+    # Spans of every phase end up in info['metrics'] and, optionally, a metrics file
+    metrics = create_job_metrics(params.get("metrics", True))
+    try:
+        result = run_download(url, params, output_dir, context, info, metrics, pipeline, shared_streams)
+    except Exception as e:
+        metrics.export(params.get("metrics_file"), metrics.report(url=url, status='error', error=str(e)))
+        raise
+    
+    # A playlist URL runs as a batch, whose items carry their own metrics
+    if metrics.enabled and 'results' not in result:
+        result['info']['metrics'] = metrics.report(url=url, status='ok')
+        metrics.export(params.get("metrics_file"), result['info']['metrics'])
+    return result
+
+
+def run_download(url: str, params: Inputs, output_dir: str, context, info: typing.Optional[dict], metrics, pipeline=None, shared_streams=None) -> Outputs:
+    """Download a single video, recording the phases of the job in metrics"""
     format_spec = params.get("format", "best")
     filename_template = params.get("filename_template")
     quality = params.get("quality", "best")
     audio_only = params.get("audio_only", False)
+    audio_format = params.get("audio_format") or "mp3"
+    container = params.get("container") or "mp4"
     subtitle_langs = params.get("subtitle_langs")
     proxy = params.get("proxy")
     hdr = params.get("hdr", False)
@@ -57,27 +297,109 @@ def main(params: Inputs, context: Context) -> Outputs:
     codec_preference = params.get("codec_preference")
     bitrate_limit = params.get("bitrate_limit")
     cookies_file = params.get("cookies_file")
+    info_only = params.get("info_only", False)
+    info_json = parse_info_json_mode(params.get("info_json"))
+    write_thumbnail = params.get("write_thumbnail", False)
+    entry_filter = build_entry_filter(params.get("date_after"), params.get("date_before"), params.get("min_duration"), params.get("max_duration"))
     
-    # Ensure output directory exists
-    ensure_output_dir(output_dir)
+    with metrics.span('cache_lookup'):
+        # Open the metadata cache, keyed by extractor and video ID
+        metadata_cache = None
+        cache_key = None
+        if params.get("metadata_cache", True):
+            metadata_cache = MetadataCache(params.get("cache_dir"))
+            cache_key = metadata_cache.resolve_key(url, proxy, cookies_file)
+    
+        # Open the archive of finished downloads
+        download_archive = None
+        if params.get("download_archive", True) and not info_only:
+            download_archive = DownloadArchive(params.get("cache_dir"), params.get("verify_archive_hash", False))
+    
+        # Info-only requests are served from cached metadata without network access
+        if info_only and metadata_cache:
+            metadata = metadata_cache.get_metadata(cache_key)
+            if metadata is not None:
+                print('💾 Using cached video information')
+                display_video_info(metadata, context)
+                video_info = prepare_video_info(metadata)
+                video_info['metadata_cache'] = metadata_cache.stats()
+                metadata_cache.close()
+                return {
+                    'video_path': '',
+                    'info': video_info
+                }
     
-    # Set default filename template
-    if not filename_template:
-        filename_template = get_default_filename_template()
+    # yt-dlp is only imported once the job needs it; cached info lookups never load it
+    with metrics.span('import'):
+        from .downloaders import TaskYoutubeDL, clip_report
+        from .handlers import OutputCollector, StagedMovePP
     
-    # Configure yt-dlp options
-    format_to_use = format_spec if format_spec != "best" else get_format_string(quality, audio_only, hdr, high_fps, codec_preference, bitrate_limit)
-    ydl_opts = create_ydl_options(output_dir, filename_template, format_to_use, proxy, cookies_file)
+    with metrics.span('setup'):
+        # Set default filename template
+        if not filename_template:
+            filename_template = get_default_filename_template()
     
-    # Configure audio and subtitle options
-    ydl_opts = configure_audio_options(ydl_opts, audio_only)
-    ydl_opts = configure_subtitle_options(ydl_opts, subtitle_langs)
+        # Configure yt-dlp options
+        format_to_use = format_spec if format_spec != "best" else get_format_string(quality, audio_only, hdr, high_fps, codec_preference, bitrate_limit)
+        ydl_opts = create_ydl_options(output_dir, filename_template, format_to_use, proxy, cookies_file)
     
-    # Create progress hook
-    progress_hook = create_progress_hook(context)
-    ydl_opts['progress_hooks'] = [progress_hook]
+        # Configure audio, container and subtitle options
+        ydl_opts = configure_audio_options(ydl_opts, audio_only, audio_format)
+        # Audio that is converted anyway can come from a stream another rendition downloaded
+        shared_audio = shared_streams.audio_stream() if shared_streams and audio_only and audio_format != "best" else None
+        if shared_audio:
+            ydl_opts['format'] = f'{shared_audio}/{ydl_opts["format"]}'
+        ydl_opts = configure_container_options(ydl_opts, audio_only, container)
+        ydl_opts = configure_subtitle_options(ydl_opts, subtitle_langs)
+        ydl_opts = configure_sidecar_options(ydl_opts, info_json)
+        ydl_opts = configure_rate_options(ydl_opts, params.get("cache_dir"), params.get("rate_limit"), params.get("max_requests_per_host"))
+        ydl_opts = configure_retry_options(ydl_opts, params.get("cache_dir"))
+        ydl_opts = configure_clip_options(ydl_opts, params.get("start_time"), params.get("end_time"), params.get("time_ranges"))
+        clipping = 'download_ranges' in ydl_opts
+        # An archive entry holds one file, so only single clips are archived
+        archivable = not clipping or len(ydl_opts['download_ranges'].ranges) == 1
+    
+        # Only the extractors known for the URL's host are loaded
+        ydl_opts['extractor_index'] = {'state_dir': params.get("cache_dir")}
+    
+        # The progress hook is added once the streams to download are known
+        ydl_opts['progress_hooks'] = []
+    
+        # Fragment concurrency for HLS/DASH streams: fixed, or adapted per host from measured throughput
+        concurrent_fragments = params.get("concurrent_fragments") or "auto"
+        fragment_controller = create_fragment_controller(url, concurrent_fragments, params.get("max_concurrent_fragments"), params.get("cache_dir"))
+        if fragment_controller:
+            fragment_controller.bind(ydl_opts)
+        else:
+            ydl_opts['concurrent_fragment_downloads'] = parse_fragment_concurrency(concurrent_fragments)
+    
+        # Partial and intermediate files go to local scratch when the output directory is slow to write to
+        disk_io = create_disk_io_controller(url, output_dir, params.get("io_mode"), params.get("scratch_dir"), params.get("cache_dir"))
+        disk_io.bind(ydl_opts)
+    
+        # Progressive files are fetched as byte ranges over several connections
+        ydl_opts['download_connections'] = params.get("download_connections") or 4
+    
+        # Journal the job, so a re-run after a crash resumes instead of restarting
+        job_journal = None
+        job_key = None
+        journal_entry = None
+        # Clip file names depend on their range, which the journal does not track
+        if params.get("resume_jobs", True) and not info_only and not clipping:
+            job_journal = JobJournal(params.get("cache_dir"), (params.get("stale_partial_days") or 7) * 24 * 3600)
+            job_key = get_job_key(url, ydl_opts)
+            # Never touch the files of an identical download that is still running
+            if job_journal.claim(job_key):
+                journal_entry = job_journal.get(job_key)
+                ydl_opts['progress_hooks'].append(job_journal.progress_hook(job_key))
+                ydl_opts['postprocessor_hooks'] = [job_journal.postprocessor_hook(job_key)]
+            else:
+                print('⚠️ An identical download is already running; this one is not resumed or journaled')
+                job_journal.close()
+                job_journal = None
+        ydl_opts = metrics.bind(ydl_opts)
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with TaskYoutubeDL(ydl_opts) as ydl:
             # Display cookie status
             if cookies_file:
                 if os.path.isfile(cookies_file):
@@ -87,51 +409,269 @@ def main(params: Inputs, context: Context) -> Outputs:
             
             # Get video information first
             print('🔍 Extracting video information...')
-            info = ydl.extract_info(url, download=False)
+            extraction_start = time.perf_counter()
+            with metrics.span('extraction') as span:
+                span['source'] = 'provided' if info is not None else None
+                if info is None and journal_entry and journal_entry['info']:
+                    info = journal_entry['info']
+                    span['source'] = 'journal'
+                    print(f'♻️ Resuming interrupted download (stage: {journal_entry["stage"]})')
+                if info is None and metadata_cache:
+                    info = metadata_cache.get_info(cache_key)
+                    if info is not None:
+                        span['source'] = 'cache'
+                        print('💾 Using cached video information')
+                if info is None:
+                    span['source'] = 'extractor'
+                    # Unprocessed, so the entries of a playlist are not all extracted up front
+                    info = ydl.extract_info(url, download=False, process=False)
+                    if is_playlist_result(info):
+                        span['source'] = 'playlist'
+                    else:
+                        info = ydl.process_ie_result(info, download=False)
+                        if metadata_cache:
+                            metadata_cache.put(cache_key, ydl.sanitize_info(info, remove_private_keys=True))
+                else:
+                    info = ydl.process_ie_result(info, download=False)
+            extraction_time = time.perf_counter() - extraction_start
+            
+            # Playlists stream through the batch pipeline, entry by entry
+            if is_playlist_result(info):
+                print(f'📃 {url} is a playlist, downloading its entries as a batch')
+                return download_batch(dict(params, url=url, urls=None), output_dir, context)
+            
+            # Display, format analysis and outputs read a compact record of the info
+            record = InfoRecord(info)
+            skip_reason = check_entry(entry_filter, info)
+            if skip_reason:
+                print(f'⏭️ Skipping {record.get("title", url)}: {skip_reason}')
+                return {
+                    'video_path': '',
+                    'info': dict(prepare_video_info(record), skipped=skip_reason)
+                }
+            display_video_info(record, context)
+            
+            if info_only:
+                video_info = prepare_video_info(record)
+                if metadata_cache:
+                    video_info['metadata_cache'] = metadata_cache.stats()
+                return {
+                    'video_path': '',
+                    'info': video_info
+                }
+            
+            def select_formats(preferred_format=None):
+                """Resolve the selected formats and plan post-processing from their codecs"""
+                ydl_opts['format'] = requested_format
+                # Try to get optimal format for HD content
+                if format_spec == "best" and not audio_only and (quality in QUALITY_HEIGHTS or preferred_format):
+                    optimal_format = get_optimal_format_for_hd(record, quality, hdr, high_fps, codec_preference, bitrate_limit, preferred_format)
+                    if optimal_format:
+                        ydl_opts['format'] = optimal_format
+                        if not preferred_format:
+                            print(f'🎯 Using optimized format for {quality} quality')
+            
+                # Keep the formats of the interrupted run, so its partial streams stay usable
+                if journal_entry and journal_entry['format']:
+                    ydl_opts['format'] = journal_entry['format']
             
-            # Display video information
-            display_video_info(info, context)
+                # The selector compiled when ydl was created predates the final format
+                ydl.format_selector = ydl.build_format_selector(ydl_opts['format'])
+                selected = ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=False)
+                plan = plan_postprocessing(selected, audio_only, audio_format, container)
+                apply_postprocessing_plan(ydl_opts, plan)
+                return selected, plan
             
-            # Try to get optimal format for HD content
-            if format_spec == "best" and quality in ['4K', '2160p', '1440p', '1080p']:
-                optimal_format = get_optimal_format_for_hd(info, quality, hdr, high_fps, codec_preference)
-                if optimal_format:
-                    ydl_opts['format'] = optimal_format
-                    print(f'🎯 Using optimized format for {quality} quality')
+            requested_format = ydl_opts['format']
+            with metrics.span('format_selection') as span:
+                planned, postprocess_plan = select_formats()
+                span['format'] = planned.get('format_id')
+            
+            # Look up an earlier identical download, keyed on the selection without a source probe,
+            # so the key does not depend on which source answered faster
+            archive_key = None
+            with metrics.span('archive_lookup'):
+                if download_archive and archivable:
+                    archive_key = get_archive_key(planned, ydl_opts)
+                    archived = download_archive.fetch(archive_key, output_dir) if archive_key else None
+                    if archived:
+                        print(f'📦 Already downloaded, reusing archived file ({archived["method"]}): {archived["path"]}')
+                        if job_journal:
+                            job_journal.finish(job_key)
+                        video_info = prepare_video_info(record)
+                        video_info['archive_hit'] = True
+                        return {
+                            'video_path': archived['path'],
+                            'info': video_info
+                        }
+            
+            # Probe the sources of equivalent formats and prefer the fastest
+            source_probe = None
+            source_prober = create_source_prober(params.get("probe_sources", False), params.get("cache_dir"))
+            if source_prober and format_spec == "best" and not audio_only and not (journal_entry and journal_entry['format']):
+                with metrics.span('source_probe') as span:
+                    equivalent_ids = get_equivalent_formats(record, quality, hdr, high_fps, codec_preference, bitrate_limit, params.get("probe_candidates") or DEFAULT_PROBE_CANDIDATES)
+                    formats_by_id = {fmt.get('format_id'): fmt for fmt in info.get('formats') or []}
+                    source_probe = source_prober.choose(ydl, [formats_by_id[format_id] for format_id in equivalent_ids if format_id in formats_by_id], record.get('duration'))
+                    if source_probe:
+                        span['probed'] = source_probe['probed']
+                        if source_probe['chosen'] != source_probe['default']:
+                            print(f'📡 Probed {len(source_probe["candidates"])} sources, using format {source_probe["chosen"]} instead of {source_probe["default"]}')
+                        else:
+                            print(f'📡 Probed {len(source_probe["candidates"])} sources, keeping format {source_probe["default"]}')
+            
+            if source_probe and source_probe['chosen'] != source_probe['default']:
+                with metrics.span('format_selection', probed=True) as span:
+                    planned, postprocess_plan = select_formats(source_probe['chosen'])
+                    span['format'] = planned.get('format_id')
+            
+            # Only the selected formats are needed from here on; release the rest
+            info = slim_info(info, planned)
+            planned = slim_info(planned, planned)
+            if fragment_controller:
+                # What is learned belongs to the CDN serving the fragments, not the page's site
+                fragment_controller.use_host(get_fragment_host(planned))
+            # yt-dlp drops requested_formats from each stream's info, so the hook gets them up front
+            progress_hook = create_progress_hook(context, planned.get('requested_formats') or [planned])
+            ydl_opts['progress_hooks'].insert(0, progress_hook)
+            print(f'🎞️ Post-processing: {postprocess_plan["action"]} ({postprocess_plan["reason"]}), estimated {postprocess_plan["estimated_seconds"]:.1f}s')
+            postprocess_timer = PostprocessTimer()
+            ydl_opts.setdefault('postprocessor_hooks', []).append(postprocess_timer)
             
             # Display download start information
             display_download_info(quality, hdr, high_fps, codec_preference, context)
             
-            # Update ydl_opts with final format
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl_final:
-                ydl_final.download([url])
+            # Download with the final format, reusing the extracted info
+            output_collector = OutputCollector()
+            pipeline_job = pipeline.job(get_url_host(url)) if pipeline else None
+            if pipeline_job:
+                ydl_opts['postprocess_pipeline'] = pipeline_job
+            if shared_streams:
+                ydl_opts['shared_streams'] = shared_streams
+            with TaskYoutubeDL(ydl_opts) as ydl_final:
+                ydl_final.add_post_processor(output_collector, when='after_move')
+                if disk_io.staged:
+                    ydl_final.add_post_processor(StagedMovePP(disk_io), when='post_process')
+                if fragment_controller:
+                    fragment_controller.attach(ydl_final)
+                resumed = None
+                if job_journal:
+                    if journal_entry:
+                        # Continue the interrupted run's partial files; finished outputs are not redone
+                        adopted = job_journal.adopt(journal_entry, disk_io.work_dir)
+                        ydl_final.params['nopostoverwrites'] = True
+                        if adopted:
+                            print(f'♻️ Adopted {adopted} file(s) of the interrupted run from {journal_entry["work_dir"]}')
+                        resumed = {
+                            'stage': journal_entry['stage'],
+                            'adopted_files': adopted,
+                            'streams': journal_entry['streams'],
+                            'postprocessors': journal_entry['postprocessors'],
+                        }
+                    stem = os.path.splitext(os.path.basename(ydl_final.prepare_filename(info)))[0]
+                    job_journal.start(job_key, url, disk_io.work_dir, stem, ydl_opts['format'], ydl_final.sanitize_info(info, remove_private_keys=True))
+                # The thumbnail is fetched while the media downloads
+                thumbnail_fetcher = None
+                if pipeline_job:
+                    with metrics.span('transfer_slot'):
+                        pipeline_job.begin_transfer()
+                if write_thumbnail:
+                    thumbnail_fetcher = start_thumbnail_fetch(ydl_final, planned, os.path.splitext(ydl_final.prepare_filename(planned))[0])
+                try:
+                    with metrics.span('download'):
+                        info_reused = download_with_info(ydl_final, info, url, planned)
+                finally:
+                    thumbnail = thumbnail_fetcher.wait() if thumbnail_fetcher else None
+                    if pipeline_job:
+                        pipeline_job.finish()
+            clips = clip_report(ydl_final.clips, [output['filepath'] for output in output_collector.outputs if output['filepath']]) if ydl_final.clips else None
+            if clips:
+                saved = f', {clips["bytes_saved"] / (1024 * 1024):.1f}MiB less than the full video' if clips['bytes_saved'] is not None else ''
+                print(f'✂️ Downloaded {len(clips["ranges"])} clip(s), {clips["downloaded_bytes"] / (1024 * 1024):.1f}MiB{saved}')
+            if info_reused:
+                print(f'⚡ Reused extracted info, saved {extraction_time:.2f}s of re-extraction')
+            disk_io.close()
+            disk_io_report = disk_io.report()
+            if disk_io_report['moved_files']:
+                print(f'💽 Moved {disk_io_report["moved_files"]} staged file(s), {disk_io_report["moved_bytes"] / (1024 * 1024):.1f}MiB, into the output directory in {disk_io_report["move_seconds"]:.2f}s ({disk_io_report["move_method"]})')
             
-            # Get actual downloaded file path
-            filename = ydl.prepare_filename(info)
-            if audio_only:
-                # If audio only, extension will become .mp3
-                base_name = os.path.splitext(filename)[0]
-                filename = base_name + '.mp3'
+            with metrics.span('find_output'):
+                # Use the exact final paths reported by yt-dlp
+                output_files = output_collector.primary
+                if output_files:
+                    filename = output_files['filepath']
+                else:
+                    # Nothing was reported (e.g. the download was skipped), fall back to guessing
+                    filename = ydl.prepare_filename(info)
+                    if postprocess_plan['ext']:
+                        # Post-processing may have changed the extension
+                        base_name = os.path.splitext(filename)[0]
+                        filename = base_name + '.' + postprocess_plan['ext']
+                
+                    title = info.get('title', 'video')
+                    ext = postprocess_plan['ext'] or info.get('ext', 'mp4')
+                    filename = find_downloaded_file(filename, output_dir, title, audio_only, ext)
+            
+            with metrics.span('sidecars'):
+                sidecar_files = output_files or {'filepath': filename, 'info_json': None, 'thumbnails': [], 'subtitles': {}}
+                if info_json == 'compact' and filename:
+                    sidecar_files['info_json'] = write_compact_info_json(os.path.splitext(filename)[0] + '.info.json', info, planned)
+                if thumbnail and thumbnail['filepath']:
+                    sidecar_files['thumbnails'].append(thumbnail['filepath'])
             
-            # Find the actual downloaded file
-            title = info.get('title', 'video')
-            ext = info.get('ext', 'mp4')
-            filename = find_downloaded_file(filename, output_dir, title, audio_only, ext)
+            # Record the download so later identical requests can skip it
+            if archive_key and os.path.isfile(filename):
+                download_archive.record(archive_key, filename)
+            if job_journal:
+                job_journal.finish(job_key)
             
             # Prepare output information
-            video_info = prepare_video_info(info)
+            video_info = prepare_video_info(record)
+            video_info['extraction_time'] = round(extraction_time, 3)
+            video_info['extraction_time_saved'] = round(extraction_time, 3) if info_reused else 0.0
+            video_info['download_stats'] = progress_hook.snapshot()
+            if fragment_controller:
+                video_info['fragment_concurrency'] = fragment_controller.report()
+            else:
+                video_info['fragment_concurrency'] = {'mode': 'fixed', 'settled': ydl_opts['concurrent_fragment_downloads']}
+            if metadata_cache:
+                video_info['metadata_cache'] = metadata_cache.stats()
+            if resumed:
+                video_info['resumed'] = resumed
+            if source_probe:
+                video_info['source_probe'] = source_probe
+            if clips:
+                video_info['clips'] = clips
+            video_info['disk_io'] = disk_io_report
+            video_info['postprocessing'] = {
+                'action': postprocess_plan['action'],
+                'reason': postprocess_plan['reason'],
+                'source_format': postprocess_plan['source'],
+                'output_ext': postprocess_plan['ext'] or os.path.splitext(filename)[1][1:],
+                'estimated_seconds': postprocess_plan['estimated_seconds'],
+                'seconds': postprocess_timer.report(),
+            }
+            video_info['sidecars'] = {
+                'info_json': info_json,
+                'thumbnail': thumbnail,
+                'bytes': sum(os.path.getsize(path) for path in [sidecar_files['info_json'], *sidecar_files['thumbnails']] if path),
+            }
             
             return {
                 'video_path': filename,
-                'info': video_info
+                'info': video_info,
+                'sidecar_files': sidecar_files
             }
             
     except Exception as e:
         error_msg = str(e)
         print(f'❌ Download failed: {error_msg}')
 
-        # Provide helpful error messages for common issues
-        if '403' in error_msg or 'Forbidden' in error_msg:
+        # Provide helpful error messages for common issues, by the classified cause
+        from .downloaders import classify_error
+        error = classify_error(e)
+        reason = error['reason']
+        if reason == 'forbidden':
             print('\n💡 Troubleshooting tips for 403 Forbidden error:')
             print('━' * 60)
             print('This error means the server is refusing to serve the video.')
@@ -153,9 +693,23 @@ def main(params: Inputs, context: Context) -> Outputs:
             print('\n🔗 Video URL: ' + url)
             print('━' * 60)
             raise ValueError("403 Forbidden: Video requires authentication or is geo-restricted. Use cookies/proxy to access.")
-        elif '404' in error_msg:
-            raise ValueError(f"Video not found (404). Please check if the URL is correct and the video still exists.")
-        elif 'Unable to extract' in error_msg or 'Unsupported URL' in error_msg:
+        elif reason in ('not_found', 'gone'):
+            raise ValueError(f"Video not found ({error['status']}). Please check if the URL is correct and the video still exists.")
+        elif reason in ('extraction', 'unsupported', 'login_required'):
             raise ValueError(f"Unable to extract video information. The URL might not be supported or the video is private.")
+        elif reason == 'geo_restricted':
+            raise ValueError("Video is not available in your region. Use a proxy to access it.")
+        elif reason == 'circuit_open':
+            raise ValueError(f"Video download failed: {error_msg}, after repeated failures from the site.")
+        elif error['kind'] == 'throttled':
+            wait = f" in {error['retry_after']:.0f}s" if error['retry_after'] else " in a few minutes"
+            raise ValueError(f"The site is rate limiting downloads (HTTP {error['status']}). Try again{wait} or lower max_workers.")
         else:
-            raise ValueError(f"Video download failed: {error_msg}")
\ No newline at end of file
+            raise ValueError(f"Video download failed: {error_msg}")
+    finally:
+        if metadata_cache:
+            metadata_cache.close()
+        if download_archive:
+            download_archive.close()
+        if job_journal:
+            job_journal.close()
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""Cache module for video downloader"""
+
+from .metadata_cache import MetadataCache, get_cache_key
+from ..utils.file_utils import get_default_cache_dir
+from .download_archive import DownloadArchive, get_archive_key
+from .job_journal import JobJournal, get_job_key
+
+__all__ = [
+    'MetadataCache',
+    'get_cache_key',
+    'get_default_cache_dir',
+    'DownloadArchive',
+    'get_archive_key',
+    'JobJournal',
+    'get_job_key'
+]
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""Content-addressed archive of finished downloads"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..utils.file_utils import get_default_cache_dir
+
+# Entries whose files have disappeared are collected at most this often
+GC_INTERVAL_SECONDS = 24 * 3600
+
+# FICLONE ioctl request number on Linux, used for reflink copies
+FICLONE = 0x40049409
+
+# Options that change the produced file, beyond the selected formats
+POSTPROCESSING_OPTION_KEYS = (
+    'postprocessors', 'merge_output_format', 'writesubtitles', 'writeautomaticsub',
+    'subtitleslangs', 'embed_subs', 'download_ranges',
+)
+
+
+def get_archive_key(info: Dict[str, Any], ydl_opts: Dict[str, Any]) -> Optional[str]:
+    """Build an archive key from extractor, video ID, format IDs and post-processing options"""
+    extractor = info.get('extractor_key') or info.get('extractor')
+    video_id = info.get('id')
+    format_id = info.get('format_id')
+    if not (extractor and video_id and format_id):
+        return None
+
+    options = {key: ydl_opts.get(key) for key in POSTPROCESSING_OPTION_KEYS}
+    options_hash = hashlib.sha1(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f'{extractor}:{video_id}:{format_id}:{options_hash}'
+
+
+def hash_file(path: str) -> str:
+    """Compute the SHA-256 content hash of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_file(source: str, target: str) -> str:
+    """Hard-link, reflink or copy a file, in that order of preference
+
+    Returns:
+        The method that was used
+    """
+    try:
+        os.link(source, target)
+        return 'hardlink'
+    except OSError:
+        pass
+
+    try:
+        import fcntl
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, target)
+        return 'reflink'
+    except (ImportError, OSError):
+        if os.path.exists(target):
+            os.remove(target)
+
+    shutil.copy2(source, target)
+    return 'copy'
+
+
+class DownloadArchive:
+    """SQLite-backed index of downloaded files, shared between processes"""
+
+    def __init__(self, cache_dir: Optional[str] = None, verify_hash: bool = False):
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.verify_hash = verify_hash
+
+        Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(
+            os.path.join(self.cache_dir, 'archive.sqlite3'), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS downloads (
+                key TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha256 TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL NOT NULL)')
+        self._maybe_collect_garbage()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the archived entry for a key if its file is still intact"""
+        row = self.conn.execute('SELECT path, size, mtime, sha256 FROM downloads WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        path, size, mtime, sha256 = row
+        if not self._is_intact(path, size, mtime, sha256):
+            self.conn.execute('DELETE FROM downloads WHERE key = ?', (key,))
+            return None
+
+        return {'path': path, 'size': size, 'sha256': sha256}
+
+    def fetch(self, key: str, output_dir: str) -> Optional[Dict[str, Any]]:
+        """Make an archived file available in output_dir
+
+        Returns:
+            Dictionary with the resulting ``path`` and the ``method`` used,
+            or None if the key is not archived
+        """
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+
+        source = entry['path']
+        target = os.path.join(output_dir, os.path.basename(source))
+        if os.path.exists(target):
+            if os.path.samefile(source, target):
+                return {'path': os.path.abspath(target), 'method': 'existing'}
+            # Never overwrite an unrelated file; serve the archived copy instead
+            return {'path': source, 'method': 'archived'}
+
+        return {'path': os.path.abspath(target), 'method': link_file(source, target)}
+
+    def record(self, key: str, path: str) -> None:
+        """Record a finished download"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?)',
+            (key, path, stat.st_size, stat.st_mtime, hash_file(path), time.time()),
+        )
+
+    def collect_garbage(self) -> int:
+        """Remove entries whose files have disappeared or changed
+
+        Returns:
+            Number of removed entries
+        """
+        removed = 0
+        for key, path, size, mtime in self.conn.execute('SELECT key, path, size, mtime FROM downloads').fetchall():
+            if not self._is_intact(path, size, mtime):
+                self.conn.execute('DELETE FROM downloads WHERE key = ?', (key,))
+                removed += 1
+
+        self.conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('last_gc', time.time()))
+        return removed
+
+    def _maybe_collect_garbage(self) -> None:
+        row = self.conn.execute('SELECT value FROM meta WHERE name = ?', ('last_gc',)).fetchone()
+        if row is None or time.time() - row[0] > GC_INTERVAL_SECONDS:
+            removed = self.collect_garbage()
+            if removed:
+                print(f'🧹 Removed {removed} stale download archive entries')
+
+    def _is_intact(self, path: str, size: int, mtime: float, sha256: Optional[str] = None) -> bool:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        if stat.st_size != size or stat.st_mtime != mtime:
+            return False
+
+        if self.verify_hash and sha256 is not None:
+            return hash_file(path) == sha256
+
+        return True
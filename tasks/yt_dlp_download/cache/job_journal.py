@@ -0,0 +1,286 @@
+"""Crash-safe journal of unfinished download jobs"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .metadata_cache import normalize_url
+from ..utils.file_utils import get_default_cache_dir
+from ..utils.state_file import try_lock, unlock
+
+# Unfinished jobs untouched for this long have their partial files removed
+DEFAULT_STALE_SECONDS = 7 * 24 * 3600
+
+# Stale jobs are collected at most this often
+GC_INTERVAL_SECONDS = 24 * 3600
+
+# Per-stream progress is written at most this often
+PROGRESS_WRITE_INTERVAL_SECONDS = 2.0
+
+# Options that do not change what a job produces
+VOLATILE_OPTION_KEYS = (
+    'outtmpl', 'progress_hooks', 'postprocessor_hooks', 'retry_sleep_functions', 'rate_scheduler', 'retry_policy',
+    'concurrent_fragment_downloads', 'download_connections', 'nopostoverwrites', 'extractor_index', 'paths', 'buffersize',
+)
+
+# Suffixes of files yt-dlp leaves behind for an unfinished download
+PARTIAL_SUFFIXES = ('.part', '.ytdl', '.segments')
+
+
+def get_job_key(url: str, ydl_opts: Dict[str, Any]) -> str:
+    """Build a job key from the normalized URL and the resolved yt-dlp options
+
+    The output directory is left out, so a retry in a new session directory
+    finds the job of the interrupted run.
+    """
+    options = {key: value for key, value in ydl_opts.items() if key not in VOLATILE_OPTION_KEYS}
+    options['outtmpl'] = os.path.basename(str(ydl_opts.get('outtmpl', '')))
+    payload = json.dumps([normalize_url(url), options], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def is_partial_file(path: str) -> bool:
+    """Check whether a file is an unfinished download (.part, fragments, state)"""
+    name = os.path.basename(path)
+    return name.endswith(PARTIAL_SUFFIXES) or '.part-Frag' in name or '.temp.' in name
+
+
+def find_job_files(work_dir: str, stem: str) -> List[str]:
+    """Return the files a job created in its working directory"""
+    return [
+        path for path in glob.glob(os.path.join(glob.escape(work_dir), glob.escape(stem) + '.*'))
+        if os.path.isfile(path)
+    ]
+
+
+class JobJournal:
+    """SQLite-backed journal of jobs that have started but not finished
+
+    Every stage change is committed immediately (WAL mode), so the journal
+    survives the process being killed. A re-run of the same job adopts the
+    partial and finished files of the interrupted run, so yt-dlp resumes
+    ``.part`` files and skips outputs (merged files, extracted audio) that
+    already exist.
+
+    A run owns its job through an exclusive lock on a per-job lock file
+    (see claim), which the OS releases when the process exits, however it
+    exits. A job is only adopted, or collected as stale, once its owner is
+    gone.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, stale_seconds: float = DEFAULT_STALE_SECONDS):
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.stale_seconds = stale_seconds
+        self.lock = threading.Lock()
+        self.progress_written_at: Dict[str, float] = {}
+        self.claims: Dict[str, Any] = {}
+
+        Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(
+            os.path.join(self.cache_dir, 'jobs.sqlite3'), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                work_dir TEXT NOT NULL,
+                stem TEXT NOT NULL,
+                format TEXT,
+                info BLOB,
+                stage TEXT NOT NULL,
+                streams TEXT NOT NULL DEFAULT '{}',
+                postprocessors TEXT NOT NULL DEFAULT '[]',
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL NOT NULL)')
+        self._maybe_collect_garbage()
+
+    def close(self) -> None:
+        for key in list(self.claims):
+            self.release(key)
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def claim(self, key: str) -> bool:
+        """Take ownership of a job until it finishes or the journal is closed
+
+        Returns:
+            False if a live run, in this or another process, owns the job
+        """
+        if key in self.claims:
+            return True
+        path = self._lock_path(key)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            lock_file = open(path, 'a+')
+            if not try_lock(lock_file):
+                lock_file.close()
+                return False
+            # The previous owner may have removed the lock file before we locked it
+            try:
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino:
+                    break
+            except OSError:
+                pass
+            unlock(lock_file)
+            lock_file.close()
+        self.claims[key] = lock_file
+        return True
+
+    def release(self, key: str, remove: bool = False) -> None:
+        """Give up ownership of a job, e.g. when the run fails and leaves it to a retry"""
+        lock_file = self.claims.pop(key, None)
+        if lock_file is None:
+            return
+        if remove:
+            try:
+                os.remove(self._lock_path(key))
+            except OSError:
+                pass
+        unlock(lock_file)
+        lock_file.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the journal entry of an unfinished job"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT url, work_dir, stem, format, info, stage, streams, postprocessors FROM jobs WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        url, work_dir, stem, format_spec, info, stage, streams, postprocessors = row
+        return {
+            'url': url,
+            'work_dir': work_dir,
+            'stem': stem,
+            'format': format_spec,
+            'info': json.loads(zlib.decompress(info)) if info else None,
+            'stage': stage,
+            'streams': json.loads(streams),
+            'postprocessors': json.loads(postprocessors),
+        }
+
+    def start(self, key: str, url: str, work_dir: str, stem: str, format_spec: str, info: Dict[str, Any]) -> None:
+        """Record the extraction result and chosen formats of a job about to download"""
+        blob = zlib.compress(json.dumps(info, separators=(',', ':'), default=str).encode())
+        with self.lock:
+            self.conn.execute('''
+                INSERT INTO jobs (key, url, work_dir, stem, format, info, stage, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, 'extracted', ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    work_dir = excluded.work_dir, stem = excluded.stem, format = excluded.format,
+                    info = excluded.info, updated_at = excluded.updated_at
+            ''', (key, url, os.path.abspath(work_dir), stem, format_spec, blob, time.time()))
+
+    def adopt(self, entry: Dict[str, Any], output_dir: str) -> int:
+        """Move the files of an interrupted run into the new output directory
+
+        Only call this while holding the job's claim, which proves the run
+        that wrote the files is gone.
+
+        Returns:
+            Number of adopted files
+        """
+        work_dir = entry['work_dir']
+        if not os.path.isdir(work_dir) or os.path.abspath(work_dir) == os.path.abspath(output_dir):
+            return 0
+
+        adopted = 0
+        for path in find_job_files(work_dir, entry['stem']):
+            target = os.path.join(output_dir, os.path.basename(path))
+            if not os.path.exists(target):
+                shutil.move(path, target)
+                adopted += 1
+        return adopted
+
+    def progress_hook(self, key: str):
+        """Return a progress hook recording per-stream byte offsets of a job"""
+        def hook(d: Dict[str, Any]) -> None:
+            stream = str((d.get('info_dict') or {}).get('format_id') or os.path.basename(d.get('filename') or ''))
+            finished = d.get('status') == 'finished'
+            now = time.monotonic()
+            if not finished and now - self.progress_written_at.get(stream, 0) < PROGRESS_WRITE_INTERVAL_SECONDS:
+                return
+            self.progress_written_at[stream] = now
+
+            progress = {
+                'downloaded_bytes': d.get('downloaded_bytes'),
+                'total_bytes': d.get('total_bytes') or d.get('total_bytes_estimate'),
+                'finished': finished,
+            }
+            with self.lock:
+                self.conn.execute('''
+                    UPDATE jobs SET stage = 'downloading', streams = json_set(streams, '$."' || ? || '"', json(?)), updated_at = ?
+                    WHERE key = ?
+                ''', (stream, json.dumps(progress), time.time(), key))
+        return hook
+
+    def postprocessor_hook(self, key: str):
+        """Return a post-processor hook recording completed post-processing steps"""
+        def hook(d: Dict[str, Any]) -> None:
+            if d.get('status') != 'finished':
+                return
+            with self.lock:
+                self.conn.execute('''
+                    UPDATE jobs SET stage = 'postprocessing', postprocessors = json_insert(postprocessors, '$[#]', ?), updated_at = ?
+                    WHERE key = ?
+                ''', (d.get('postprocessor'), time.time(), key))
+        return hook
+
+    def finish(self, key: str) -> None:
+        """Forget a job that completed; nothing is left to resume"""
+        with self.lock:
+            self.conn.execute('DELETE FROM jobs WHERE key = ?', (key,))
+        self.release(key, remove=True)
+
+    def collect_garbage(self) -> int:
+        """Remove the partial files and entries of jobs that went stale
+
+        Returns:
+            Number of removed jobs
+        """
+        cutoff = time.time() - self.stale_seconds
+        removed = 0
+        with self.lock:
+            rows = self.conn.execute('SELECT key, work_dir, stem FROM jobs WHERE updated_at < ?', (cutoff,)).fetchall()
+            for key, work_dir, stem in rows:
+                # A run that is still going is not stale, however long since its last update
+                if key in self.claims or not self.claim(key):
+                    continue
+                for path in find_job_files(work_dir, stem):
+                    if is_partial_file(path):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                self.conn.execute('DELETE FROM jobs WHERE key = ?', (key,))
+                self.release(key, remove=True)
+                removed += 1
+            self.conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('last_gc', time.time()))
+        return removed
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, 'jobs', f'{key}.lock')
+
+    def _maybe_collect_garbage(self) -> None:
+        row = self.conn.execute('SELECT value FROM meta WHERE name = ?', ('last_gc',)).fetchone()
+        if row is None or time.time() - row[0] > GC_INTERVAL_SECONDS:
+            removed = self.collect_garbage()
+            if removed:
+                print(f'🧹 Removed partial files of {removed} stale unfinished jobs')
@@ -0,0 +1,249 @@
+"""Persistent metadata cache for extracted video information"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from ..handlers.download_handler import get_url_expiry
+from ..utils.file_utils import get_default_cache_dir
+
+# Default time-to-live for stable metadata (title, duration, uploader, ...)
+DEFAULT_METADATA_TTL = 7 * 24 * 3600
+
+# Default time-to-live for extracted format URLs, which are usually signed
+DEFAULT_FORMATS_TTL = 3600
+
+# Default size bound of the cache database content
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Fields that rarely change for a given video
+STABLE_FIELDS = (
+    'id', 'title', 'duration', 'uploader', 'view_count', 'upload_date',
+    'webpage_url', 'thumbnail', 'extractor', 'extractor_key',
+)
+
+# Format fields read by the formatters and handlers
+FORMAT_FIELDS = (
+    'format_id', 'ext', 'height', 'width', 'fps', 'vcodec', 'acodec',
+    'dynamic_range', 'tbr', 'abr', 'filesize',
+)
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL: lowercase scheme and host, sorted query, no fragment"""
+    parsed = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path, '', query, ''))
+
+
+def get_video_key(url: str, state_dir: Optional[str] = None) -> str:
+    """Build a key from the extractor and video ID, or the normalized URL"""
+    from yt_dlp.extractor import get_info_extractor
+    from ..downloaders.extractor_index import GENERIC_KEY, get_extractor_index
+
+    for ie_key in get_extractor_index(state_dir).extractor_keys(url):
+        if ie_key == GENERIC_KEY:
+            break
+        video_id = get_info_extractor(ie_key).get_temp_id(url)
+        if video_id:
+            return f'{ie_key}:{video_id}'
+        break
+
+    return f'url:{normalize_url(url)}'
+
+
+def add_key_variant(key: str, proxy: Optional[str] = None, cookies_file: Optional[str] = None) -> str:
+    """Make proxy and cookies part of a key, as they can change which formats an extractor returns"""
+    if proxy or cookies_file:
+        variant = hashlib.sha1(f'{proxy or ""}|{cookies_file or ""}'.encode()).hexdigest()[:12]
+        key = f'{key}#{variant}'
+    return key
+
+
+def get_cache_key(url: str, proxy: Optional[str] = None, cookies_file: Optional[str] = None, state_dir: Optional[str] = None) -> str:
+    """Build a cache key from the extractor and video ID, or the normalized URL"""
+    return add_key_variant(get_video_key(url, state_dir), proxy, cookies_file)
+
+
+def compact_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the stable fields and URL-free format descriptions"""
+    compact = {field: info.get(field) for field in STABLE_FIELDS if info.get(field) is not None}
+    compact['formats'] = [
+        {field: fmt.get(field) for field in FORMAT_FIELDS if fmt.get(field) is not None}
+        for fmt in info.get('formats') or []
+    ]
+    return compact
+
+
+def get_formats_expiry(info: Dict[str, Any], formats_ttl: int) -> float:
+    """Return when the extracted format URLs stop being usable"""
+    expires_at = time.time() + formats_ttl
+    for fmt in info.get('formats') or []:
+        expiry = get_url_expiry(fmt.get('url'))
+        if expiry is not None:
+            expires_at = min(expires_at, expiry)
+    return expires_at
+
+
+class MetadataCache:
+    """SQLite-backed cache of extraction results with TTL and LRU eviction
+
+    Each entry holds a compact record of the stable metadata and, with a
+    shorter TTL, the full extraction result including the signed format URLs.
+    SQLite locking makes the cache safe to share between processes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        metadata_ttl: int = DEFAULT_METADATA_TTL,
+        formats_ttl: int = DEFAULT_FORMATS_TTL,
+    ):
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.max_bytes = max_bytes
+        self.metadata_ttl = metadata_ttl
+        self.formats_ttl = formats_ttl
+        self.hits = 0
+        self.misses = 0
+
+        Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
+        self.db_path = os.path.join(self.cache_dir, 'metadata.sqlite3')
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                metadata TEXT NOT NULL,
+                metadata_expires_at REAL NOT NULL,
+                info BLOB,
+                formats_expires_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS aliases (url TEXT PRIMARY KEY, key TEXT NOT NULL, created_at REAL NOT NULL)')
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def resolve_key(self, url: str, proxy: Optional[str] = None, cookies_file: Optional[str] = None) -> str:
+        """Return the cache key of a URL
+
+        The key of a URL seen before is read from the cache, so a lookup
+        needs neither yt-dlp nor extractor matching.
+        """
+        normalized = normalize_url(url)
+        row = self.conn.execute(
+            'SELECT key FROM aliases WHERE url = ? AND created_at > ?', (normalized, time.time() - self.metadata_ttl)
+        ).fetchone()
+        if row:
+            key = row[0]
+        else:
+            key = get_video_key(url, self.cache_dir)
+            self.conn.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?, ?)', (normalized, key, time.time()))
+        return add_key_variant(key, proxy, cookies_file)
+
+    def get_info(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the full extraction result if its format URLs are still valid"""
+        now = time.time()
+        row = self.conn.execute(
+            'SELECT info FROM entries WHERE key = ? AND info IS NOT NULL AND formats_expires_at > ?',
+            (key, now),
+        ).fetchone()
+        return self._record_lookup(key, now, json.loads(zlib.decompress(row[0])) if row else None)
+
+    def get_metadata(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the compact metadata record if it has not expired"""
+        now = time.time()
+        row = self.conn.execute(
+            'SELECT metadata FROM entries WHERE key = ? AND metadata_expires_at > ?',
+            (key, now),
+        ).fetchone()
+        return self._record_lookup(key, now, json.loads(row[0]) if row else None)
+
+    def put(self, key: str, info: Dict[str, Any]) -> None:
+        """Store an extraction result, evicting least recently used entries if needed"""
+        now = time.time()
+        metadata = json.dumps(compact_info(info), ensure_ascii=False)
+        blob = zlib.compress(json.dumps(info, ensure_ascii=False, default=str).encode('utf-8'))
+        size = len(metadata) + len(blob)
+
+        with self._transaction():
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, metadata, now + self.metadata_ttl, blob, get_formats_expiry(info, self.formats_ttl), size, now),
+            )
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for this instance and across all processes"""
+        totals = dict(self.conn.execute('SELECT name, value FROM counters').fetchall())
+        entries, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': totals.get('hits', 0),
+            'total_misses': totals.get('misses', 0),
+            'entries': entries,
+            'size': size,
+        }
+
+    def _record_lookup(self, key: str, now: float, value):
+        counter = 'hits' if value is not None else 'misses'
+        setattr(self, counter, getattr(self, counter) + 1)
+
+        with self._transaction():
+            if value is not None:
+                self.conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self.conn.execute(
+                'INSERT INTO counters VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1',
+                (counter,),
+            )
+        return value
+
+    def _evict(self) -> None:
+        now = time.time()
+        self.conn.execute('DELETE FROM entries WHERE metadata_expires_at <= ?', (now,))
+        self.conn.execute('DELETE FROM aliases WHERE created_at <= ?', (now - self.metadata_ttl,))
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self.conn.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+            self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+
+class _Transaction:
+    """Immediate SQLite transaction, serializing writers across processes"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, *exc_info):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
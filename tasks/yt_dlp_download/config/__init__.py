@@ -1,10 +1,20 @@
 """Config module for video downloader"""
 
-from .ydl_config import create_ydl_options, configure_audio_options, configure_subtitle_options, get_default_filename_template
+from .ydl_config import create_ydl_options, configure_audio_options, configure_container_options, configure_subtitle_options, configure_sidecar_options, configure_rate_options, configure_retry_options, configure_clip_options, get_default_filename_template
+from .postprocess_planner import PostprocessTimer, apply_postprocessing_plan, get_preferred_format, plan_postprocessing
 
 __all__ = [
     'create_ydl_options',
     'configure_audio_options', 
+    'configure_container_options',
     'configure_subtitle_options',
-    'get_default_filename_template'
+    'configure_sidecar_options',
+    'configure_rate_options',
+    'configure_retry_options',
+    'configure_clip_options',
+    'get_default_filename_template',
+    'PostprocessTimer',
+    'apply_postprocessing_plan',
+    'get_preferred_format',
+    'plan_postprocessing'
 ]
\ No newline at end of file
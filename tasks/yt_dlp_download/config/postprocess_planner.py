@@ -0,0 +1,308 @@
+"""Post-processing planner: stream copy, container remux or transcode"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..formatters.format_index import get_codec_family
+
+# Output audio formats: (codec, file extension)
+AUDIO_TARGETS = {
+    'mp3': ('mp3', 'mp3'),
+    'm4a': ('aac', 'm4a'),
+    'aac': ('aac', 'm4a'),
+    'opus': ('opus', 'opus'),
+    'vorbis': ('vorbis', 'ogg'),
+    'flac': ('flac', 'flac'),
+    'wav': ('pcm', 'wav'),
+}
+
+# Lossy targets are encoded at this bitrate when a transcode is unavoidable
+TRANSCODE_AUDIO_QUALITY = '192'
+
+# Extensions an audio-only download can be kept in as is
+AUDIO_FILE_EXTS = ('m4a', 'mp3', 'opus', 'ogg', 'flac', 'wav', 'aac')
+
+# Codecs FFmpeg can stream-copy into each container
+CONTAINER_CODECS = {
+    'mp4': {
+        'video': ('h264', 'h265', 'av1', 'vp9'),
+        'audio': ('aac', 'mp3', 'opus', 'ac3', 'eac3', 'flac', 'alac'),
+    },
+    'webm': {
+        'video': ('vp8', 'vp9', 'av1'),
+        'audio': ('opus', 'vorbis'),
+    },
+}
+
+# Containers players accept without surprises, tried in order when the output is 'auto'
+NATIVE_CONTAINER_CODECS = {
+    'mp4': {'video': ('h264', 'h265', 'av1'), 'audio': ('aac',)},
+    'webm': {'video': ('vp8', 'vp9', 'av1'), 'audio': ('opus', 'vorbis')},
+}
+
+# Format filters preferring source codecs that a container takes without re-encoding
+CONTAINER_FORMAT_FILTERS = {
+    'webm': {'video': "[vcodec~='^(vp0?[89]|av0?1)']", 'audio': "[acodec~='^(opus|vorbis)']"},
+}
+
+# Format filters preferring sources already in the requested audio codec
+AUDIO_FORMAT_FILTERS = {
+    'mp3': "[acodec~='^mp3']",
+    'aac': "[acodec~='^(mp4a|aac)']",
+    'opus': "[acodec~='^opus']",
+    'vorbis': "[acodec~='^vorbis']",
+    'flac': "[acodec~='^flac']",
+}
+
+# Precompiled audio codec matchers; mp3 comes first, as MP4 signals it as mp4a.40.34 or mp4a.6b
+AUDIO_CODEC_PATTERNS = (
+    ('mp3', re.compile(r'mp3|mp4a\.40\.34|mp4a\.6b', re.I)),
+    ('aac', re.compile(r'mp4a|aac', re.I)),
+    ('opus', re.compile(r'opus', re.I)),
+    ('vorbis', re.compile(r'vorbis|vrbs', re.I)),
+    ('eac3', re.compile(r'ec-?3', re.I)),
+    ('ac3', re.compile(r'ac-?3', re.I)),
+    ('flac', re.compile(r'flac', re.I)),
+    ('alac', re.compile(r'alac', re.I)),
+)
+
+# Rough throughput used to estimate the cost of each action
+REMUX_BYTES_PER_SECOND = 200 * 1024 * 1024
+AUDIO_TRANSCODE_SPEED = 60.0  # seconds of audio encoded per second
+VIDEO_TRANSCODE_SPEED = 1.0  # seconds of 1080p video encoded per second
+
+FORMAT_TOKEN_RE = re.compile(r'\b(bestvideo|bestaudio|best)\b')
+
+
+def get_audio_codec_family(acodec: Optional[str]) -> Optional[str]:
+    """Return the codec family name of an audio codec string"""
+    if not acodec or acodec == 'none':
+        return None
+    for family, pattern in AUDIO_CODEC_PATTERNS:
+        if pattern.search(acodec):
+            return family
+    return None
+
+
+def get_video_codec_family(vcodec: Optional[str]) -> Optional[str]:
+    """Return the codec family name of a video codec string, including VP8"""
+    if vcodec and re.match(r'vp0?8', vcodec, re.I):
+        return 'vp8'
+    return get_codec_family(vcodec)
+
+
+def prefer_source_formats(format_spec: str, video_filter: str = '', audio_filter: str = '') -> str:
+    """Put codec-filtered copies of a format spec's alternatives in front of it
+
+    Only the generic selectors (best, bestvideo, bestaudio) are filtered;
+    explicit format IDs are left alone. The unfiltered spec stays as the
+    fallback, so the preference never makes a download fail.
+    """
+    def add_filters(match):
+        token = match.group(1)
+        if token == 'bestvideo':
+            return token + video_filter
+        if token == 'bestaudio':
+            return token + audio_filter
+        # Muxed formats are only filtered for a container, not to find a matching audio codec
+        return token + video_filter + audio_filter if video_filter else token
+
+    preferred = []
+    for alternative in format_spec.split('/'):
+        filtered = FORMAT_TOKEN_RE.sub(add_filters, alternative)
+        if filtered != alternative and filtered not in preferred:
+            preferred.append(filtered)
+    return '/'.join(preferred + [format_spec])
+
+
+def get_preferred_format(format_spec: str, audio_only: bool, audio_format: str = 'mp3', container: str = 'mp4') -> str:
+    """Prefer sources that the requested output takes without re-encoding"""
+    if audio_only:
+        codec = AUDIO_TARGETS.get(audio_format, (None, None))[0]
+        audio_filter = AUDIO_FORMAT_FILTERS.get(codec)
+        return prefer_source_formats(format_spec, audio_filter=audio_filter) if audio_filter else format_spec
+
+    filters = CONTAINER_FORMAT_FILTERS.get(container)
+    if filters:
+        return prefer_source_formats(format_spec, filters['video'], filters['audio'])
+    return format_spec
+
+
+def fits_container(container: str, vcodecs: List[Optional[str]], acodecs: List[Optional[str]], table=CONTAINER_CODECS) -> bool:
+    """Check whether every stream can be copied into the container"""
+    if container == 'mkv':
+        return True
+    codecs = table.get(container)
+    if not codecs:
+        return False
+    return all(codec in codecs['video'] for codec in vcodecs) and all(codec in codecs['audio'] for codec in acodecs)
+
+
+def get_source_streams(info: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Optional[str]], List[Optional[str]]]:
+    """Return the selected formats and their video and audio codec families"""
+    formats = info.get('requested_formats') or [info]
+    vcodecs = [get_video_codec_family(fmt.get('vcodec')) for fmt in formats if fmt.get('vcodec') not in (None, 'none')]
+    acodecs = [get_audio_codec_family(fmt.get('acodec')) for fmt in formats if fmt.get('acodec') not in (None, 'none')]
+    return formats, vcodecs, acodecs
+
+
+def estimate_cost(action: str, info: Dict[str, Any], video: bool) -> float:
+    """Estimate the seconds an action takes from the source size and duration"""
+    if action == 'copy':
+        return 0.0
+
+    duration = info.get('duration') or 0
+    if action == 'transcode':
+        if not video:
+            return duration / AUDIO_TRANSCODE_SPEED
+        pixels = (info.get('width') or 1920) * (info.get('height') or 1080)
+        return duration * pixels / (1920 * 1080) / VIDEO_TRANSCODE_SPEED
+
+    formats = info.get('requested_formats') or [info]
+    size = 0
+    for fmt in formats:
+        size += fmt.get('filesize') or fmt.get('filesize_approx') or (fmt.get('tbr') or 0) * 125 * duration
+    return size / REMUX_BYTES_PER_SECOND
+
+
+def plan_audio(info: Dict[str, Any], audio_format: str) -> Dict[str, Any]:
+    formats, vcodecs, acodecs = get_source_streams(info)
+    source_codec = acodecs[0] if acodecs else None
+    source_ext = info.get('ext')
+    audio_only_source = not vcodecs and len(formats) == 1
+
+    if audio_format == 'best' or audio_format not in AUDIO_TARGETS:
+        if audio_only_source and source_ext in AUDIO_FILE_EXTS:
+            return {'action': 'copy', 'ext': source_ext, 'postprocessors': [], 'reason': f'{source_codec or "audio"} source kept as downloaded'}
+        return {
+            'action': 'remux',
+            'ext': AUDIO_TARGETS.get(source_codec, (None, None))[1],
+            'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'best'}],
+            'reason': f'{source_codec or "audio"} stream copied out of the {source_ext} container',
+        }
+
+    target_codec, target_ext = AUDIO_TARGETS[audio_format]
+    if source_codec == target_codec:
+        if audio_only_source and source_ext == target_ext:
+            return {'action': 'copy', 'ext': target_ext, 'postprocessors': [], 'reason': f'source is already {audio_format}'}
+        return {
+            'action': 'remux',
+            'ext': target_ext,
+            'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': audio_format}],
+            'reason': f'{source_codec} stream copied into {target_ext}',
+        }
+
+    postprocessor = {'key': 'FFmpegExtractAudio', 'preferredcodec': audio_format}
+    if target_codec not in ('flac', 'pcm'):
+        postprocessor['preferredquality'] = TRANSCODE_AUDIO_QUALITY
+    return {
+        'action': 'transcode',
+        'ext': target_ext,
+        'postprocessors': [postprocessor],
+        'reason': f'{source_codec or "unknown"} source re-encoded to {audio_format}',
+    }
+
+
+def plan_video(info: Dict[str, Any], container: str) -> Dict[str, Any]:
+    formats, vcodecs, acodecs = get_source_streams(info)
+    merge = len(formats) > 1
+    source_ext = info.get('ext')
+    codecs = '+'.join(codec or 'unknown' for codec in vcodecs + acodecs) or 'unknown codecs'
+    known = None not in vcodecs + acodecs
+
+    if container not in ('mp4', 'webm', 'mkv'):
+        if not merge:
+            return {'action': 'copy', 'ext': source_ext, 'postprocessors': [], 'reason': f'{codecs} kept in {source_ext}'}
+        # The container the streams natively belong to, so nothing is forced into mp4
+        target = next(
+            (name for name in NATIVE_CONTAINER_CODECS if fits_container(name, vcodecs, acodecs, NATIVE_CONTAINER_CODECS)),
+            'mkv',
+        )
+        return {'action': 'remux', 'ext': target, 'merge_output_format': target, 'postprocessors': [], 'reason': f'{codecs} merged into {target}'}
+
+    if merge:
+        if not known or fits_container(container, vcodecs, acodecs):
+            return {'action': 'remux', 'ext': container, 'merge_output_format': container, 'postprocessors': [], 'reason': f'{codecs} merged into {container}'}
+        return {
+            'action': 'transcode',
+            'ext': container,
+            'merge_output_format': 'mkv',
+            'postprocessors': [{'key': 'FFmpegVideoConvertor', 'preferedformat': container}],
+            'reason': f'{codecs} cannot be copied into {container}, re-encoded after merging',
+        }
+
+    if source_ext == container:
+        return {'action': 'copy', 'ext': container, 'postprocessors': [], 'reason': f'source is already {container}'}
+    if not known or fits_container(container, vcodecs, acodecs):
+        return {
+            'action': 'remux',
+            'ext': container,
+            'postprocessors': [{'key': 'FFmpegVideoRemuxer', 'preferedformat': container}],
+            'reason': f'{codecs} copied from {source_ext} into {container}',
+        }
+    return {
+        'action': 'transcode',
+        'ext': container,
+        'postprocessors': [{'key': 'FFmpegVideoConvertor', 'preferedformat': container}],
+        'reason': f'{codecs} cannot be copied into {container}, re-encoded',
+    }
+
+
+def plan_postprocessing(info: Dict[str, Any], audio_only: bool, audio_format: Optional[str] = None, container: Optional[str] = None) -> Dict[str, Any]:
+    """Decide how the selected formats become the requested output
+
+    Args:
+        info: Processed info dict with the selected formats
+        audio_only: Whether only the audio is kept
+        audio_format: Requested audio format, mp3 by default; 'best' keeps the source codec
+        container: Requested video container, mp4 by default; 'auto' keeps the source container
+
+    Returns:
+        Plan with the action ('copy', 'remux' or 'transcode'), the output
+        extension, the yt-dlp post-processors to run and the estimated cost
+    """
+    if audio_only:
+        plan = plan_audio(info, audio_format or 'mp3')
+    else:
+        plan = plan_video(info, container or 'mp4')
+    plan.setdefault('merge_output_format', None)
+    plan['source'] = info.get('format_id')
+    plan['estimated_seconds'] = round(estimate_cost(plan['action'], info, not audio_only), 3)
+    return plan
+
+
+def apply_postprocessing_plan(ydl_opts: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the post-processors, merge container and final extension of a plan"""
+    ydl_opts['postprocessors'] = [
+        pp for pp in ydl_opts.get('postprocessors') or []
+        if pp.get('key') not in ('FFmpegExtractAudio', 'FFmpegVideoRemuxer', 'FFmpegVideoConvertor')
+    ] + plan['postprocessors']
+    ydl_opts['merge_output_format'] = plan['merge_output_format']
+    if plan['ext']:
+        # Lets a re-run recognise an already converted file and skip the download
+        ydl_opts['final_ext'] = plan['ext']
+    else:
+        ydl_opts.pop('final_ext', None)
+    return ydl_opts
+
+
+class PostprocessTimer:
+    """Post-processor hook measuring the time spent in each post-processing step"""
+
+    def __init__(self):
+        self.started: Dict[str, float] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def __call__(self, d: Dict[str, Any]) -> None:
+        name = d.get('postprocessor') or 'unknown'
+        if d.get('status') == 'started':
+            self.started[name] = time.perf_counter()
+        elif d.get('status') == 'finished' and name in self.started:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - self.started.pop(name)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'steps': {name: round(seconds, 3) for name, seconds in self.seconds.items()},
+            'total': round(sum(self.seconds.values()), 3),
+        }
@@ -4,20 +4,24 @@ import os
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+from .postprocess_planner import get_preferred_format
+
 
 def create_ydl_options(output_dir: str, filename_template: str, format_spec: str, proxy: Optional[str] = None, cookies_file: Optional[str] = None) -> Dict[str, Any]:
     """Create base yt-dlp options"""
-    # Use Path for cross-platform compatibility
-    output_path = Path(output_dir) / filename_template
-
     ydl_opts = {
-        'outtmpl': str(output_path),
+        # Relative to the output directory, so partial files can be staged elsewhere (see DiskIoController)
+        'outtmpl': filename_template,
+        # Use Path for cross-platform compatibility
+        'paths': {'home': str(Path(output_dir))},
         'format': format_spec,
-        'merge_output_format': 'mp4',  # Ensure compatibility
-        'writeinfojson': True,  # Save video info
-        'writethumbnail': True,  # Save thumbnail
+        # The merge container is chosen per download by the post-processing planner
+        # Sidecars are opt-in, see configure_sidecar_options
+        'writeinfojson': False,
+        'writethumbnail': False,
         'ignoreerrors': False,  # Stop on errors
         'no_warnings': False,  # Show warnings
+        'noprogress': True,  # Progress is reported by the throttled progress hook
         'extractaudio': False,  # Don't extract audio by default
         'audioformat': 'best',  # Best audio format
         'embed_subs': True,  # Embed subtitles if available
@@ -31,12 +35,12 @@ def create_ydl_options(output_dir: str, filename_template: str, format_spec: str
             'Sec-Fetch-Mode': 'navigate',
         },
         # Network settings to handle throttling and errors
+        # Upper bounds; the retry policy stops early on permanent errors (configure_retry_options)
         'retries': 10,  # Retry on network errors
         'fragment_retries': 10,  # Retry on fragment download errors
         'file_access_retries': 3,  # Retry on file access errors
         'extractor_retries': 3,  # Retry on extractor errors
-        'sleep_interval': 1,  # Sleep between requests (anti-throttling)
-        'max_sleep_interval': 5,  # Max sleep time
+        # No fixed sleeps: the shared rate scheduler backs off when a host pushes back
         'nocheckcertificate': False,  # Verify SSL certificates for security
     }
 
@@ -53,15 +57,26 @@ def create_ydl_options(output_dir: str, filename_template: str, format_spec: str
     return ydl_opts
 
 
-def configure_audio_options(ydl_opts: Dict[str, Any], audio_only: bool) -> Dict[str, Any]:
-    """Configure audio-specific options"""
+def configure_audio_options(ydl_opts: Dict[str, Any], audio_only: bool, audio_format: Optional[str] = None) -> Dict[str, Any]:
+    """Configure audio-specific options
+
+    Extraction itself is set up by the post-processing planner once the
+    source codec is known, so a source already in the requested codec is
+    not re-encoded.
+    """
+    ydl_opts['audioformat'] = audio_format or 'mp3'
     if audio_only:
-        ydl_opts['format'] = 'bestaudio/best'
-        ydl_opts['postprocessors'] = [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }]
+        ydl_opts['format'] = get_preferred_format('bestaudio/best', True, ydl_opts['audioformat'])
+    
+    return ydl_opts
+
+
+def configure_container_options(ydl_opts: Dict[str, Any], audio_only: bool, container: Optional[str] = None) -> Dict[str, Any]:
+    """Configure the video container, preferring sources it takes without re-encoding"""
+    container = container or 'mp4'
+    ydl_opts['merge_output_format'] = None if container == 'auto' else container
+    if not audio_only:
+        ydl_opts['format'] = get_preferred_format(ydl_opts['format'], False, container=container)
     
     return ydl_opts
 
@@ -76,6 +91,76 @@ def configure_subtitle_options(ydl_opts: Dict[str, Any], subtitle_langs: Optiona
     return ydl_opts
 
 
+def configure_sidecar_options(ydl_opts: Dict[str, Any], info_json: str) -> Dict[str, Any]:
+    """Configure sidecar files
+
+    Only the full info JSON is left to yt-dlp. The compact info JSON and the
+    thumbnail are written by the task after and alongside the download.
+    """
+    ydl_opts['writeinfojson'] = info_json == 'full'
+    ydl_opts['writethumbnail'] = False
+
+    return ydl_opts
+
+
+def configure_rate_options(ydl_opts: Dict[str, Any], cache_dir: Optional[str], rate_limit: Optional[str], max_requests_per_host: Optional[float]) -> Dict[str, Any]:
+    """Configure the node-wide rate scheduler shared by concurrent jobs"""
+    from yt_dlp.utils import parse_bytes
+
+    max_bytes_per_second = None
+    if rate_limit:
+        max_bytes_per_second = parse_bytes(str(rate_limit).strip().rstrip('/s').rstrip('B'))
+        if not max_bytes_per_second:
+            raise ValueError(f"Invalid rate limit: {rate_limit}. Use a value like 500K or 10M (bytes per second)")
+
+    ydl_opts['rate_scheduler'] = {
+        'state_dir': cache_dir,
+        'max_bytes_per_second': max_bytes_per_second,
+        'max_requests_per_host': max_requests_per_host or None,
+    }
+
+    return ydl_opts
+
+
+def configure_retry_options(ydl_opts: Dict[str, Any], cache_dir: Optional[str]) -> Dict[str, Any]:
+    """Let the shared retry policy decide on yt-dlp's retries
+
+    The retry counts of create_ydl_options stay the upper bound; permanent
+    errors are not retried at all, and transient ones back off with jitter.
+    """
+    from ..downloaders.retry_policy import get_retry_policy
+
+    ydl_opts['retry_policy'] = {'state_dir': cache_dir}
+    # The same policy TaskYoutubeDL reports failures to, which it looks up with these options
+    ydl_opts['retry_sleep_functions'] = get_retry_policy(**ydl_opts['retry_policy']).sleep_functions()
+
+    return ydl_opts
+
+
+def configure_clip_options(ydl_opts: Dict[str, Any], start_time=None, end_time=None, time_ranges: Optional[str] = None) -> Dict[str, Any]:
+    """Download only the requested time ranges, one file per range
+
+    Each file name gets the range it covers, e.g. "Title [90-120].mp4".
+    """
+    from yt_dlp.utils import download_range_func
+
+    from ..downloaders.clip_ranges import parse_time_ranges
+
+    ranges = parse_time_ranges(start_time, end_time, time_ranges)
+    if not ranges:
+        return ydl_opts
+
+    ydl_opts['download_ranges'] = download_range_func(None, ranges)
+    outtmpl = ydl_opts['outtmpl']
+    suffix = '%(clip_section& [{}]|)s'
+    if outtmpl.endswith('.%(ext)s'):
+        ydl_opts['outtmpl'] = outtmpl[:-len('.%(ext)s')] + suffix + '.%(ext)s'
+    else:
+        ydl_opts['outtmpl'] = outtmpl + suffix
+
+    return ydl_opts
+
+
 def get_default_filename_template() -> str:
     """Get default filename template"""
     return "%(title)s.%(ext)s"
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""Downloaders module for video downloader"""
+
+from .clip_ranges import ClipTrimPP, clip_report, parse_time_ranges
+from .extractor_index import ExtractorIndex, get_extractor_index
+from .ranged_http import RangedHttpFD
+from .rate_scheduler import RateScheduler, get_rate_scheduler
+from .retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, classify_error, get_retry_policy
+from .warm_session import WarmSessionPool, warm_sessions
+from .youtube_dl import TaskYoutubeDL
+
+__all__ = [
+    'ClipTrimPP',
+    'clip_report',
+    'parse_time_ranges',
+    'ExtractorIndex',
+    'get_extractor_index',
+    'RangedHttpFD',
+    'RateScheduler',
+    'get_rate_scheduler',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'RetryPolicy',
+    'classify_error',
+    'get_retry_policy',
+    'WarmSessionPool',
+    'warm_sessions',
+    'TaskYoutubeDL'
+]
@@ -0,0 +1,303 @@
+"""Time-range clips that fetch only the fragments overlapping the range"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from yt_dlp.networking import Request
+from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+from yt_dlp.utils import parse_duration, prepend_extension
+
+# Coverage beyond the requested range that is left uncut
+TRIM_TOLERANCE_SECONDS = 0.05
+
+# Playlist-level HLS tags, kept whatever segments are dropped
+HLS_PLAYLIST_TAGS = (
+    '#EXTM3U', '#EXT-X-VERSION', '#EXT-X-TARGETDURATION', '#EXT-X-MEDIA-SEQUENCE', '#EXT-X-PLAYLIST-TYPE',
+    '#EXT-X-INDEPENDENT-SEGMENTS', '#EXT-X-DISCONTINUITY-SEQUENCE', '#EXT-X-START', '#EXT-X-ALLOW-CACHE',
+)
+
+# Segment tags that carry over to every following segment
+HLS_STATE_TAGS = ('#EXT-X-KEY', '#EXT-X-MAP')
+
+
+def parse_timestamp(value) -> float:
+    """Parse seconds, "MM:SS" or "HH:MM:SS(.mmm)" into seconds"""
+    seconds = value if isinstance(value, (int, float)) else parse_duration(str(value).strip())
+    if seconds is None or seconds < 0:
+        raise ValueError(f"Invalid time: {value}. Use seconds or a timestamp like 1:30 or 01:02:03.5")
+    return float(seconds)
+
+
+def parse_time_ranges(start_time=None, end_time=None, time_ranges: Optional[str] = None) -> List[Tuple[float, float]]:
+    """Collect the requested time ranges as (start, end) seconds; end is inf for "to the end"
+
+    ``time_ranges`` lists further ranges such as ``"0:30-1:00,5:00-"``.
+    """
+    ranges = []
+    if start_time not in (None, '') or end_time not in (None, ''):
+        ranges.append((start_time, end_time))
+    for part in (time_ranges or '').split(','):
+        if part.strip():
+            start, separator, end = part.partition('-')
+            if not separator:
+                raise ValueError(f"Invalid time range: {part.strip()}. Use start-end, e.g. 0:30-1:00")
+            ranges.append((start, end))
+
+    parsed = []
+    for start, end in ranges:
+        start = parse_timestamp(start) if start not in (None, '') and str(start).strip() else 0.0
+        end = parse_timestamp(end) if end not in (None, '') and str(end).strip() else float('inf')
+        if end <= start:
+            raise ValueError(f"Invalid time range: it ends ({end:g}s) before it starts ({start:g}s)")
+        parsed.append((start, end))
+    return parsed
+
+
+def format_section(start: float, end: Optional[float]) -> str:
+    """Label of a time range for file names, e.g. "90-120" or "90-end\""""
+    return f"{start:g}-{'end' if end is None else format(end, 'g')}"
+
+
+def get_format_bytes(fmt: Dict[str, Any], duration: Optional[float]) -> Optional[int]:
+    """Size of a full download of a format, known or estimated"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if not size and fmt.get('tbr') and duration:
+        size = fmt['tbr'] * 1000 / 8 * duration
+    return int(size) if size else None
+
+
+def select_spans(durations: List[float], start: float, end: Optional[float]) -> Optional[Tuple[int, int, float, float]]:
+    """Indexes [first, last) of the spans overlapping a time range, and the time they cover"""
+    first = last = None
+    position = covered_start = covered_end = 0.0
+    for index, duration in enumerate(durations):
+        span_start, position = position, position + duration
+        if position <= start or (end is not None and span_start >= end):
+            continue
+        if first is None:
+            first, covered_start = index, span_start
+        last, covered_end = index + 1, position
+    if first is None:
+        return None
+    return first, last, covered_start, covered_end
+
+
+def trim_fragments(fmt: Dict[str, Any], start: float, end: Optional[float]) -> Optional[Dict[str, Any]]:
+    """Keep the fragments of a DASH or fragment-listed format that overlap a time range
+
+    Leading fragments without a duration (the initialization segment) are
+    always kept. Returns None if the fragments do not all have durations.
+    """
+    fragments = fmt['fragments']
+    head = 0
+    while head < len(fragments) and fragments[head].get('duration') is None:
+        head += 1
+    media = fragments[head:]
+    if not media or any(fragment.get('duration') is None for fragment in media):
+        return None
+    spans = select_spans([fragment['duration'] for fragment in media], start, end)
+    if spans is None:
+        raise ValueError(f"The time range starts after the end of the video ({start:g}s)")
+    first, last, covered_start, covered_end = spans
+    return {
+        'format': dict(fmt, fragments=fragments[:head] + media[first:last]),
+        'covered': (covered_start, covered_end),
+        'fragments': (last - first, len(media)),
+    }
+
+
+def trim_hls_playlist(playlist: str, start: float, end: Optional[float]) -> Optional[Tuple[str, Tuple[float, float], Tuple[int, int]]]:
+    """Cut an HLS media playlist down to the segments overlapping a time range
+
+    The media sequence is advanced past the dropped segments, so AES-128
+    IVs derived from it stay right, and the last key and initialization map
+    of the dropped segments carry over. Returns None for master or live
+    playlists.
+    """
+    if '#EXT-X-STREAM-INF' in playlist or '#EXT-X-ENDLIST' not in playlist:
+        return None
+
+    header, segments, pending = [], [], []
+    byte_offsets = {}
+    for line in playlist.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith('#'):
+            duration = next((float(tag[8:].split(',')[0]) for tag in pending if tag.startswith('#EXTINF:')), None)
+            if duration is None:
+                return None
+            tags = []
+            for tag in pending:
+                if tag.startswith('#EXT-X-BYTERANGE:'):
+                    # Make ranges that continue the previous segment explicit
+                    length, _, offset = tag[17:].partition('@')
+                    offset = int(offset) if offset else byte_offsets.get(line, 0)
+                    byte_offsets[line] = offset + int(length)
+                    tag = f'#EXT-X-BYTERANGE:{length}@{offset}'
+                tags.append(tag)
+            segments.append({'tags': tags, 'uri': line, 'duration': duration})
+            pending = []
+        elif line.startswith(HLS_PLAYLIST_TAGS) and not segments:
+            header.append(line)
+        else:
+            pending.append(line)
+
+    spans = select_spans([segment['duration'] for segment in segments], start, end)
+    if spans is None:
+        raise ValueError(f"The time range starts after the end of the video ({start:g}s)")
+    first, last, covered_start, covered_end = spans
+
+    state = {}
+    for segment in segments[:first]:
+        for tag in segment['tags']:
+            if tag.startswith(HLS_STATE_TAGS):
+                state[tag.partition(':')[0]] = tag
+    kept = segments[first:last]
+    carried = [tag for name, tag in state.items() if not any(t.startswith(name) for t in kept[0]['tags'])]
+
+    lines = []
+    for line in header:
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            line = f'#EXT-X-MEDIA-SEQUENCE:{int(line[22:]) + first}'
+        lines.append(line)
+    if first and not any(line.startswith('#EXT-X-MEDIA-SEQUENCE:') for line in header):
+        lines.append(f'#EXT-X-MEDIA-SEQUENCE:{first}')
+    lines.extend(carried)
+    for segment in kept:
+        lines.extend(segment['tags'])
+        lines.append(segment['uri'])
+    lines.extend(pending)
+    return '\n'.join(lines) + '\n', (covered_start, covered_end), (last - first, len(segments))
+
+
+def trim_hls_format(ydl, fmt: Dict[str, Any], start: float, end: Optional[float]) -> Optional[Dict[str, Any]]:
+    """Fetch a native HLS format's media playlist and keep the segments overlapping a time range"""
+    with ydl.urlopen(Request(fmt['url'], headers=fmt.get('http_headers') or {})) as response:
+        playlist = response.read().decode('utf-8', 'replace')
+    trimmed = trim_hls_playlist(playlist, start, end)
+    if trimmed is None:
+        return None
+    data, covered, fragments = trimmed
+    return {
+        'format': dict(fmt, hls_media_playlist_data=data),
+        'covered': covered,
+        'fragments': fragments,
+    }
+
+
+def trim_format(ydl, fmt: Dict[str, Any], start: float, end: Optional[float]) -> Optional[Dict[str, Any]]:
+    """Trim a fragmented format to a time range, or None if it is not fragmented or cannot be trimmed"""
+    protocol = fmt.get('protocol') or ''
+    if fmt.get('fragments'):
+        return trim_fragments(fmt, start, end)
+    if protocol == 'm3u8_native' and not fmt.get('hls_media_playlist_data'):
+        return trim_hls_format(ydl, fmt, start, end)
+    return None
+
+
+def clip_info(ydl, info: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepare the download of one time range of a video
+
+    When every selected format is fragmented, the formats are trimmed to
+    the fragments overlapping the range and the section is cleared, so
+    yt-dlp's native downloaders fetch only those; ``clip_trim`` then tells
+    ClipTrimPP where to cut the fragment-aligned result. Otherwise the
+    section stays for yt-dlp's ffmpeg downloader, which seeks to the
+    keyframe before the start with range requests and stream-copies.
+
+    Returns:
+        Report of the clip: requested and covered range, method, fragments
+        kept and the size of a full download
+    """
+    start = info.get('section_start') or 0.0
+    end = info.get('section_end')
+    formats = info.get('requested_formats') or [info]
+    full_bytes = [get_format_bytes(fmt, info.get('duration')) for fmt in formats]
+    clip = {
+        'start': start,
+        'end': end,
+        'method': 'ffmpeg',
+        'covered_start': start,
+        'covered_end': end,
+        'fragments': None,
+        'full_bytes': sum(full_bytes) if all(full_bytes) else None,
+        'downloaded_bytes': 0,
+    }
+    info['clip_section'] = format_section(start, end)
+
+    trimmed = []
+    for fmt in formats:
+        result = trim_format(ydl, fmt, start, end)
+        if result is None:
+            return clip
+        trimmed.append(result)
+
+    if info.get('requested_formats'):
+        info['requested_formats'] = [result['format'] for result in trimmed]
+    else:
+        info.update(trimmed[0]['format'])
+    del info['section_start'], info['section_end']
+
+    covered_start = min(result['covered'][0] for result in trimmed)
+    covered_end = max(result['covered'][1] for result in trimmed)
+    clip.update(
+        method='fragments',
+        covered_start=covered_start,
+        covered_end=covered_end,
+        fragments=[sum(result['fragments'][0] for result in trimmed), sum(result['fragments'][1] for result in trimmed)],
+    )
+    if start - covered_start > TRIM_TOLERANCE_SECONDS or (end is not None and covered_end - end > TRIM_TOLERANCE_SECONDS):
+        # Timestamps of the cut are relative to the start of the downloaded fragments
+        info['clip_trim'] = {'offset': start - covered_start, 'duration': None if end is None else end - start}
+    return clip
+
+
+def clip_report(clips: List[Dict[str, Any]], files: List[str]) -> Dict[str, Any]:
+    """Summarize the clips of a video and the bytes they saved compared with a full download"""
+    # Every range downloads from the same formats, whose full size is fetched once otherwise
+    full_bytes = clips[0]['full_bytes'] if clips else None
+    downloaded_bytes = sum(clip['downloaded_bytes'] for clip in clips)
+    return {
+        'ranges': [
+            {
+                'start': clip['start'],
+                'end': clip['end'],
+                'covered_start': clip['covered_start'],
+                'covered_end': clip['covered_end'],
+                'method': clip['method'],
+                'fragments': clip['fragments'],
+                'downloaded_bytes': clip['downloaded_bytes'],
+            }
+            for clip in clips
+        ],
+        'files': files,
+        'downloaded_bytes': downloaded_bytes,
+        'full_bytes': full_bytes,
+        'bytes_saved': max(0, full_bytes - downloaded_bytes) if full_bytes else None,
+    }
+
+
+class ClipTrimPP(FFmpegPostProcessor):
+    """Cut a fragment-aligned clip to its requested range with a stream copy
+
+    The cut starts at the keyframe before the requested start, as no frame
+    is re-encoded. Without ffmpeg the clip keeps its fragment boundaries.
+    """
+
+    def run(self, info):
+        trim = info.pop('clip_trim', None)
+        if not trim or not info.get('filepath'):
+            return [], info
+        if not self.available:
+            self.to_screen('ffmpeg is not available, the clip keeps the fragment boundaries')
+            return [], info
+        path = info['filepath']
+        temp_path = prepend_extension(path, 'temp')
+        input_opts = ['-ss', f"{trim['offset']:.3f}"]
+        if trim['duration'] is not None:
+            input_opts += ['-t', f"{trim['duration']:.3f}"]
+        self.to_screen(f'Cutting the clip to its time range (from {trim["offset"]:.2f}s into the fragments)')
+        self.real_run_ffmpeg([(path, input_opts)], [(temp_path, ['-c', 'copy', '-map', '0', '-dn', '-ignore_unknown'])])
+        os.replace(temp_path, path)
+        return [], info
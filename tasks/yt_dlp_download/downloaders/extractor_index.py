@@ -0,0 +1,103 @@
+"""Per-host index of the extractors that handle a URL"""
+
+import functools
+import os
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from yt_dlp.extractor import gen_extractor_classes, get_info_extractor
+from yt_dlp.globals import all_plugins_loaded
+from yt_dlp.plugins import load_all_plugins
+from yt_dlp.version import __version__ as YT_DLP_VERSION
+
+from ..utils.file_utils import get_default_cache_dir
+from ..utils.state_file import locked_state, read_state
+
+GENERIC_KEY = 'Generic'
+
+# URL scopes only the generic extractor handled are rescanned after this long
+GENERIC_SCOPE_TTL_SECONDS = 7 * 24 * 3600
+
+
+def get_url_scope(url: str) -> str:
+    """Return the host and first path segment of a URL, e.g. 'example.com/videos'"""
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    segment = parsed.path.strip('/').split('/', 1)[0]
+    return f'{host}/{segment}'
+
+
+def load_plugins() -> None:
+    """Register plugin extractors, which YoutubeDL otherwise only does when first created"""
+    if not all_plugins_loaded.value:
+        load_all_plugins()
+
+
+@functools.lru_cache(maxsize=1)
+def get_extractor_order() -> Dict[str, int]:
+    """Return the position of every extractor in yt-dlp's registry; the first suitable one wins"""
+    return {ie.ie_key(): position for position, ie in enumerate(gen_extractor_classes())}
+
+
+def scan_extractors(url: str) -> List[str]:
+    """Match a URL against every extractor, in registry order"""
+    return [ie.ie_key() for ie in gen_extractor_classes() if ie.suitable(url)]
+
+
+class ExtractorIndex:
+    """Remembers which extractors matched URLs of each host
+
+    yt-dlp registers all ~1800 extractors in every YoutubeDL and tries them
+    in turn until one matches, compiling each URL pattern on the way. The
+    index is kept in a JSON state file under the cache directory, so after
+    the first URL of a host, later runs (in any process) only test the few
+    extractors known for that host. A URL none of them matches triggers a
+    full scan, whose matches are added to the host; scopes handled only by
+    the generic extractor are remembered as such for a while. The index is
+    rebuilt when yt-dlp is upgraded.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_path = os.path.join(state_dir or get_default_cache_dir(), 'extractor_index.json')
+        self.scans = 0
+
+    def extractor_keys(self, url: str) -> List[str]:
+        """Return the keys of the extractors suitable for a URL, the generic extractor last"""
+        load_plugins()
+        scope = get_url_scope(url)
+        host = scope.split('/', 1)[0]
+
+        state = read_state(self.state_path)
+        if state.get('version') == YT_DLP_VERSION:
+            known = state.get('hosts', {}).get(host) or []
+            matched = [key for key in known if get_info_extractor(key).suitable(url)]
+            if matched:
+                return matched + [GENERIC_KEY]
+            if time.time() - state.get('generic', {}).get(scope, 0) < GENERIC_SCOPE_TTL_SECONDS:
+                return [GENERIC_KEY]
+
+        self.scans += 1
+        matched = [key for key in scan_extractors(url) if key != GENERIC_KEY]
+        with locked_state(self.state_path) as state:
+            if state.get('version') != YT_DLP_VERSION:
+                state.clear()
+                state['version'] = YT_DLP_VERSION
+            if matched:
+                hosts = state.setdefault('hosts', {})
+                order = get_extractor_order()
+                hosts[host] = sorted(set(hosts.get(host, [])) | set(matched), key=lambda key: order.get(key, len(order)))
+            else:
+                now = time.time()
+                generic = {key: at for key, at in state.get('generic', {}).items() if now - at < GENERIC_SCOPE_TTL_SECONDS}
+                generic[scope] = now
+                state['generic'] = generic
+        return matched + [GENERIC_KEY]
+
+
+@functools.lru_cache(maxsize=None)
+def get_extractor_index(state_dir: Optional[str] = None) -> ExtractorIndex:
+    """Return the index for a state directory, shared by every job of this process"""
+    return ExtractorIndex(state_dir)
@@ -0,0 +1,251 @@
+"""Multi-connection ranged downloader for progressive HTTP formats"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+from yt_dlp.utils import RetryManager, parse_http_range
+from yt_dlp.utils.networking import HTTPHeaderDict
+
+from ..utils.file_utils import preallocate
+
+# Files smaller than this are downloaded over a single connection
+MIN_SEGMENTED_SIZE = 8 * 1024 * 1024
+
+# Target segment size; smaller segments balance better, larger ones save requests
+SEGMENT_SIZE = 4 * 1024 * 1024
+
+# Smallest read size per connection; a larger ``buffersize`` option raises it
+READ_SIZE = 256 * 1024
+
+# Segment progress is persisted at most this often
+STATE_SAVE_INTERVAL_SECONDS = 1.0
+
+
+class SegmentFailed(Exception):
+    """A segment could not be downloaded within the retry budget"""
+
+
+class RangeIgnored(SegmentFailed):
+    """The server answered a segment's range request with something other than that range"""
+
+
+class RangedHttpFD(HttpFD):
+    """Download a progressive file as byte ranges over several pooled connections
+
+    The file is split into fixed-size segments that a pool of connections
+    works through, each writing at its own offset into a preallocated
+    ``.part`` file. Progress per segment is kept in a ``.segments`` file next
+    to it, so an interrupted download resumes every segment where it stopped.
+    Servers that do not answer a range request with 206 Partial Content,
+    whether at the probe or for any segment later on, and files too small to
+    benefit, are downloaded with the regular single-stream HttpFD.
+    """
+
+    FD_NAME = 'ranged_http'
+
+    def real_download(self, filename, info_dict):
+        connections = self.params.get('download_connections') or 1
+        if connections < 2 or info_dict.get('request_data') or self.params.get('test'):
+            return super().real_download(filename, info_dict)
+
+        headers = HTTPHeaderDict({'Accept-Encoding': 'identity'}, info_dict.get('http_headers'))
+        headers.pop('Range', None)
+        extensions = {}
+        impersonate_target = self._get_impersonate_target(info_dict)
+        if impersonate_target is not None:
+            extensions['impersonate'] = impersonate_target
+
+        total = self._probe_size(info_dict['url'], headers, extensions)
+        if total is None:
+            self.to_screen('[download] Server does not support range requests, using a single connection')
+            return super().real_download(filename, info_dict)
+        if total < MIN_SEGMENTED_SIZE:
+            return super().real_download(filename, info_dict)
+
+        return self._download_segments(filename, info_dict, total, connections, headers, extensions)
+
+    def _probe_size(self, url: str, headers: HTTPHeaderDict, extensions: Dict[str, Any]) -> Optional[int]:
+        """Return the file size if the server honours range requests"""
+        request = Request(url, headers=HTTPHeaderDict(headers, {'Range': 'bytes=0-0'}), extensions=extensions)
+        try:
+            response = self.ydl.urlopen(request)
+        except (HTTPError, TransportError):
+            return None
+        try:
+            if response.status != 206:
+                return None
+            _, _, total = parse_http_range(response.headers.get('Content-Range'))
+            return total
+        finally:
+            response.close()
+
+    def _download_segments(self, filename, info_dict, total, connections, headers, extensions):
+        tmpfilename = self.temp_name(filename)
+        state_path = f'{tmpfilename}.segments'
+        segments = self._load_segments(tmpfilename, state_path, total)
+        resumed = sum(segment['done'] for segment in segments)
+
+        if resumed:
+            self.report_resuming_byte(resumed)
+        preallocate(tmpfilename, total, keep_data=bool(resumed))
+
+        pending = [segment for segment in segments if segment['done'] < segment['length']]
+        progress = SegmentProgress(self, info_dict, filename, tmpfilename, total, resumed, segments, state_path)
+        workers = min(connections, len(pending)) or 1
+        self.to_screen(f'[download] Downloading {total} bytes over {workers} connections ({len(pending)} segments)')
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ranged-http')
+        range_ignored = None
+        try:
+            futures = [
+                executor.submit(self._download_segment, info_dict['url'], headers, extensions, tmpfilename, segment, progress)
+                for segment in pending
+            ]
+            for future in futures:
+                future.result()
+        except RangeIgnored as e:
+            range_ignored = e
+        except (SegmentFailed, OSError) as e:
+            self.report_error(f'unable to download segment: {e}')
+            return False
+        finally:
+            # Stop the other connections and keep what they got for a later resume
+            progress.cancelled.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            progress.save(force=True)
+
+        if range_ignored:
+            # The segments cannot be completed from this server; start over on one connection
+            self.to_screen(f'[download] {range_ignored}, using a single connection')
+            self.try_remove(state_path)
+            self.try_remove(tmpfilename)
+            return super().real_download(filename, info_dict)
+
+        self.try_remove(state_path)
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'status': 'finished',
+            'elapsed': time.time() - progress.start_time,
+        }, info_dict)
+        return True
+
+    def _download_segment(self, url, headers, extensions, tmpfilename, segment, progress):
+        def error_callback(err, count, retries):
+            if count > retries:
+                raise SegmentFailed(f'bytes {segment["start"]}-{segment["start"] + segment["length"] - 1}: {err}')
+            self.report_retry(err, count, retries)
+
+        read_size = max(READ_SIZE, self.params.get('buffersize') or 0)
+        with open(tmpfilename, 'r+b') as f:
+            for retry in RetryManager(self.params.get('retries'), error_callback):
+                start = segment['start'] + segment['done']
+                end = segment['start'] + segment['length'] - 1
+                request = Request(url, headers=HTTPHeaderDict(headers, {'Range': f'bytes={start}-{end}'}), extensions=extensions)
+                try:
+                    with self.ydl.urlopen(request) as response:
+                        if response.status != 206 or parse_http_range(response.headers.get('Content-Range'))[0] != start:
+                            raise RangeIgnored(f'server ignored range request for bytes {start}-{end}')
+                        f.seek(start)
+                        while segment['done'] < segment['length']:
+                            if progress.cancelled.is_set():
+                                return
+                            data = response.read(min(read_size, segment['length'] - segment['done']))
+                            if not data:
+                                raise TransportError(f'connection closed after {segment["done"]} of {segment["length"]} bytes')
+                            f.write(data)
+                            # Persisted progress must never run ahead of the file
+                            f.flush()
+                            progress.advance(segment, len(data))
+                except (HTTPError, TransportError) as err:
+                    retry.error = err
+                    continue
+
+    def _load_segments(self, tmpfilename: str, state_path: str, total: int) -> List[Dict[str, int]]:
+        """Restore segment progress of an interrupted download, or plan new segments
+
+        A partial file without segment state, as single-stream downloads
+        leave behind, is resumed as one contiguous prefix of the file.
+        """
+        segments = [
+            {'start': start, 'length': min(SEGMENT_SIZE, total - start), 'done': 0}
+            for start in range(0, total, SEGMENT_SIZE)
+        ]
+        if not self.params.get('continuedl', True) or not os.path.isfile(tmpfilename):
+            return segments
+
+        size = os.path.getsize(tmpfilename)
+        try:
+            with open(state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+
+        if isinstance(state, dict):
+            if state.get('total') == total and size == total and isinstance(state.get('segments'), list):
+                return state['segments']
+            self.to_screen(f'[download] Segment state of {tmpfilename} does not match the file, discarding the partial file')
+        elif 0 < size < total:
+            for segment in segments:
+                segment['done'] = max(0, min(segment['length'], size - segment['start']))
+        elif size:
+            # Preallocated to full size, so which parts hold data is unknown
+            self.to_screen(f'[download] Segment state of {tmpfilename} is missing, discarding the partial file')
+        return segments
+
+
+class SegmentProgress:
+    """Thread-safe progress accounting shared by the segment workers"""
+
+    def __init__(self, fd: RangedHttpFD, info_dict, filename, tmpfilename, total, resumed, segments, state_path):
+        self.fd = fd
+        self.info_dict = info_dict
+        self.filename = filename
+        self.tmpfilename = tmpfilename
+        self.total = total
+        self.resumed = resumed
+        self.downloaded = resumed
+        self.segments = segments
+        self.state_path = state_path
+        self.start_time = time.time()
+        self.saved_at = self.start_time
+        self.cancelled = threading.Event()
+        self.lock = threading.RLock()
+
+    def advance(self, segment: Dict[str, int], size: int) -> None:
+        with self.lock:
+            segment['done'] += size
+            self.downloaded += size
+            now = time.time()
+            speed = self.fd.calc_speed(self.start_time, now, self.downloaded - self.resumed)
+            self.fd._hook_progress({
+                'status': 'downloading',
+                'downloaded_bytes': self.downloaded,
+                'total_bytes': self.total,
+                'tmpfilename': self.tmpfilename,
+                'filename': self.filename,
+                'eta': self.fd.calc_eta(speed, self.total - self.downloaded),
+                'speed': speed,
+                'elapsed': now - self.start_time,
+            }, self.info_dict)
+            self.save()
+
+    def save(self, force: bool = False) -> None:
+        """Persist segment progress, so an interrupted download can resume"""
+        with self.lock:
+            now = time.time()
+            if not force and now - self.saved_at < STATE_SAVE_INTERVAL_SECONDS:
+                return
+            self.saved_at = now
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump({'total': self.total, 'segments': self.segments}, f)
+
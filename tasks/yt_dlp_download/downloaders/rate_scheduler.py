@@ -0,0 +1,230 @@
+"""Node-wide request-rate and bandwidth scheduling shared between jobs"""
+
+import collections
+import email.utils
+import functools
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from ..utils.file_utils import get_default_cache_dir
+from ..utils.state_file import locked_state, read_state
+
+# Responses meaning the host wants us to slow down
+PUSHBACK_STATUSES = (429, 503)
+
+# Lowest request rate a host is throttled to, in requests per second
+MIN_REQUEST_RATE = 0.2
+
+# Share of the request rate regained per second without pushback
+RATE_RECOVERY_PER_SECOND = 0.2
+
+# Pushback within this long after a decrease is part of the same burst
+DECREASE_COOLDOWN_SECONDS = 2.0
+
+# A host limit is lifted after this long without pushback
+LIMIT_EXPIRY_SECONDS = 120
+
+# Pause applied after pushback without a Retry-After header
+DEFAULT_BACKOFF_SECONDS = 2.0
+
+# Longest Retry-After that is honoured
+MAX_BACKOFF_SECONDS = 300.0
+
+# Window over which the node's request rate to a host is measured
+RATE_WINDOW_SECONDS = 3.0
+
+# Request counts are published to the shared state at most this often
+TRAFFIC_FLUSH_SECONDS = 0.25
+
+# Share of a second's worth of bandwidth reserved from the shared bucket at once
+BYTES_QUANTUM_SECONDS = 0.25
+
+
+def get_host(url: str) -> str:
+    return (urlparse(url).hostname or '').lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(0.0, seconds), MAX_BACKOFF_SECONDS)
+
+
+class RateScheduler:
+    """Token buckets for requests per host and for global bytes per second
+
+    Buckets live in a JSON state file under the cache directory and are
+    updated under a file lock, so every job on the node draws from the same
+    budget. Hosts are unlimited until they push back (HTTP 429/503): the
+    host's rate is then halved from what the whole node was sending (once
+    per burst of refusals), Retry-After is honoured by every job, and the
+    rate grows back by 20% per second until the limit is lifted. Unlimited
+    hosts cost a lock-free state read per request and a shared counter
+    update a few times per second.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None, max_bytes_per_second: Optional[float] = None, max_requests_per_host: Optional[float] = None):
+        self.state_path = os.path.join(state_dir or get_default_cache_dir(), 'rate_scheduler.json')
+        self.max_bytes_per_second = max_bytes_per_second
+        self.max_requests_per_host = max_requests_per_host
+        self.lock = threading.Lock()
+        self.request_counts: Dict[str, int] = collections.Counter()
+        self.flushed_at = time.time()
+        self.byte_budget = 0.0
+        self.waited = 0.0
+        self.pushbacks = 0
+
+    def before_request(self, url: str) -> None:
+        """Wait until a request to the URL's host is within the shared limits"""
+        host = get_host(url)
+        now = time.time()
+        with self.lock:
+            self.request_counts[host] += 1
+            if now - self.flushed_at >= TRAFFIC_FLUSH_SECONDS:
+                self._flush_traffic(now)
+
+        host_state = read_state(self.state_path).get('hosts', {}).get(host)
+        if host_state is None and not self.max_requests_per_host:
+            return
+
+        with locked_state(self.state_path) as state:
+            host_state = state.setdefault('hosts', {}).setdefault(host, {})
+            rate = self._current_rate(host_state, now)
+            blocked = host_state.get('blocked_until', 0) - now
+            if rate is None:
+                # A Retry-After can outlast the rate limit; the host is only forgotten once both are over
+                if blocked <= 0:
+                    state['hosts'].pop(host)
+                    return
+                delay = blocked
+            else:
+                # Reserve a token, letting the bucket go negative; the debt is the wait
+                tokens = min(rate, host_state.get('tokens', rate) + (now - host_state.get('updated', now)) * rate) - 1
+                host_state.update(rate=rate, tokens=tokens, updated=now)
+                delay = max(-tokens / rate, blocked)
+
+        self._sleep(delay)
+
+    def on_response(self, url: str, status: int, retry_after: Optional[str] = None) -> None:
+        """Record pushback from a host, slowing every job down"""
+        if status not in PUSHBACK_STATUSES:
+            return
+
+        host = get_host(url)
+        now = time.time()
+        with self.lock:
+            self.pushbacks += 1
+            self._flush_traffic(now)
+
+        with locked_state(self.state_path) as state:
+            host_state = state.setdefault('hosts', {}).setdefault(host, {})
+            backoff = parse_retry_after(retry_after) or DEFAULT_BACKOFF_SECONDS
+            host_state['blocked_until'] = max(host_state.get('blocked_until', 0), now + backoff)
+            host_state['last_pushback'] = now
+            if now - host_state.get('last_decrease', 0) < DECREASE_COOLDOWN_SECONDS:
+                return
+
+            # Requests in the busiest recent second, across all jobs
+            sent_rate = max(state.get('traffic', {}).get(host, {}).values(), default=0)
+            current = self._current_rate(host_state, now) or max(sent_rate, MIN_REQUEST_RATE * 2)
+            rate = max(MIN_REQUEST_RATE, current / 2)
+            host_state.update(rate=rate, tokens=0.0, updated=now, last_decrease=now)
+        print(f'🐢 {host} asked to slow down (HTTP {status}), limiting to {rate:.2f} requests/s for all jobs')
+
+    def throttle_bytes(self, size: int) -> None:
+        """Wait until size received bytes fit the global bandwidth budget"""
+        rate = self.max_bytes_per_second
+        if not rate:
+            return
+
+        with self.lock:
+            self.byte_budget -= size
+            if self.byte_budget >= 0:
+                return
+            # Reserve a larger quantum so the shared file is not locked for every read
+            reserve = -self.byte_budget + rate * BYTES_QUANTUM_SECONDS
+            self.byte_budget += reserve
+
+            now = time.time()
+            with locked_state(self.state_path) as state:
+                bucket = state.setdefault('bytes', {})
+                tokens = min(rate, bucket.get('tokens', rate) + (now - bucket.get('updated', now)) * rate) - reserve
+                bucket.update(tokens=tokens, updated=now)
+            delay = -tokens / rate
+
+        self._sleep(delay)
+
+    def wrap_response(self, response):
+        """Route the body of a response through the bandwidth budget"""
+        if not self.max_bytes_per_second:
+            return response
+
+        read = response.read
+
+        def throttled_read(amt=None):
+            data = read(amt)
+            if data:
+                self.throttle_bytes(len(data))
+            return data
+
+        response.read = throttled_read
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'waited': round(self.waited, 3),
+            'pushbacks': self.pushbacks,
+            'max_bytes_per_second': self.max_bytes_per_second,
+            'max_requests_per_host': self.max_requests_per_host,
+        }
+
+    def _flush_traffic(self, now: float) -> None:
+        """Add this process's request counts to the node-wide per-second counters"""
+        self.flushed_at = now
+        counts, self.request_counts = self.request_counts, collections.Counter()
+        with locked_state(self.state_path) as state:
+            traffic = {}
+            for host, per_second in state.get('traffic', {}).items():
+                recent = {at: count for at, count in per_second.items() if now - int(at) < RATE_WINDOW_SECONDS}
+                if recent:
+                    traffic[host] = recent
+            second = str(int(now))
+            for host, count in counts.items():
+                per_second = traffic.setdefault(host, {})
+                per_second[second] = per_second.get(second, 0) + count
+            state['traffic'] = traffic
+
+    def _current_rate(self, host_state: Dict[str, Any], now: float) -> Optional[float]:
+        """Return the host's request rate after recovery, or None when unlimited"""
+        rate = host_state.get('rate')
+        if rate is not None:
+            if now - host_state.get('last_pushback', 0) > LIMIT_EXPIRY_SECONDS:
+                rate = None
+            else:
+                rate *= 1 + (now - host_state.get('updated', now)) * RATE_RECOVERY_PER_SECOND
+        if self.max_requests_per_host:
+            rate = min(rate or self.max_requests_per_host, self.max_requests_per_host)
+        return rate
+
+    def _sleep(self, delay: float) -> None:
+        if delay > 0:
+            with self.lock:
+                self.waited += delay
+            time.sleep(delay)
+
+
+@functools.lru_cache(maxsize=None)
+def get_rate_scheduler(state_dir: Optional[str] = None, max_bytes_per_second: Optional[float] = None, max_requests_per_host: Optional[float] = None) -> RateScheduler:
+    """Return the scheduler for a configuration, shared by every job of this process"""
+    return RateScheduler(state_dir, max_bytes_per_second, max_requests_per_host)
@@ -0,0 +1,301 @@
+"""Error classification, retry backoff and per-host circuit breaking"""
+
+import functools
+import os
+import random
+import re
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from ..utils.file_utils import get_default_cache_dir
+from ..utils.state_file import locked_state, read_state
+from .rate_scheduler import DEFAULT_BACKOFF_SECONDS, MAX_BACKOFF_SECONDS, PUSHBACK_STATUSES, get_host, parse_retry_after
+
+# HTTP statuses that will not change on retry, by reason
+PERMANENT_STATUSES = {
+    400: 'bad_request',
+    401: 'unauthorized',
+    403: 'forbidden',
+    404: 'not_found',
+    405: 'method_not_allowed',
+    410: 'gone',
+    451: 'unavailable_for_legal_reasons',
+}
+
+# Transient failures are retried after about this long, doubling per attempt
+BASE_DELAY_SECONDS = 0.5
+
+# Longest backoff between two attempts without a Retry-After header
+MAX_DELAY_SECONDS = 30.0
+
+# Consecutive host failures that open the host's circuit
+FAILURE_THRESHOLD = 5
+
+# Failures further apart than this do not add up
+FAILURE_WINDOW_SECONDS = 60.0
+
+# How long an opened circuit rejects requests, doubling each time it reopens
+OPEN_SECONDS = 30.0
+
+# Longest time a circuit stays open
+MAX_OPEN_SECONDS = 300.0
+
+# A probe request of a half-open circuit holds it this long at most
+PROBE_SECONDS = 30.0
+
+# Messages of errors that lost their cause, e.g. reported through DownloadError text only
+MESSAGE_REASONS = (
+    (re.compile(r'Unsupported URL'), 'unsupported'),
+    (re.compile(r'Unable to extract|Unable to download (?:webpage|JSON)'), 'extraction'),
+    (re.compile(r'Private video|Sign in|login required|members-only', re.IGNORECASE), 'login_required'),
+    (re.compile(r'not available in your country|geo.?restrict', re.IGNORECASE), 'geo_restricted'),
+)
+
+
+class CircuitOpenError(Exception):
+    """Requests to a host are rejected while its circuit is open"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f'{host} is failing, requests paused for {retry_in:.0f}s')
+        self.host = host
+        self.retry_in = retry_in
+
+
+def iter_error_chain(error: Optional[BaseException]) -> Iterator[BaseException]:
+    """Yield an error and the errors it wraps (yt-dlp's exc_info and cause, then Python's chaining)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, 'exc_info', None)
+        error = ((exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None)
+                 or getattr(error, 'cause', None) or getattr(error, 'source_error', None)
+                 or error.__cause__ or error.__context__)
+
+
+def _classification(kind: str, reason: str, status: Optional[int] = None, retry_after: Optional[float] = None, host_failure: bool = False) -> Dict[str, Any]:
+    return {
+        'kind': kind,
+        'reason': reason,
+        'status': status,
+        'retry_after': retry_after,
+        'retryable': kind != 'permanent',
+        'host_failure': host_failure,
+    }
+
+
+def classify_status(status: int, retry_after: Optional[str] = None) -> Dict[str, Any]:
+    """Classify an HTTP error status
+
+    Throttling (429, 503), server errors and timeouts count against the
+    host. A 403 or a missing video (404, 410) is about one video (private,
+    geo-blocked, an expired signed URL) and says nothing about the host.
+    """
+    if status in PUSHBACK_STATUSES:
+        reason = 'rate_limited' if status == 429 else 'unavailable'
+        return _classification('throttled', reason, status, parse_retry_after(retry_after), host_failure=True)
+    if status in PERMANENT_STATUSES:
+        return _classification('permanent', PERMANENT_STATUSES[status], status)
+    if status == 408:
+        return _classification('transient', 'timeout', status, host_failure=True)
+    if 500 <= status < 600:
+        return _classification('transient', 'server_error', status, host_failure=True)
+    if 400 <= status < 500:
+        return _classification('permanent', 'client_error', status)
+    return _classification('transient', 'unknown', status)
+
+
+def classify_error(error: BaseException) -> Dict[str, Any]:
+    """Classify a failure as permanent, throttled or transient
+
+    Walks the chain of wrapped errors for the underlying HTTP or transport
+    error, falling back to the messages of extraction errors.
+
+    Returns:
+        Dictionary with ``kind``, ``reason``, ``status``, ``retry_after``
+        (seconds), ``retryable`` and ``host_failure``
+    """
+    from yt_dlp.networking.exceptions import CertificateVerifyError, HTTPError, TransportError
+    from yt_dlp.utils import GeoRestrictedError, UnsupportedError
+
+    for cause in iter_error_chain(error):
+        if isinstance(cause, CircuitOpenError):
+            return _classification('throttled', 'circuit_open', retry_after=cause.retry_in)
+        if isinstance(cause, HTTPError):
+            return classify_status(cause.status, cause.response.headers.get('Retry-After'))
+        if isinstance(cause, CertificateVerifyError):
+            return _classification('permanent', 'certificate')
+        if isinstance(cause, (TransportError, socket.timeout, ConnectionError)):
+            return _classification('transient', 'network', host_failure=True)
+        if isinstance(cause, GeoRestrictedError):
+            return _classification('permanent', 'geo_restricted')
+        if isinstance(cause, UnsupportedError):
+            return _classification('permanent', 'unsupported')
+
+    message = str(error)
+    status = re.search(r'HTTP Error (\d{3})', message)
+    if status:
+        return classify_status(int(status.group(1)))
+    for pattern, reason in MESSAGE_REASONS:
+        if pattern.search(message):
+            return _classification('permanent', reason)
+    return _classification('transient', 'unknown')
+
+
+def backoff_delay(attempt: int, classification: Optional[Dict[str, Any]] = None) -> float:
+    """Seconds to wait before retry ``attempt`` (counted from 0)
+
+    A Retry-After header is honoured as given, with a little jitter so jobs
+    refused together do not return together. Otherwise the delay doubles
+    per attempt up to MAX_DELAY_SECONDS, and a random half of it is jitter.
+    """
+    classification = classification or {}
+    if classification.get('retry_after') is not None:
+        return classification['retry_after'] * (1 + random.random() * 0.1)
+    base = DEFAULT_BACKOFF_SECONDS if classification.get('kind') == 'throttled' else BASE_DELAY_SECONDS
+    cap = min(MAX_DELAY_SECONDS, base * 2 ** attempt)
+    return cap / 2 + random.uniform(0, cap / 2)
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker shared by every job on the node
+
+    Host state lives in a JSON state file under the cache directory, as the
+    rate scheduler's does. After FAILURE_THRESHOLD consecutive host failures
+    the host's circuit opens: requests to it fail at once with
+    CircuitOpenError instead of tying up workers on retries. Once the open
+    period (or a longer Retry-After) is over, a single request is let
+    through as a probe; its success closes the circuit, its failure reopens
+    it for twice as long. Healthy hosts cost a lock-free state read per
+    request.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None, failure_threshold: int = FAILURE_THRESHOLD):
+        self.state_path = os.path.join(state_dir or get_default_cache_dir(), 'circuit_breaker.json')
+        self.failure_threshold = max(1, failure_threshold)
+        self.lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+
+    def before_request(self, url: str) -> bool:
+        """Raise CircuitOpenError if the host's circuit is open; return whether the host is tracked"""
+        host = get_host(url)
+        host_state = read_state(self.state_path).get(host)
+        if host_state is None:
+            return False
+        now = time.time()
+        if host_state.get('open_until', 0) <= now:
+            if 'open_until' not in host_state:
+                return True
+            # Half-open: one request on the node probes the host, the others keep failing fast
+            with locked_state(self.state_path) as state:
+                host_state = state.get(host)
+                if host_state is None or host_state.get('probe_until', 0) <= now:
+                    if host_state is not None:
+                        host_state['probe_until'] = now + PROBE_SECONDS
+                    return True
+            retry_in = host_state['probe_until'] - now
+        else:
+            retry_in = host_state['open_until'] - now
+        with self.lock:
+            self.rejected += 1
+        raise CircuitOpenError(host, retry_in)
+
+    def record_success(self, url: str) -> None:
+        """Close the host's circuit and forget its failures"""
+        host = get_host(url)
+        if host not in read_state(self.state_path):
+            return
+        with locked_state(self.state_path) as state:
+            host_state = state.pop(host, None)
+        if host_state and 'open_until' in host_state:
+            print(f'✅ {host} is answering again, resuming requests to it')
+
+    def record_failure(self, url: str, classification: Dict[str, Any]) -> None:
+        """Count a host failure, opening the host's circuit once they add up"""
+        if not classification['host_failure']:
+            return
+        host = get_host(url)
+        now = time.time()
+        with locked_state(self.state_path) as state:
+            host_state = state.setdefault(host, {})
+            if now - host_state.get('last_failure', now) > FAILURE_WINDOW_SECONDS:
+                host_state['failures'] = 0
+            host_state['failures'] = host_state.get('failures', 0) + 1
+            host_state['last_failure'] = now
+            probing = host_state.pop('probe_until', 0) > now
+            if host_state.get('open_until', 0) > now or not (probing or host_state['failures'] >= self.failure_threshold):
+                return
+            opens = host_state.get('opens', 0)
+            open_seconds = max(min(OPEN_SECONDS * 2 ** opens, MAX_OPEN_SECONDS),
+                               min(classification.get('retry_after') or 0, MAX_BACKOFF_SECONDS))
+            host_state.update(open_until=now + open_seconds, opens=opens + 1, failures=0)
+        with self.lock:
+            self.opened += 1
+        print(f'🚧 {host} failed {self.failure_threshold if not probing else "its probe"} time(s) in a row, pausing requests to it for {open_seconds:.0f}s')
+
+    def stats(self) -> Dict[str, Any]:
+        return {'opened': self.opened, 'rejected': self.rejected}
+
+
+class RetryPolicy:
+    """Decide whether and when yt-dlp retries a failed request
+
+    TaskYoutubeDL reports every request failure to ``on_error``, which
+    classifies it and remembers it for the current thread. yt-dlp's retry
+    loops then ask ``sleep_functions`` how long to wait: a permanent error
+    (403, 404, ...) is raised again at once instead of being retried,
+    a throttled one waits for its Retry-After, and anything else backs off
+    exponentially with jitter. Requests also pass the per-host circuit
+    breaker.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None, failure_threshold: int = FAILURE_THRESHOLD):
+        self.breaker = CircuitBreaker(state_dir, failure_threshold)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stopped = 0
+        self.waited = 0.0
+
+    def before_request(self, url: str) -> bool:
+        self.local.error = None
+        return self.breaker.before_request(url)
+
+    def on_success(self, url: str) -> None:
+        self.breaker.record_success(url)
+
+    def on_error(self, url: str, error: BaseException) -> Dict[str, Any]:
+        classification = classify_error(error)
+        self.local.error = (error, classification)
+        self.breaker.record_failure(url, classification)
+        return classification
+
+    def sleep_function(self, kind: str) -> Callable[..., float]:
+        """The retry_sleep_functions entry for a kind of retry"""
+        def sleep(n: int) -> float:
+            error, classification = getattr(self.local, 'error', None) or (None, None)
+            if classification is not None and not classification['retryable']:
+                self.local.error = None
+                with self.lock:
+                    self.stopped += 1
+                print(f'⛔ Not retrying {kind} request, the error is permanent ({classification["reason"]}): {error}')
+                raise error
+            delay = backoff_delay(n, classification)
+            with self.lock:
+                self.waited += delay
+            return delay
+        return sleep
+
+    def sleep_functions(self) -> Dict[str, Callable[..., float]]:
+        return {kind: self.sleep_function(kind) for kind in ('http', 'fragment', 'extractor')}
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.breaker.stats(), stopped=self.stopped, waited=round(self.waited, 3))
+
+
+@functools.lru_cache(maxsize=None)
+def get_retry_policy(state_dir: Optional[str] = None, failure_threshold: int = FAILURE_THRESHOLD) -> RetryPolicy:
+    """Return the retry policy for a configuration, shared by every job of this process"""
+    return RetryPolicy(state_dir, failure_threshold)
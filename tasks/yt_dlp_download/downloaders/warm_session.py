@@ -0,0 +1,186 @@
+"""Network sessions kept warm across the jobs of a long-lived worker"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+# Options the request director is built from; jobs only share a session when these match
+SESSION_OPTION_KEYS = (
+    'proxy', 'cookiefile', 'nocheckcertificate', 'source_address', 'socket_timeout', 'impersonate',
+    'legacyserverconnect', 'client_certificate', 'client_certificate_key', 'client_certificate_password',
+    'http_headers', 'enable_file_urls', 'debug_printtraffic', 'compat_opts',
+)
+
+# Idle sessions kept per set of network options
+MAX_IDLE_SESSIONS = 4
+
+
+def get_session_identity(params: Dict[str, Any]) -> str:
+    options = {key: params.get(key) for key in SESSION_OPTION_KEYS}
+    # compat_opts is a set, whose order would otherwise split equal options
+    options = {key: sorted(value) if isinstance(value, (set, frozenset)) else value for key, value in options.items()}
+    return json.dumps(options, sort_keys=True, default=str)
+
+
+def get_cookie_mtime(params: Dict[str, Any]) -> Optional[float]:
+    path = params.get('cookiefile')
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+class WarmSession:
+    """Cookie jar, HTTP request director and extractor instances of one job at a time
+
+    A session is only ever leased to one job, so extractors and connection
+    pools are reused across jobs but never shared between concurrent ones.
+    """
+
+    def __init__(self, identity: str):
+        self.identity = identity
+        self.cookiejar = None
+        self.request_director = None
+        self.extractors: Dict[str, Any] = {}
+        self.cookie_mtime: Optional[float] = None
+        self.jobs = 0
+        self.holders: List[Any] = []
+
+    def is_stale(self, params: Dict[str, Any]) -> bool:
+        """Check whether the cookie file changed since the session parsed it"""
+        return self.cookiejar is not None and get_cookie_mtime(params) != self.cookie_mtime
+
+    def cookies_saved(self, params: Dict[str, Any]) -> None:
+        """Record the cookie file written back by the session itself"""
+        self.cookie_mtime = get_cookie_mtime(params)
+
+    def acquire(self, ydl) -> None:
+        """Report the shared director's messages to a YoutubeDL starting to use the session"""
+        self.holders.append(ydl)
+        self._bind(ydl)
+
+    def release(self, ydl) -> None:
+        """Hand the session back to the YoutubeDL that used it before, if any
+
+        An idle session is bound to no YoutubeDL, so it keeps no finished
+        job's instance alive.
+        """
+        if ydl in self.holders:
+            self.holders.remove(ydl)
+        self._bind(self.holders[-1] if self.holders else None)
+
+    def detach(self) -> None:
+        """Unbind the session from every YoutubeDL once its job is over"""
+        self.holders.clear()
+        self._bind(None)
+
+    def _bind(self, ydl) -> None:
+        # The director and its handlers keep the logger of the YoutubeDL that built them
+        from yt_dlp.utils._utils import _YDLLogger
+
+        if self.request_director is not None:
+            logger = _YDLLogger(ydl)
+            self.request_director.logger = logger
+            for handler in self.request_director.handlers.values():
+                handler._logger = logger
+        for ie in self.extractors.values():
+            ie.set_downloader(ydl)
+
+    def close(self) -> None:
+        if self.request_director is not None:
+            self.request_director.close()
+            self.request_director = None
+        self.extractors.clear()
+
+
+class WarmSessionPool:
+    """Idle warm sessions, grouped by network options"""
+
+    def __init__(self, max_idle: int = MAX_IDLE_SESSIONS):
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.idle: Dict[str, List[WarmSession]] = {}
+        self.local = threading.local()
+        self.created = 0
+        self.reused = 0
+
+    @contextlib.contextmanager
+    def lease(self):
+        """Let the YoutubeDL instances of the current thread use warm sessions for one job
+
+        Leases are per thread; work a job hands to pool threads needs its own
+        lease there, see propagate.
+        """
+        self.local.sessions = {}
+        try:
+            yield
+        finally:
+            sessions, self.local.sessions = self.local.sessions, None
+            with self.lock:
+                for session in sessions.values():
+                    session.detach()
+                    idle = self.idle.setdefault(session.identity, [])
+                    if len(idle) < self.max_idle:
+                        idle.append(session)
+                    else:
+                        session.close()
+
+    def leased(self) -> bool:
+        """Check whether the current thread is inside a lease"""
+        return getattr(self.local, 'sessions', None) is not None
+
+    def propagate(self, fn):
+        """Wrap ``fn`` to run in a lease of its own when called from inside a lease
+
+        For the pool threads of batch jobs: each call leases sessions that
+        are not shared with concurrent calls. Outside a lease ``fn`` is
+        returned as is, and process pools cannot take leases at all.
+        """
+        if not self.leased():
+            return fn
+
+        @functools.wraps(fn)
+        def leased_call(*args, **kwargs):
+            if self.leased():
+                return fn(*args, **kwargs)
+            with self.lease():
+                return fn(*args, **kwargs)
+        return leased_call
+
+    def get(self, params: Dict[str, Any]) -> Optional[WarmSession]:
+        """Return the session leased to the current job for these options, if inside a lease"""
+        sessions = getattr(self.local, 'sessions', None)
+        if sessions is None:
+            return None
+
+        identity = get_session_identity(params)
+        session = sessions.get(identity)
+        if session is not None:
+            return session
+
+        with self.lock:
+            idle = self.idle.get(identity) or []
+            session = idle.pop() if idle else None
+        if session is not None and session.is_stale(params):
+            session.close()
+            session = None
+        if session is None:
+            session = WarmSession(identity)
+            self.created += 1
+        else:
+            self.reused += 1
+        session.jobs += 1
+        sessions[identity] = session
+        return session
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            idle = sum(len(sessions) for sessions in self.idle.values())
+        return {'created': self.created, 'reused': self.reused, 'idle': idle}
+
+
+# Sessions are only leased inside a worker; elsewhere every YoutubeDL stays cold
+warm_sessions = WarmSessionPool()
@@ -0,0 +1,175 @@
+"""YoutubeDL that routes downloads through the task's own downloaders"""
+
+import yt_dlp
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.extractor import get_info_extractor
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+from .clip_ranges import ClipTrimPP, clip_info, format_section
+from .extractor_index import GENERIC_KEY, get_extractor_index, get_extractor_order
+from .ranged_http import RangedHttpFD
+from .rate_scheduler import get_rate_scheduler
+from .retry_policy import get_retry_policy
+from .warm_session import warm_sessions
+
+
+class TaskYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL using RangedHttpFD for progressive HTTP downloads
+
+    Everything else (fragmented streams, merges, subtitles and test
+    downloads) keeps yt-dlp's own downloader selection. Every HTTP request,
+    from extraction to fragments, goes through the node-wide rate scheduler
+    configured by the ``rate_scheduler`` option, and past the per-host
+    circuit breaker of the retry policy configured by ``retry_policy``;
+    failures are reported to the policy, which decides on yt-dlp's retries.
+
+    With the ``extractor_index`` option, extractors are not all registered
+    up front: each URL loads only the extractors the index knows for its
+    host, plus the generic extractor as the fallback.
+
+    Inside a warm worker job, the cookie jar, HTTP connections and
+    extractor instances come from the job's leased warm session and
+    outlive the instance.
+
+    With the ``postprocess_pipeline`` option (a PipelineJob), post-processing
+    waits for a slot of the batch's post-processing pool, while the next
+    job's transfer proceeds.
+
+    With the ``shared_streams`` option (a SharedStreams), a stream that
+    another rendition of the video already downloaded is reused.
+
+    With ``download_ranges``, each time range of fragmented formats
+    downloads only the fragments overlapping it (see clip_info); ``clips``
+    lists the report of every range downloaded.
+    """
+
+    def __init__(self, params=None, auto_init=True):
+        index_options = (params or {}).get('extractor_index')
+        super().__init__(params, auto_init and index_options is None)
+        self.rate_scheduler = get_rate_scheduler(**(self.params.get('rate_scheduler') or {}))
+        self.retry_policy = get_retry_policy(**(self.params.get('retry_policy') or {}))
+        self.extractor_index = get_extractor_index(**index_options) if index_options is not None else None
+        self.warm_session = warm_sessions.get(self.params)
+        if self.warm_session is not None:
+            self.adopt_warm_session(self.warm_session)
+        self.clips = []
+        if self.params.get('download_ranges'):
+            # Cut fragment-aligned clips before any other post-processing
+            self._pps['post_process'].insert(0, ClipTrimPP(self))
+            self.add_progress_hook(self.count_clip_bytes)
+
+    def adopt_warm_session(self, session):
+        """Use the session's cookie jar and request director, creating them on first use"""
+        if session.cookiejar is None:
+            session.cookiejar = self.cookiejar
+            session.cookies_saved(self.params)
+        else:
+            self.__dict__['cookiejar'] = session.cookiejar
+        if session.request_director is None:
+            session.request_director = self._request_director
+        else:
+            self.__dict__['_request_director'] = session.request_director
+        session.acquire(self)
+
+    def close(self):
+        if self.warm_session is None:
+            return super().close()
+        # Keep the shared connections open for the next job, without holding on to this instance
+        self.__dict__.pop('_request_director', None)
+        super().close()
+        self.warm_session.cookies_saved(self.params)
+        self.warm_session.release(self)
+
+    def get_info_extractor(self, ie_key):
+        if self.warm_session is None or ie_key in self._ies_instances:
+            return super().get_info_extractor(ie_key)
+        ie = self.warm_session.extractors.get(ie_key)
+        if ie is None:
+            ie = super().get_info_extractor(ie_key)
+            self.warm_session.extractors[ie_key] = ie
+        else:
+            self.add_info_extractor(ie)
+        return ie
+
+    def extract_info(self, url, download=True, ie_key=None, extra_info=None, process=True, force_generic_extractor=False):
+        if self.extractor_index is not None:
+            if ie_key or force_generic_extractor:
+                self.load_extractors([ie_key or GENERIC_KEY])
+            else:
+                self.load_extractors(self.extractor_index.extractor_keys(url))
+        return super().extract_info(url, download, ie_key, extra_info, process, force_generic_extractor)
+
+    def load_extractors(self, keys):
+        """Register extractors that are not loaded yet, keeping yt-dlp's registry order"""
+        missing = [key for key in keys if key not in self._ies]
+        if not missing:
+            return
+        for key in missing:
+            self.add_info_extractor(get_info_extractor(key))
+        order = get_extractor_order()
+        self._ies = dict(sorted(self._ies.items(), key=lambda item: order.get(item[0], len(order))))
+
+    def urlopen(self, req):
+        url = req if isinstance(req, str) else getattr(req, 'url', None) or req.full_url
+        tracked = self.retry_policy.before_request(url)
+        self.rate_scheduler.before_request(url)
+        try:
+            response = super().urlopen(req)
+        except HTTPError as e:
+            self.rate_scheduler.on_response(url, e.status, e.response.headers.get('Retry-After'))
+            self.retry_policy.on_error(url, e)
+            raise
+        except TransportError as e:
+            self.retry_policy.on_error(url, e)
+            raise
+        if tracked:
+            self.retry_policy.on_success(url)
+        return self.rate_scheduler.wrap_response(response)
+
+    def dl(self, name, info, subtitle=False, test=False):
+        # Streams another rendition already downloaded are linked instead of fetched
+        shared_streams = None if subtitle or test or name == '-' else self.params.get('shared_streams')
+        if shared_streams is not None and shared_streams.fetch(info, name):
+            self.to_screen(f'[download] Reusing stream {info.get("format_id")} downloaded for another rendition')
+            return True, False
+        result = self.download_stream(name, info, subtitle, test)
+        if shared_streams is not None and result[0]:
+            shared_streams.store(info, name)
+        return result
+
+    def download_stream(self, name, info, subtitle=False, test=False):
+        if subtitle or test or name == '-' or (self.params.get('download_connections') or 1) < 2:
+            return super().dl(name, info, subtitle, test)
+        if not info.get('url') or get_suitable_downloader(info, self.params) is not HttpFD:
+            return super().dl(name, info, subtitle, test)
+
+        fd = RangedHttpFD(self, self.params)
+        for ph in self._progress_hooks:
+            fd.add_progress_hook(ph)
+        self.write_debug(f'Invoking {fd.FD_NAME} downloader on "{info["url"]}"')
+
+        new_info = self._copy_infodict(info)
+        if new_info.get('http_headers') is None:
+            new_info['http_headers'] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
+    def process_info(self, info_dict):
+        if info_dict.get('section_start') or info_dict.get('section_end'):
+            clip = clip_info(self, info_dict)
+            self.clips.append(clip)
+            method = f'{clip["fragments"][0]} of {clip["fragments"][1]} fragments' if clip['fragments'] else 'ffmpeg'
+            self.to_screen(f'[clip] {info_dict["id"]}: Downloading {format_section(clip["covered_start"], clip["covered_end"])}s ({method})')
+        return super().process_info(info_dict)
+
+    def count_clip_bytes(self, d):
+        if d['status'] == 'finished' and self.clips:
+            self.clips[-1]['downloaded_bytes'] += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+
+    def post_process(self, filename, info, files_to_move=None):
+        # In a pipelined batch, the job hands its transfer slot on and waits for a post-processing slot
+        job = self.params.get('postprocess_pipeline')
+        if job is None:
+            return super().post_process(filename, info, files_to_move)
+        with job.postprocessing():
+            return super().post_process(filename, info, files_to_move)
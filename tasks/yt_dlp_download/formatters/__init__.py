@@ -1,10 +1,20 @@
 """Formatters module for video downloader"""
 
-from .format_selector import get_format_string, get_optimal_format_for_hd
+from .format_selector import get_format_string, get_optimal_format_for_hd, get_equivalent_formats
 from .quality_analyzer import analyze_available_formats
+from .format_index import FormatIndex, get_format_index, QUALITY_HEIGHTS
+from .info_record import FormatRecord, InfoRecord, compact_entry, slim_info
 
 __all__ = [
     'get_format_string',
     'get_optimal_format_for_hd',
-    'analyze_available_formats'
+    'get_equivalent_formats',
+    'analyze_available_formats',
+    'FormatIndex',
+    'get_format_index',
+    'QUALITY_HEIGHTS',
+    'FormatRecord',
+    'InfoRecord',
+    'compact_entry',
+    'slim_info'
 ]
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""Indexed format analysis and ranked selection"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Maximum height for each quality setting
+QUALITY_HEIGHTS = {
+    '4K': 2160,
+    '2160p': 2160,
+    '1440p': 1440,
+    '1080p': 1080,
+    '720p': 720,
+    '480p': 480,
+    '360p': 360,
+    '240p': 240,
+}
+
+# Quality labels reported in the feature summary, highest first
+QUALITY_LABELS = (
+    (2160, '4K'),
+    (1440, '1440p'),
+    (1080, '1080p'),
+    (720, '720p'),
+    (480, '480p'),
+    (360, '360p'),
+    (240, '240p'),
+)
+
+# Precompiled codec matchers, applied once per format when the index is built
+CODEC_PATTERNS = {
+    'h264': re.compile(r'avc|h\.?264|x264', re.I),
+    'h265': re.compile(r'hevc|h\.?265|x265|hvc1|hev1', re.I),
+    'av1': re.compile(r'av01|av1', re.I),
+    'vp9': re.compile(r'vp0?9', re.I),
+}
+
+# Audio codecs that can be merged into each video container without re-encoding
+COMPATIBLE_AUDIO_EXTS = {
+    'mp4': ('m4a', 'mp4'),
+    'webm': ('webm',),
+}
+
+# Number of video candidates kept in a selection chain
+DEFAULT_CHAIN_LENGTH = 3
+
+# Private info dict key holding the index, dropped by yt-dlp when sanitizing
+INDEX_KEY = '__format_index'
+
+
+@lru_cache(maxsize=256)
+def get_codec_family(vcodec: Optional[str]) -> Optional[str]:
+    """Return the codec family name of a video codec string"""
+    if not vcodec or vcodec == 'none':
+        return None
+    for family, pattern in CODEC_PATTERNS.items():
+        if pattern.search(vcodec):
+            return family
+    return None
+
+
+def get_quality_label(height: int) -> Optional[str]:
+    """Return the quality label for a format height"""
+    for min_height, label in QUALITY_LABELS:
+        if height >= min_height:
+            return label
+    return None
+
+
+def is_hdr(fmt: Dict[str, Any]) -> bool:
+    """Check whether a format has a high dynamic range"""
+    return 'HDR' in (fmt.get('dynamic_range') or '')
+
+
+def is_high_fps(fmt: Dict[str, Any]) -> bool:
+    """Check whether a format has a frame rate of 50fps or more"""
+    return (fmt.get('fps') or 0) >= 50
+
+
+def has_audio(fmt: Dict[str, Any]) -> bool:
+    """Check whether a format carries an audio stream"""
+    acodec = fmt.get('acodec')
+    return bool(acodec) and acodec != 'none'
+
+
+class FormatIndex:
+    """Formats of an info dict, ranked once and bucketed by codec, dynamic range and fps
+
+    The index serves both the feature summary shown to the user and format
+    selection, so the format list is only walked once per info dict. Video
+    formats are ranked by height, then bitrate; the codec, HDR and high
+    frame rate buckets are filtered from the ranked list on first use and
+    stay ranked.
+    """
+
+    def __init__(self, formats: List[Dict[str, Any]]):
+        self.video: List[Dict[str, Any]] = []
+        self.audio: List[Dict[str, Any]] = []
+        self.qualities: Set[str] = set()
+        self.hdr_available = False
+        self.high_fps_available = False
+        self._buckets: Dict[str, List[Dict[str, Any]]] = {}
+
+        heights = set()
+        for fmt in formats:
+            height = fmt.get('height')
+            if not height or fmt.get('vcodec') == 'none':
+                if has_audio(fmt):
+                    self.audio.append(fmt)
+                continue
+
+            self.video.append(fmt)
+            heights.add(height)
+            if not self.hdr_available and is_hdr(fmt):
+                self.hdr_available = True
+            if not self.high_fps_available and is_high_fps(fmt):
+                self.high_fps_available = True
+
+        for height in heights:
+            label = get_quality_label(height)
+            if label:
+                self.qualities.add(label)
+
+        # Rank once: highest resolution first, then highest bitrate
+        self.video.sort(key=lambda fmt: (fmt['height'], fmt.get('tbr') or 0), reverse=True)
+        self.audio.sort(key=lambda fmt: (fmt.get('abr') or fmt.get('tbr') or 0), reverse=True)
+
+    def summary(self) -> Tuple[Set[str], bool, bool]:
+        """Return (available_qualities, hdr_available, high_fps_available)"""
+        return set(self.qualities), self.hdr_available, self.high_fps_available
+
+    def bucket(self, name: str) -> List[Dict[str, Any]]:
+        """Return the ranked video formats of a bucket: 'hdr', 'high_fps' or a codec family"""
+        formats = self._buckets.get(name)
+        if formats is None:
+            if name == 'hdr':
+                formats = [fmt for fmt in self.video if is_hdr(fmt)]
+            elif name == 'high_fps':
+                formats = [fmt for fmt in self.video if is_high_fps(fmt)]
+            else:
+                formats = [fmt for fmt in self.video if get_codec_family(fmt.get('vcodec')) == name]
+            self._buckets[name] = formats
+        return formats
+
+    def iter_video(self, quality: str, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None, max_tbr: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Yield matching video formats, best first"""
+        max_height = QUALITY_HEIGHTS.get(quality)
+
+        # Start from a bucket that already satisfies one requirement
+        if codec_preference:
+            candidates = self.bucket(codec_preference)
+        elif hdr:
+            candidates = self.bucket('hdr')
+        elif high_fps:
+            candidates = self.bucket('high_fps')
+        else:
+            candidates = self.video
+
+        for fmt in candidates:
+            if max_height is not None and fmt['height'] > max_height:
+                continue
+            if (hdr and not is_hdr(fmt)) or (high_fps and not is_high_fps(fmt)):
+                continue
+            tbr = fmt.get('tbr')
+            if max_tbr and tbr and tbr > max_tbr:
+                continue
+            yield fmt
+
+    def rank_video(self, quality: str, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None, max_tbr: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return matching video formats, best first"""
+        return list(self.iter_video(quality, hdr, high_fps, codec_preference, max_tbr))
+
+    def equivalents(self, quality: str, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None, max_tbr: Optional[float] = None, limit: int = DEFAULT_CHAIN_LENGTH) -> List[Dict[str, Any]]:
+        """Return the best matching video format and up to ``limit - 1`` others of the same height, HDR and fps class"""
+        ranked = self.iter_video(quality, hdr, high_fps, codec_preference, max_tbr)
+        top = next(ranked, None)
+        if top is None:
+            return []
+        formats = [top]
+        for fmt in ranked:
+            if len(formats) >= limit or fmt['height'] < top['height']:
+                break
+            if is_hdr(fmt) == is_hdr(top) and is_high_fps(fmt) == is_high_fps(top):
+                formats.append(fmt)
+        return formats
+
+    def best_audio(self, video_ext: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the best audio format, preferring one that merges into the video container"""
+        if not self.audio:
+            return None
+        compatible = COMPATIBLE_AUDIO_EXTS.get(video_ext or '')
+        if compatible:
+            for fmt in self.audio:
+                if fmt.get('ext') in compatible:
+                    return fmt
+        return self.audio[0]
+
+    def select(self, quality: str, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None, max_tbr: Optional[float] = None, limit: int = DEFAULT_CHAIN_LENGTH, preferred: Optional[str] = None) -> List[str]:
+        """Return a ranked chain of format specs, best first
+
+        When fewer than ``limit`` formats match every requirement, the chain
+        is extended with candidates that drop the HDR, high frame rate and
+        codec requirements, in that order. A ``preferred`` video format ID
+        (e.g. the fastest source found by probing) leads the chain.
+        """
+        relaxations = [
+            (hdr, high_fps, codec_preference),
+            (False, high_fps, codec_preference),
+            (False, False, codec_preference),
+            (False, False, None),
+        ]
+
+        chain = []
+        seen = set()
+        for fmt in self.video:
+            if preferred is not None and fmt['format_id'] == preferred:
+                chain.append(self._format_spec(fmt))
+                seen.add(preferred)
+                break
+        for relaxed in relaxations:
+            for fmt in self.iter_video(quality, *relaxed, max_tbr=max_tbr):
+                if fmt['format_id'] in seen:
+                    continue
+                seen.add(fmt['format_id'])
+                chain.append(self._format_spec(fmt))
+                if len(chain) >= limit:
+                    return chain
+        return chain
+
+    def _format_spec(self, fmt: Dict[str, Any]) -> str:
+        audio = None if has_audio(fmt) else self.best_audio(fmt.get('ext'))
+        if audio is None:
+            return str(fmt['format_id'])
+        return f"{fmt['format_id']}+{audio['format_id']}"
+
+
+def get_format_index(info: Dict[str, Any]) -> FormatIndex:
+    """Return the format index of an info dict or InfoRecord, building it on first use"""
+    format_index = getattr(info, 'format_index', None)
+    if format_index is not None:
+        return format_index
+    index = info.get(INDEX_KEY)
+    if index is None:
+        index = FormatIndex(info.get('formats') or [])
+        info[INDEX_KEY] = index
+    return index
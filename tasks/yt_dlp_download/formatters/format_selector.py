@@ -1,8 +1,9 @@
 """Format selector for video downloader"""
 
-import re
 from typing import Optional
 
+from .format_index import get_format_index
+
 
 def get_format_string(quality: str, audio_only: bool, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None, bitrate_limit: Optional[str] = None) -> str:
     """Return the corresponding format string based on quality requirements"""
@@ -47,22 +48,12 @@ def get_format_string(quality: str, audio_only: bool, hdr: bool = False, high_fp
         elif codec_preference == 'av1':
             filters.append('vcodec~="^av01"')
         elif codec_preference == 'vp9':
-            filters.append('vcodec~="^vp9"')
+            filters.append('vcodec~="^vp0?9"')
     
     # Bitrate limit
-    if bitrate_limit:
-        try:
-            # Parse bitrate limit properly (e.g., "5000k" -> 5000, "10m" -> 10000)
-            bitrate_str = bitrate_limit.strip().lower()
-            if bitrate_str.endswith('m'):
-                bitrate_val = int(float(bitrate_str[:-1]) * 1000)
-            elif bitrate_str.endswith('k'):
-                bitrate_val = int(bitrate_str[:-1])
-            else:
-                bitrate_val = int(bitrate_str)
-            filters.append(f'tbr<={bitrate_val}')
-        except (ValueError, IndexError):
-            pass  # Invalid bitrate format, ignore
+    bitrate_val = parse_bitrate_limit(bitrate_limit)
+    if bitrate_val:
+        filters.append(f'tbr<={bitrate_val}')
     
     # Construct format string
     if filters:
@@ -93,55 +84,39 @@ def get_format_string(quality: str, audio_only: bool, hdr: bool = False, high_fp
     return 'bestvideo+bestaudio/best'
 
 
-def get_optimal_format_for_hd(info: dict, quality: str, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None) -> Optional[str]:
-    """Get optimal format string based on available formats for HD video"""
-    formats = info.get('formats', [])
-    
-    # Filter formats based on requirements
-    suitable_formats = []
-    
-    for fmt in formats:
-        height = fmt.get('height', 0)
-        fps = fmt.get('fps', 0)
-        vcodec = fmt.get('vcodec', '')
-        dynamic_range = fmt.get('dynamic_range', '')
-        
-        # Check quality requirement
-        if quality == '4K' and height < 2160:
-            continue
-        elif quality == '1440p' and height < 1440:
-            continue
-        elif quality == '1080p' and height < 1080:
-            continue
-        elif quality == '720p' and height < 720:
-            continue
-        
-        # Check HDR requirement
-        if hdr and 'HDR' not in dynamic_range:
-            continue
-        
-        # Check high FPS requirement
-        if high_fps and fps < 50:
-            continue
-        
-        # Check codec preference - only if explicitly specified
-        if codec_preference:
-            if codec_preference == 'h265' and not re.search(r'(hevc|h265|x265)', vcodec, re.I):
-                continue
-            elif codec_preference == 'av1' and not re.search(r'av01', vcodec, re.I):
-                continue
-            elif codec_preference == 'vp9' and not re.search(r'vp9', vcodec, re.I):
-                continue
-            elif codec_preference == 'h264' and not re.search(r'(avc|h264|x264)', vcodec, re.I):
-                continue
-        
-        suitable_formats.append(fmt)
-    
-    if suitable_formats:
-        # Sort by quality (height, then bitrate)
-        suitable_formats.sort(key=lambda x: (x.get('height', 0), x.get('tbr', 0)), reverse=True)
-        best_format = suitable_formats[0]
-        return f"{best_format['format_id']}+bestaudio"
+def parse_bitrate_limit(bitrate_limit: Optional[str]) -> Optional[int]:
+    """Parse a bitrate limit like "5000k" or "10m" into kbps"""
+    if not bitrate_limit:
+        return None
+    try:
+        # Parse bitrate limit properly (e.g., "5000k" -> 5000, "10m" -> 10000)
+        bitrate_str = bitrate_limit.strip().lower()
+        if bitrate_str.endswith('m'):
+            return int(float(bitrate_str[:-1]) * 1000)
+        elif bitrate_str.endswith('k'):
+            return int(bitrate_str[:-1])
+        else:
+            return int(bitrate_str)
+    except (ValueError, IndexError):
+        return None  # Invalid bitrate format, ignore
+
+
+def get_optimal_format_for_hd(info: dict, quality: str, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None, bitrate_limit: Optional[str] = None, preferred_format: Optional[str] = None) -> Optional[str]:
+    """Get optimal format string based on available formats
+
+    Returns a ranked fallback chain such as ``"401+251/400+251/137+140"``,
+    led by ``preferred_format`` if given, or None if no video format is at
+    or below the requested quality.
+    """
+    chain = get_format_index(info).select(quality, hdr, high_fps, codec_preference, parse_bitrate_limit(bitrate_limit), preferred=preferred_format)
+    if chain:
+        return '/'.join(chain)
     
     # Fallback to standard format selection
-    return None
\ No newline at end of file
+    return None
+
+
+def get_equivalent_formats(info: dict, quality: str, hdr: bool = False, high_fps: bool = False, codec_preference: Optional[str] = None, bitrate_limit: Optional[str] = None, limit: int = 3) -> list:
+    """IDs of the best matching video format and of others of the same height, HDR and fps class"""
+    formats = get_format_index(info).equivalents(quality, hdr, high_fps, codec_preference, parse_bitrate_limit(bitrate_limit), limit)
+    return [fmt['format_id'] for fmt in formats]
@@ -0,0 +1,123 @@
+"""Compact records of extracted video info
+
+A yt-dlp info dict carries every format with its URL, HTTP headers and
+fragment list, plus subtitles and automatic captions in every language.
+Display, format analysis and the task outputs only read a handful of
+fields, so they work on the slotted records below; the raw dict is slimmed
+to what the planned download needs as soon as the formats are chosen.
+"""
+
+import sys
+from typing import Any, Dict, List, Optional
+
+from .format_index import INDEX_KEY, FormatIndex
+
+# Format fields read by FormatIndex
+FORMAT_FIELDS = ('format_id', 'ext', 'vcodec', 'acodec', 'height', 'fps', 'tbr', 'abr', 'dynamic_range')
+
+# Info fields read by display_video_info, prepare_video_info and the sidecars
+INFO_FIELDS = (
+    'id', 'title', 'duration', 'uploader', 'view_count', 'upload_date', 'webpage_url', 'thumbnail',
+    'extractor', 'extractor_key',
+)
+
+# Info keys never read once the formats are chosen
+UNUSED_INFO_KEYS = ('heatmap', INDEX_KEY)
+
+# Info keys only read when subtitles are written
+SUBTITLE_INFO_KEYS = ('subtitles', 'automatic_captions')
+
+
+def _intern(value: Any) -> Any:
+    # Codec names and extensions repeat across every format of a playlist
+    return sys.intern(value) if type(value) is str else value
+
+
+class FormatRecord:
+    """The fields of a yt-dlp format that format analysis and selection read
+
+    Supports ``get`` and item access for the fields it holds, so FormatIndex
+    takes records and format dicts alike.
+    """
+
+    __slots__ = FORMAT_FIELDS
+
+    def __init__(self, fmt: Dict[str, Any]):
+        for field in FORMAT_FIELDS:
+            value = fmt.get(field)
+            if value is not None:
+                setattr(self, field, _intern(value))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in FORMAT_FIELDS else default
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+class InfoRecord:
+    """The fields of an info dict the task displays and outputs, plus its format table
+
+    Fields missing from the info dict stay unset, so ``get`` returns the
+    default just like ``dict.get`` would.
+    """
+
+    __slots__ = INFO_FIELDS + ('formats', '_format_index')
+
+    def __init__(self, info: Dict[str, Any]):
+        for field in INFO_FIELDS:
+            if field in info:
+                setattr(self, field, info[field])
+        self.formats = tuple(FormatRecord(fmt) for fmt in info.get('formats') or [])
+        self._format_index = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in INFO_FIELDS else default
+
+    @property
+    def format_index(self) -> FormatIndex:
+        if self._format_index is None:
+            self._format_index = FormatIndex(self.formats)
+        return self._format_index
+
+
+def slim_info(info: Dict[str, Any], planned: Dict[str, Any]) -> Dict[str, Any]:
+    """Shallow copy of an info dict keeping only what the planned download reads
+
+    Formats other than the selected ones are dropped, as are subtitles when
+    none were requested. Format selection on the slimmed dict picks the same
+    formats, so it can stand in for the raw dict from here on.
+    """
+    slim = {key: value for key, value in info.items() if key not in UNUSED_INFO_KEYS}
+    formats = info.get('formats')
+    # Formats without IDs are only numbered by yt-dlp during processing, so they cannot be matched
+    if formats and all(fmt.get('format_id') for fmt in formats):
+        selected = {fmt.get('format_id') for fmt in planned.get('requested_formats') or [planned]}
+        slim['formats'] = [fmt for fmt in formats if fmt['format_id'] in selected]
+    if not planned.get('requested_subtitles'):
+        for key in SUBTITLE_INFO_KEYS:
+            slim.pop(key, None)
+    return slim
+
+
+def compact_entry(info: Dict[str, Any], keep_subtitles: bool) -> Dict[str, Any]:
+    """Shrink a fully extracted playlist entry that waits in the batch queue
+
+    Drops keys the download never reads, subtitles unless they will be
+    written, and shares identical ``http_headers`` dicts between formats.
+    """
+    dropped = UNUSED_INFO_KEYS if keep_subtitles else UNUSED_INFO_KEYS + SUBTITLE_INFO_KEYS
+    entry = {key: value for key, value in info.items() if key not in dropped}
+    headers: Dict[Any, Dict[str, str]] = {}
+    formats: List[Dict[str, Any]] = []
+    for fmt in info.get('formats') or []:
+        fmt_headers: Optional[Dict[str, str]] = fmt.get('http_headers')
+        if fmt_headers:
+            fmt = dict(fmt, http_headers=headers.setdefault(tuple(sorted(fmt_headers.items())), fmt_headers))
+        formats.append(fmt)
+    if formats:
+        entry['formats'] = formats
+    return entry
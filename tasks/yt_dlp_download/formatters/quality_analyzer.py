@@ -1,6 +1,8 @@
 """Quality analyzer for video formats"""
 
-from typing import Dict, Set, Tuple
+from typing import Set, Tuple
+
+from .format_index import FormatIndex, QUALITY_HEIGHTS
 
 
 def analyze_available_formats(formats: list) -> Tuple[Set[str], bool, bool]:
@@ -9,39 +11,15 @@ def analyze_available_formats(formats: list) -> Tuple[Set[str], bool, bool]:
     Returns:
         Tuple of (available_qualities, hdr_available, high_fps_available)
     """
-    available_qualities = set()
-    hdr_available = False
-    high_fps_available = False
-    
-    for fmt in formats:
-        height = fmt.get('height')
-        fps = fmt.get('fps', 0)
-        dynamic_range = fmt.get('dynamic_range', '')
-        
-        if height:
-            if height >= 2160:
-                available_qualities.add('4K')
-            elif height >= 1440:
-                available_qualities.add('1440p')
-            elif height >= 1080:
-                available_qualities.add('1080p')
-            elif height >= 720:
-                available_qualities.add('720p')
-        
-        if dynamic_range and 'HDR' in dynamic_range:
-            hdr_available = True
-        
-        if fps and fps >= 50:
-            high_fps_available = True
-    
-    return available_qualities, hdr_available, high_fps_available
+    return FormatIndex(formats).summary()
 
 
 def get_format_features_info(available_qualities: Set[str], hdr_available: bool, high_fps_available: bool) -> list:
     """Get formatted features information"""
     features = []
     if available_qualities:
-        features.append(f"Qualities: {', '.join(sorted(available_qualities, reverse=True))}")
+        ordered = sorted(available_qualities, key=lambda quality: QUALITY_HEIGHTS.get(quality, 0), reverse=True)
+        features.append(f"Qualities: {', '.join(ordered)}")
     if hdr_available:
         features.append("HDR available")
     if high_fps_available:
@@ -1,11 +1,76 @@
 """Handlers module for video downloader"""
 
+import importlib
+
 from .progress_handler import create_progress_hook
 from .info_handler import display_video_info, prepare_video_info, display_download_info
+from .download_handler import download_with_info, signed_urls_expired
+from .batch_handler import get_batch_urls, get_url_host, resolve_batch_url, run_batch
+from .io_handler import DiskIoController, create_disk_io_controller, parse_io_mode, resolve_io_mode
+from .concurrency_handler import FragmentConcurrencyController, create_fragment_controller, get_fragment_host, parse_fragment_concurrency
+from .metrics_handler import JobMetrics, NullMetrics, create_job_metrics
+from .pipeline_handler import DEFAULT_POSTPROCESS_WORKERS, PipelineJob, PostprocessPipeline
+from .probe_handler import DEFAULT_PROBE_CANDIDATES, SourceProber, create_source_prober
+from .rendition_handler import RenditionProgress, SharedStreams, get_rendition_params, parse_renditions
+from .playlist_handler import build_entry_filter, check_entry, is_playlist_result, parse_playlist_items
+from .sidecar_handler import ThumbnailFetcher, parse_info_json_mode, prepare_compact_info, start_thumbnail_fetch, write_compact_info_json
 
 __all__ = [
     'create_progress_hook',
     'display_video_info',
     'prepare_video_info',
-    'display_download_info'
-]
\ No newline at end of file
+    'display_download_info',
+    'download_with_info',
+    'signed_urls_expired',
+    'OutputCollector',
+    'collect_output_files',
+    'StagedMovePP',
+    'get_batch_urls',
+    'get_url_host',
+    'resolve_batch_url',
+    'run_batch',
+    'FragmentConcurrencyController',
+    'create_fragment_controller',
+    'get_fragment_host',
+    'parse_fragment_concurrency',
+    'DiskIoController',
+    'create_disk_io_controller',
+    'parse_io_mode',
+    'resolve_io_mode',
+    'JobMetrics',
+    'NullMetrics',
+    'create_job_metrics',
+    'DEFAULT_POSTPROCESS_WORKERS',
+    'PipelineJob',
+    'PostprocessPipeline',
+    'DEFAULT_PROBE_CANDIDATES',
+    'SourceProber',
+    'create_source_prober',
+    'RenditionProgress',
+    'SharedStreams',
+    'get_rendition_params',
+    'parse_renditions',
+    'build_entry_filter',
+    'check_entry',
+    'is_playlist_result',
+    'parse_playlist_items',
+    'ThumbnailFetcher',
+    'parse_info_json_mode',
+    'prepare_compact_info',
+    'start_thumbnail_fetch',
+    'write_compact_info_json'
+]
+
+# Names from modules that import yt-dlp, loaded on first use to keep the package import cheap
+_LAZY_ATTRIBUTES = {
+    'OutputCollector': '.output_handler',
+    'collect_output_files': '.output_handler',
+    'StagedMovePP': '.output_handler',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return getattr(importlib.import_module(module, __name__), name)
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""Batch handler for video downloader"""
+
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from ..formatters.info_record import compact_entry
+from .playlist_handler import DEFAULT_PLAYLIST_WINDOW, is_playlist_result, iter_playlist_entries, take_entries
+
+
+# How often aggregate progress is reported while waiting on workers
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+
+def get_url_host(url: str) -> str:
+    """Return the lowercase host of a URL, used as the concurrency key"""
+    return (urlparse(url).hostname or '').lower()
+
+
+def resolve_batch_url(url: str, ydl_opts: Dict[str, Any], entry_filter: Optional[str] = None) -> Dict[str, Any]:
+    """Resolve a batch URL into a lazy playlist or an extracted video info
+
+    Playlists are expanded flat and lazily: the returned ``entries``
+    iterator fetches playlist pages as it is consumed and drops entries
+    failing ``entry_filter`` before they are extracted. For a single video
+    the unprocessed extraction result is returned, compacted, so the
+    download does not extract the same URL again.
+    """
+    from ..downloaders import TaskYoutubeDL
+
+    ydl = TaskYoutubeDL(dict(ydl_opts, extract_flat='in_playlist'))
+    try:
+        ie_result = ydl.extract_info(url, download=False, process=False)
+    except Exception as e:
+        ydl.close()
+        # yt-dlp errors carry HTTP responses that cannot cross process boundaries
+        raise ValueError(f"Unable to resolve URL: {e}") from None
+
+    if is_playlist_result(ie_result):
+        # The iterator keeps ydl open for the remaining pages and closes it when done
+        return {'entries': iter_playlist_entries(ydl, ie_result, url, entry_filter)}
+
+    with ydl:
+        if ie_result.get('_type') in ('url', 'url_transparent'):
+            return {'url': ie_result['url'], 'info': None}
+        return {'info': compact_entry(ydl.sanitize_info(ie_result), bool(ydl.params.get('writesubtitles')))}
+
+
+class PlaylistStream:
+    """A playlist being expanded: its entry iterator and how far it got"""
+
+    def __init__(self, key, url: str, entries):
+        self.key = key
+        self.url = url
+        self.entries = entries
+        self.pulling = 0
+        self.count = 0
+
+
+class ItemProgressReporter:
+    """Progress reporter for a single batch item, stored into a shared mapping"""
+
+    def __init__(self, progress, key):
+        self.progress = progress
+        self.key = key
+
+    def report_progress(self, percent: int) -> None:
+        self.progress[self.key] = percent
+
+
+class HostLimiter:
+    """Limit the number of in-flight jobs per host"""
+
+    def __init__(self, max_per_host: int):
+        self.max_per_host = max(1, max_per_host)
+        self.active = Counter()
+
+    def acquire(self, host: str) -> bool:
+        if self.active[host] >= self.max_per_host:
+            return False
+        self.active[host] += 1
+        return True
+
+    def release(self, host: str) -> None:
+        self.active[host] -= 1
+
+
+def run_batch(
+    urls: List[str],
+    resolve_fn: Callable[[str], Dict[str, Any]],
+    download_fn: Callable[..., Dict[str, Any]],
+    context,
+    max_workers: int = 4,
+    max_per_host: int = 2,
+    worker_mode: str = 'thread',
+    window: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Resolve and download a list of URLs on a bounded worker pool
+
+    Each URL is first resolved by ``resolve_fn`` on a resolver thread, then
+    every entry is downloaded by ``download_fn(url, info, reporter)``, which
+    must be picklable when ``worker_mode`` is ``'process'``. Playlists are
+    pulled from their lazy entry iterators in chunks, so downloads start as
+    soon as the first entries resolve. At most ``window`` items are resolved
+    or being resolved without having finished downloading.
+
+    Returns:
+        One result per downloaded item, in input order, each with
+        ``url``, ``video_path``, ``info`` and ``error``
+    """
+    # Worker pools are only imported by batch jobs, keeping single downloads quick to start
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+    from ..downloaders.warm_session import warm_sessions
+
+    use_processes = worker_mode == 'process'
+    # Inside a warm worker, each item leases its own sessions on the pool thread running it
+    resolve_fn = warm_sessions.propagate(resolve_fn)
+    if not use_processes:
+        download_fn = warm_sessions.propagate(download_fn)
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    manager = multiprocessing.Manager() if use_processes else None
+    progress = manager.dict() if manager else {}
+
+    max_workers = max(1, max_workers)
+    window = max(window or DEFAULT_PLAYLIST_WINDOW, max_workers)
+    limiter = HostLimiter(max_per_host)
+    pending = deque(
+        {'stage': 'resolve', 'key': (index,), 'url': url, 'info': None}
+        for index, url in enumerate(urls)
+    )
+    streams: List[PlaylistStream] = []
+    queue = deque()
+    results = {}
+    outstanding = 0
+    last_percent = -1
+
+    try:
+        # Resolution is network-bound and keeps playlist iterators alive, so it always runs on threads
+        with executor_cls(max_workers=max_workers) as executor, ThreadPoolExecutor(max_workers=max_workers) as resolver:
+            futures = {}
+            while pending or streams or queue or futures:
+                downloading = sum(1 for job, _ in futures.values() if job['stage'] == 'download')
+                deferred = deque()
+                while queue and downloading < max_workers:
+                    job = queue.popleft()
+                    host = get_url_host(job['url'])
+                    if not limiter.acquire(host):
+                        deferred.append(job)
+                        continue
+                    reporter = ItemProgressReporter(progress, job['key'])
+                    futures[executor.submit(download_fn, job['url'], job['info'], reporter)] = (job, host)
+                    downloading += 1
+                queue.extendleft(reversed(deferred))
+
+                # Earlier playlists fill the window first. Page fetches are not held back by
+                # the per-host limit, or downloads from the same host would starve them
+                for stream in streams:
+                    if stream.pulling or outstanding >= window:
+                        continue
+                    stream.pulling = window - outstanding
+                    outstanding += stream.pulling
+                    job = {'stage': 'expand', 'key': stream.key, 'url': stream.url, 'stream': stream}
+                    futures[resolver.submit(take_entries, stream.entries, stream.pulling)] = (job, None)
+
+                deferred = deque()
+                while pending and outstanding < window:
+                    job = pending.popleft()
+                    host = get_url_host(job['url'])
+                    if not limiter.acquire(host):
+                        deferred.append(job)
+                        continue
+                    outstanding += 1
+                    futures[resolver.submit(resolve_fn, job['url'])] = (job, host)
+                pending.extendleft(reversed(deferred))
+
+                done, _ = wait(futures, timeout=PROGRESS_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, host = futures.pop(future)
+                    if host is not None:
+                        limiter.release(host)
+                    outstanding -= handle_job_result(job, future, queue, streams, results, progress)
+
+                remaining = len(pending) + len(streams) + len(queue) + len(futures)
+                percent = aggregate_percent(progress, len(results), remaining)
+                if percent != last_percent:
+                    context.report_progress(percent)
+                    last_percent = percent
+    finally:
+        for stream in streams:
+            try:
+                stream.entries.close()
+            except Exception:
+                pass
+        if manager:
+            manager.shutdown()
+
+    return [results[key] for key in sorted(results)]
+
+
+def handle_job_result(job: Dict[str, Any], future, queue: deque, streams: List[PlaylistStream], results: Dict, progress) -> int:
+    """Record a finished job, queueing downloads for resolved entries
+
+    Returns:
+        The number of window slots the job gave back
+    """
+    key = job['key']
+    stream = job.get('stream')
+    try:
+        outcome = future.result()
+    except Exception as e:
+        print(f'❌ Batch item failed: {job["url"]} - {e}')
+        results[key] = {'url': job['url'], 'video_path': '', 'info': {}, 'error': str(e)}
+        progress[key] = 100
+        if stream:
+            streams.remove(stream)
+            return stream.pulling
+        return 1
+
+    if job['stage'] == 'download':
+        results[key] = {'url': job['url'], 'video_path': outcome['video_path'], 'info': outcome['info'], 'error': None}
+        progress[key] = 100
+        return 1
+
+    if stream:
+        items, exhausted = outcome
+        for index, item in items:
+            queue.append({'stage': 'download', 'key': key + (index,), 'url': item['url'], 'info': item['info']})
+        stream.count += len(items)
+        released, stream.pulling = stream.pulling - len(items), 0
+        if exhausted:
+            streams.remove(stream)
+            print(f'📃 Playlist expanded: {job["url"]} ({stream.count} entries)')
+        return released
+
+    if 'entries' in outcome:
+        print(f'📃 Expanding playlist: {job["url"]}')
+        streams.append(PlaylistStream(key, job['url'], outcome['entries']))
+        return 1
+
+    queue.append({'stage': 'download', 'key': key + (0,), 'url': outcome.get('url') or job['url'], 'info': outcome['info']})
+    return 0
+
+
+def aggregate_percent(progress, finished: int, remaining: int) -> int:
+    """Aggregate per-item progress into an overall percentage"""
+    total = finished + remaining
+    if total == 0:
+        return 100
+    return int(sum(progress.values()) / total)
+
+
+def get_batch_urls(url: Optional[str], urls: Optional[List[str]]) -> List[str]:
+    """Merge the single URL input with the URL list, dropping blanks and duplicates"""
+    merged = []
+    for item in [url] + list(urls or []):
+        if item and item.strip() and item.strip() not in merged:
+            merged.append(item.strip())
+    return merged
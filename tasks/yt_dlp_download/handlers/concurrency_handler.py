@@ -0,0 +1,225 @@
+"""Adaptive fragment concurrency for HLS/DASH downloads"""
+
+import functools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from ..utils.file_utils import get_default_cache_dir
+from ..utils.state_file import locked_state, read_state
+
+# Default bounds for the number of in-flight fragments
+DEFAULT_MIN_FRAGMENTS = 1
+DEFAULT_MAX_FRAGMENTS = 16
+
+# Concurrency used for a host without any measurements
+DEFAULT_INITIAL_FRAGMENTS = 4
+
+# Throughput gain required before settling on a higher concurrency
+GAIN_THRESHOLD = 0.10
+
+# Throughput loss tolerated when dropping to a lower concurrency
+LOSS_TOLERANCE = 0.05
+
+# Fraction of fragment requests that may fail before concurrency is halved
+MAX_ERROR_RATE = 0.05
+
+# Weight of a new throughput sample in the moving average
+EWMA_ALPHA = 0.5
+
+# Measurements older than this are ignored, so changed conditions are re-probed
+MEASUREMENT_TTL_SECONDS = 6 * 3600
+
+# Streams smaller than this are too noisy to learn from
+MIN_SAMPLE_BYTES = 1024 * 1024
+
+# Protocols whose formats are downloaded as fragments
+FRAGMENTED_PROTOCOLS = ('m3u8', 'http_dash_segments', 'f4m', 'ism')
+
+
+def parse_fragment_concurrency(value: Any) -> Optional[int]:
+    """Parse the concurrent_fragments input; None means adaptive"""
+    if value is None or str(value).strip().lower() in ('', 'auto'):
+        return None
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class FragmentConcurrencyController:
+    """Adapt the number of concurrent fragments per host from measured throughput
+
+    yt-dlp fixes the fragment thread pool when a stream starts, so the
+    controller observes each finished fragmented stream (throughput and
+    retried fragments) and adjusts ``concurrent_fragment_downloads`` for the
+    next stream. What was learned is persisted per host serving the
+    fragments (see use_host), so later jobs, even of other sites on the same
+    CDN, start from the concurrency the host settled on.
+
+    Decisions follow a simple hill climb: halve on errors, step down if a
+    lower level is about as fast, step up while doubling still pays off.
+    """
+
+    def __init__(self, host: str, min_fragments: int = DEFAULT_MIN_FRAGMENTS, max_fragments: int = DEFAULT_MAX_FRAGMENTS, state_dir: Optional[str] = None):
+        self.host = host
+        self.min_fragments = max(1, min_fragments)
+        self.max_fragments = max(self.min_fragments, max_fragments)
+        self.state_path = os.path.join(state_dir or get_default_cache_dir(), 'fragment_concurrency.json')
+        self.ydl_params: Optional[Dict[str, Any]] = None
+        self.streams: Dict[str, Dict[str, Any]] = {}
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.observations: List[Dict[str, Any]] = []
+
+        self.concurrency = self.initial = self._learned_concurrency(host)
+
+    def bind(self, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
+        """Install the controller into yt-dlp options"""
+        ydl_opts['concurrent_fragment_downloads'] = self.concurrency
+        ydl_opts.setdefault('progress_hooks', []).append(self.progress_hook)
+        # Fragments are fetched through the HTTP downloader, whose retries report as 'http'
+        sleep_functions = dict(ydl_opts.get('retry_sleep_functions') or {})
+        for kind in ('fragment', 'http'):
+            sleep_functions[kind] = functools.partial(self.on_fragment_retry, sleep_function=sleep_functions.get(kind))
+        ydl_opts['retry_sleep_functions'] = sleep_functions
+        self.ydl_params = ydl_opts
+        return ydl_opts
+
+    def use_host(self, host: Optional[str]) -> None:
+        """Learn for the host serving the fragments, known once formats are selected"""
+        if not host or host == self.host:
+            return
+        self.host = host
+        self.concurrency = self.initial = self._learned_concurrency(host)
+        if self.ydl_params is not None:
+            self.ydl_params['concurrent_fragment_downloads'] = self.concurrency
+
+    def _learned_concurrency(self, host: str) -> int:
+        host_state = read_state(self.state_path).get(host, {})
+        return self._clamp(host_state.get('concurrency', DEFAULT_INITIAL_FRAGMENTS))
+
+    def attach(self, ydl) -> None:
+        """Follow a YoutubeDL instance, whose params are read at each stream start"""
+        self.ydl_params = ydl.params
+
+    def on_fragment_retry(self, n: int, sleep_function=None) -> float:
+        """Count a failed request (e.g. HTTP 429); returns the sleep before retrying
+
+        The sleep is left to ``sleep_function`` (the retry policy's) when given.
+        Called from yt-dlp's fragment threads.
+        """
+        with self.lock:
+            self.errors += 1
+        if callable(sleep_function):
+            return sleep_function(n=n)
+        return min(0.5 * (2 ** n), 10.0)
+
+    def progress_hook(self, d: Dict[str, Any]) -> None:
+        key = str((d.get('info_dict') or {}).get('format_id') or d.get('filename'))
+        with self.lock:
+            errors = self.errors
+        if d.get('status') == 'downloading':
+            stream = self.streams.setdefault(key, {
+                'started_at': time.monotonic(),
+                'errors_at_start': errors,
+                'concurrency': self.concurrency,
+            })
+            stream['fragment_count'] = d.get('fragment_count') or stream.get('fragment_count')
+            stream['downloaded_bytes'] = d.get('downloaded_bytes') or 0
+        elif d.get('status') == 'finished' and key in self.streams:
+            stream = self.streams.pop(key)
+            if stream.get('fragment_count'):
+                downloaded = d.get('total_bytes') or d.get('downloaded_bytes') or stream['downloaded_bytes']
+                self.observe(
+                    stream['concurrency'], downloaded, time.monotonic() - stream['started_at'],
+                    errors - stream['errors_at_start'], stream['fragment_count'],
+                )
+
+    def observe(self, concurrency: int, downloaded_bytes: int, seconds: float, errors: int, fragments: int) -> int:
+        """Record a finished stream and pick the concurrency for the next one"""
+        if downloaded_bytes < MIN_SAMPLE_BYTES or seconds <= 0:
+            return self.concurrency
+
+        throughput = downloaded_bytes / seconds
+        error_rate = errors / max(1, fragments)
+        now = time.time()
+
+        with locked_state(self.state_path) as state:
+            host_state = state.setdefault(self.host, {})
+            samples = {
+                int(level): sample for level, sample in host_state.get('samples', {}).items()
+                if now - sample['at'] < MEASUREMENT_TTL_SECONDS
+            }
+            previous = samples.get(concurrency)
+            average = throughput if previous is None else EWMA_ALPHA * throughput + (1 - EWMA_ALPHA) * previous['throughput']
+            samples[concurrency] = {'throughput': average, 'at': now}
+
+            self.concurrency = self._next_concurrency(concurrency, samples, error_rate)
+            host_state['samples'] = {str(level): sample for level, sample in samples.items()}
+            host_state['concurrency'] = self.concurrency
+
+        self.observations.append({
+            'concurrency': concurrency,
+            'throughput': round(throughput),
+            'error_rate': round(error_rate, 4),
+        })
+        if self.ydl_params is not None:
+            self.ydl_params['concurrent_fragment_downloads'] = self.concurrency
+        if self.concurrency != concurrency:
+            print(f'⚙️ Fragment concurrency for {self.host}: {concurrency} → {self.concurrency}')
+        return self.concurrency
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the concurrency decisions for the output info"""
+        return {
+            'mode': 'auto',
+            'host': self.host,
+            'initial': self.initial,
+            'settled': self.concurrency,
+            'observations': self.observations,
+        }
+
+    def _next_concurrency(self, current: int, samples: Dict[int, Dict[str, Any]], error_rate: float) -> int:
+        lower = self._clamp(current // 2)
+        higher = self._clamp(current * 2)
+        if error_rate > MAX_ERROR_RATE:
+            return lower
+
+        here = samples[current]['throughput']
+        if lower < current and lower in samples and samples[lower]['throughput'] >= here * (1 - LOSS_TOLERANCE):
+            return lower
+        if higher > current and (higher not in samples or samples[higher]['throughput'] > here * (1 + GAIN_THRESHOLD)):
+            return higher
+        return current
+
+    def _clamp(self, value: int) -> int:
+        return max(self.min_fragments, min(self.max_fragments, int(value)))
+
+
+def get_fragment_host(info: Dict[str, Any]) -> Optional[str]:
+    """Host serving the fragments of the first fragmented format selected in ``info``"""
+    for fmt in info.get('requested_formats') or [info]:
+        fragments = fmt.get('fragments')
+        fragments = fragments if isinstance(fragments, list) else None
+        if not fragments and not str(fmt.get('protocol') or '').startswith(FRAGMENTED_PROTOCOLS):
+            continue
+        url = (fragments[0].get('url') if fragments else None) or fmt.get('fragment_base_url') or fmt.get('url') or fmt.get('manifest_url')
+        host = urlparse(url).hostname if url else None
+        if host:
+            return host.lower()
+    return None
+
+
+def create_fragment_controller(url: str, concurrent_fragments: Any, max_fragments: Optional[int], state_dir: Optional[str] = None) -> Optional[FragmentConcurrencyController]:
+    """Create an adaptive controller, or None when a fixed concurrency was requested
+
+    The controller starts out keyed by the page's host, until use_host
+    names the host serving the fragments.
+    """
+    if parse_fragment_concurrency(concurrent_fragments) is not None:
+        return None
+    host = (urlparse(url).hostname or '').lower()
+    return FragmentConcurrencyController(host, max_fragments=max_fragments or DEFAULT_MAX_FRAGMENTS, state_dir=state_dir)
@@ -0,0 +1,104 @@
+"""Download handler for video downloader"""
+
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+# Signed URLs are considered expired slightly before their deadline, so a
+# download does not start on a URL that dies mid-transfer
+EXPIRY_MARGIN_SECONDS = 30
+
+# HTTP status codes returned by CDNs once a signed URL is no longer valid
+EXPIRED_URL_MARKERS = ('HTTP Error 403', 'HTTP Error 410')
+
+
+def get_url_expiry(url: Optional[str]) -> Optional[int]:
+    """Return the expiry timestamp embedded in a signed URL, if any"""
+    if not url:
+        return None
+
+    query = parse_qs(urlparse(url).query)
+    for key in ('expire', 'expires', 'Expires'):
+        values = query.get(key)
+        if values:
+            try:
+                return int(values[0])
+            except ValueError:
+                return None
+
+    return None
+
+
+def get_selected_formats(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the formats a format-selected info dict downloads"""
+    return info.get('requested_formats') or [info]
+
+
+def signed_urls_expired(info: Dict[str, Any]) -> bool:
+    """Check whether any of the selected format URLs has expired"""
+    deadline = time.time() + EXPIRY_MARGIN_SECONDS
+
+    for fmt in get_selected_formats(info):
+        expiry = get_url_expiry(fmt.get('url'))
+        if expiry is not None and expiry <= deadline:
+            return True
+
+    return False
+
+
+def has_signed_urls(info: Dict[str, Any]) -> bool:
+    """Check whether any of the selected format URLs carries an expiry"""
+    return any(get_url_expiry(fmt.get('url')) is not None for fmt in get_selected_formats(info))
+
+
+def reextract(ydl, url: str) -> None:
+    """Extract and download again, falling back to any format if the selected ones are gone
+
+    The format spec may pin format IDs (of an interrupted run or a source
+    probe) that a fresh extraction no longer offers.
+    """
+    format_spec = ydl.params.get('format')
+    if isinstance(format_spec, str) and format_spec.split('/')[-1].strip() != 'best':
+        ydl.params['format'] = f'{format_spec}/best'
+        ydl.format_selector = ydl.build_format_selector(ydl.params['format'])
+    ydl.download([url])
+
+
+def download_with_info(ydl, info: Dict[str, Any], url: str, planned: Optional[Dict[str, Any]] = None) -> bool:
+    """Download using an already extracted info dict
+
+    The format selection of ``ydl`` is applied to the formats of ``info``, so
+    the extractor is not run a second time. Re-extraction only happens when
+    the signed URLs of the selected formats have expired, or are rejected
+    with 403/410.
+
+    Args:
+        ydl: YoutubeDL instance with the final options
+        info: Extracted info dict
+        url: Video URL, extracted again if needed
+        planned: ``info`` after format selection; its selected format URLs
+            are the ones checked for expiry
+
+    Returns:
+        True if the extracted info was reused, False if re-extraction was needed
+    """
+    from yt_dlp.utils import DownloadError
+
+    selected = planned or info
+    if signed_urls_expired(selected):
+        print('⏳ Format URLs have expired, re-extracting video information...')
+        reextract(ydl, url)
+        return False
+
+    try:
+        ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=True)
+    except DownloadError as e:
+        # A 403 on an unsigned URL is not an expiry (e.g. a private or geo-blocked video)
+        if not has_signed_urls(selected) or not any(marker in str(e) for marker in EXPIRED_URL_MARKERS):
+            raise
+        print('⏳ Signed format URLs were rejected, re-extracting video information...')
+        reextract(ydl, url)
+        return False
+
+    return True
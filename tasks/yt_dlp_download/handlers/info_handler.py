@@ -2,7 +2,8 @@
 
 from oocana import Context
 from ..utils.format_utils import format_duration, format_view_count
-from ..formatters.quality_analyzer import analyze_available_formats, get_format_features_info
+from ..formatters.format_index import get_format_index
+from ..formatters.quality_analyzer import get_format_features_info
 
 
 def display_video_info(info: dict, context: Context) -> None:
@@ -18,9 +19,8 @@ def display_video_info(info: dict, context: Context) -> None:
     
     print(f'📺 Title: {title}\n👤 Uploader: {uploader}\n⏱️ Duration: {duration_str}\n👁️ Views: {view_str}')
     
-    # Analyze and display available formats
-    formats = info.get('formats', [])
-    available_qualities, hdr_available, high_fps_available = analyze_available_formats(formats)
+    # Analyze and display available formats, indexing them once for selection
+    available_qualities, hdr_available, high_fps_available = get_format_index(info).summary()
     
     features = get_format_features_info(available_qualities, hdr_available, high_fps_available)
     
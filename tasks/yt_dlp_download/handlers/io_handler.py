@@ -0,0 +1,249 @@
+"""Disk I/O of downloads: local scratch staging, final moves and read buffer sizes"""
+
+import errno
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ..utils.file_utils import get_default_cache_dir, preallocate
+from ..utils.state_file import locked_state, read_state
+
+IO_MODES = ('auto', 'direct', 'staged')
+
+# File systems whose writes go over the network; auto mode stages downloads bound for them
+NETWORK_FILESYSTEMS = (
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', 'ceph', 'glusterfs', 'lustre', 'gpfs', 'beegfs', '9p',
+    'davfs', 'fuse.sshfs', 'fuse.rclone', 'fuse.s3fs', 'fuse.gcsfuse', 'remote',
+)
+
+# Bounds of the read buffer; yt-dlp's HTTP downloader never grows its buffer past 4 MiB either
+MIN_BUFFER_SIZE = 64 * 1024
+MAX_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Buffer for a host without any measurements
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+# The buffer holds this much of the host's measured throughput
+BUFFER_SECONDS = 0.1
+
+# Weight of a new throughput sample in the moving average
+EWMA_ALPHA = 0.5
+
+# Measurements older than this are ignored
+MEASUREMENT_TTL_SECONDS = 6 * 3600
+
+# Streams smaller than this are too noisy to learn from
+MIN_SAMPLE_BYTES = 1024 * 1024
+
+# Bytes per write when copying a staged file to another file system; large
+# writes matter on network mounts, where every write may wait for the server
+# (sendfile and shutil.copyfile write in much smaller pieces)
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def parse_io_mode(value: Optional[str]) -> str:
+    """Parse the io_mode input"""
+    mode = str(value or 'auto').strip().lower()
+    if mode not in IO_MODES:
+        raise ValueError(f"Invalid I/O mode: {value}. Use {', '.join(IO_MODES)}")
+    return mode
+
+
+def get_filesystem_type(path: str) -> Optional[str]:
+    """File system type of the mount holding ``path``, where it can be told"""
+    path = os.path.realpath(path)
+    if os.name == 'nt':
+        drive = os.path.splitdrive(path)[0]
+        if drive.startswith('\\\\'):
+            return 'remote'
+        try:
+            import ctypes
+            # DRIVE_REMOTE
+            return 'remote' if ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == 4 else None
+        except (AttributeError, OSError):
+            return None
+
+    mount_point, fstype = '', None
+    try:
+        with open('/proc/self/mounts', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                point = fields[1].replace('\\040', ' ')
+                if (path == point or path.startswith(point.rstrip('/') + '/')) and len(point) >= len(mount_point):
+                    mount_point, fstype = point, fields[2]
+    except OSError:
+        return None
+    return fstype
+
+
+def is_network_path(path: str) -> bool:
+    """Check whether writes to ``path`` go over the network"""
+    return get_filesystem_type(path) in NETWORK_FILESYSTEMS
+
+
+def resolve_io_mode(output_dir: str, io_mode: Optional[str] = None, scratch_dir: Optional[str] = None, state_dir: Optional[str] = None) -> Tuple[str, str]:
+    """Resolve the I/O mode of downloads into ``output_dir``
+
+    Auto mode stages downloads bound for a network file system, unless the
+    scratch directory is on one too.
+
+    Returns:
+        The mode ('direct' or 'staged') and the directory partial and
+        intermediate files are written to
+    """
+    mode = parse_io_mode(io_mode)
+    scratch_root = scratch_dir or os.path.join(state_dir or get_default_cache_dir(), 'scratch')
+    if mode == 'auto':
+        mode = 'staged' if is_network_path(output_dir) and not is_network_path(scratch_root) else 'direct'
+    if mode == 'direct':
+        return mode, output_dir
+
+    # One scratch directory per output directory, so equal file names of different jobs do not collide
+    work_dir = os.path.join(scratch_root, hashlib.sha1(os.path.abspath(output_dir).encode()).hexdigest()[:12])
+    os.makedirs(work_dir, exist_ok=True)
+    return mode, work_dir
+
+
+def move_file(source: str, target: str) -> str:
+    """Move a file with one rename, or across file systems with one preallocated copy
+
+    The copy goes to a ``.part`` file renamed into place once complete, so
+    ``target`` never exists half-written.
+
+    Returns:
+        'rename' or 'copy'
+    """
+    try:
+        os.replace(source, target)
+        return 'rename'
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    size = os.path.getsize(source)
+    partial = target + '.part'
+    try:
+        preallocate(partial, size)
+        with open(source, 'rb') as fsrc, open(partial, 'r+b') as fdst:
+            shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+        shutil.copystat(source, partial)
+        os.replace(partial, target)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.remove(source)
+    return 'copy'
+
+
+class DiskIoController:
+    """Decide where a download writes its files and how much it reads at a time
+
+    In direct mode, partial and intermediate files (``.part`` files,
+    fragments, streams awaiting a merge) are written next to the outputs.
+    In staged mode they are written to local scratch instead, through
+    yt-dlp's ``paths['temp']``, and StagedMovePP moves each finished file
+    into the output directory in one pass: a rename on the same file
+    system, otherwise one large-block copy into a preallocated file.
+
+    The read buffer (yt-dlp's ``buffersize``, which also raises the read
+    size of ranged downloads) holds a fraction of a second of the
+    throughput last measured for the host, persisted across jobs.
+    """
+
+    def __init__(self, host: str, output_dir: str, mode: str = 'direct', work_dir: Optional[str] = None, state_dir: Optional[str] = None):
+        self.host = host
+        self.output_dir = output_dir
+        self.mode = mode
+        self.work_dir = work_dir or output_dir
+        self.state_path = os.path.join(state_dir or get_default_cache_dir(), 'disk_io.json')
+        self.lock = threading.Lock()
+        self.streams: Dict[str, float] = {}
+        self.moves: List[Dict[str, Any]] = []
+
+        sample = read_state(self.state_path).get(host)
+        self.throughput = sample['throughput'] if sample and time.time() - sample['at'] < MEASUREMENT_TTL_SECONDS else None
+        self.buffer_size = self._buffer_size(self.throughput)
+
+    @property
+    def staged(self) -> bool:
+        return self.mode == 'staged'
+
+    def bind(self, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
+        """Install the controller into yt-dlp options"""
+        ydl_opts['buffersize'] = self.buffer_size
+        if self.staged:
+            ydl_opts['paths'] = dict(ydl_opts.get('paths') or {}, temp=self.work_dir)
+        ydl_opts.setdefault('progress_hooks', []).append(self.progress_hook)
+        return ydl_opts
+
+    def progress_hook(self, d: Dict[str, Any]) -> None:
+        key = str((d.get('info_dict') or {}).get('format_id') or d.get('filename'))
+        if d.get('status') == 'downloading':
+            self.streams.setdefault(key, time.monotonic())
+        elif d.get('status') == 'finished' and key in self.streams:
+            seconds = time.monotonic() - self.streams.pop(key)
+            self.observe(d.get('total_bytes') or d.get('downloaded_bytes') or 0, seconds)
+
+    def observe(self, downloaded_bytes: int, seconds: float) -> None:
+        """Record the throughput of a finished stream for the host's next buffer size"""
+        if downloaded_bytes < MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+        throughput = downloaded_bytes / seconds
+        now = time.time()
+        with locked_state(self.state_path) as state:
+            previous = state.get(self.host)
+            if previous and now - previous['at'] < MEASUREMENT_TTL_SECONDS:
+                throughput = EWMA_ALPHA * throughput + (1 - EWMA_ALPHA) * previous['throughput']
+            state[self.host] = {'throughput': throughput, 'at': now}
+        self.throughput = throughput
+
+    def move(self, source: str, target: str) -> str:
+        """Move a staged file into place, timing the move"""
+        size = os.path.getsize(source)
+        start = time.perf_counter()
+        method = move_file(source, target)
+        with self.lock:
+            self.moves.append({'bytes': size, 'seconds': time.perf_counter() - start, 'method': method})
+        return method
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the I/O of the download for the output info"""
+        with self.lock:
+            moves = list(self.moves)
+        return {
+            'mode': self.mode,
+            'work_dir': self.work_dir if self.staged else None,
+            'buffer_size': self.buffer_size,
+            'measured_throughput': round(self.throughput) if self.throughput else None,
+            'moved_files': len(moves),
+            'moved_bytes': sum(move['bytes'] for move in moves),
+            'move_seconds': round(sum(move['seconds'] for move in moves), 3),
+            'move_method': 'copy' if any(move['method'] == 'copy' for move in moves) else 'rename' if moves else None,
+        }
+
+    def close(self) -> None:
+        """Remove the job's scratch directory once nothing is left in it"""
+        if self.staged:
+            try:
+                os.rmdir(self.work_dir)
+            except OSError:
+                pass
+
+    def _buffer_size(self, throughput: Optional[float]) -> int:
+        if not throughput:
+            return DEFAULT_BUFFER_SIZE
+        return max(MIN_BUFFER_SIZE, min(MAX_BUFFER_SIZE, int(throughput * BUFFER_SECONDS)))
+
+
+def create_disk_io_controller(url: str, output_dir: str, io_mode: Optional[str] = None, scratch_dir: Optional[str] = None, state_dir: Optional[str] = None) -> DiskIoController:
+    """Create the controller for downloads from ``url`` into ``output_dir``"""
+    mode, work_dir = resolve_io_mode(output_dir, io_mode, scratch_dir, state_dir)
+    host = (urlparse(url).hostname or '').lower()
+    return DiskIoController(host, output_dir, mode, work_dir, state_dir)
@@ -0,0 +1,238 @@
+"""Per-phase spans and resource counters of a download job"""
+
+import contextlib
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Metrics files with these extensions are written as OpenMetrics text, anything else as JSON lines
+OPENMETRICS_EXTENSIONS = ('.prom', '.om', '.txt')
+
+# Kinds of retries yt-dlp reports through retry_sleep_functions
+RETRY_KINDS = ('http', 'fragment', 'extractor', 'file_access')
+
+
+def get_child_cpu_seconds() -> float:
+    """CPU time of finished child processes, i.e. ffmpeg/ffprobe runs"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def get_max_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+class JobMetrics:
+    """Timed spans around the phases of a job, plus bytes, fragments and retries
+
+    Each span records its wall time, the CPU time of the process and of
+    finished child processes (ffmpeg) while it ran, and the peak RSS at its
+    end. Stream transfers and post-processor runs are recorded as spans by
+    the hooks installed with ``bind``.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self.started_child_cpu = get_child_cpu_seconds()
+        self.spans: List[Dict[str, Any]] = []
+        self.retries: Dict[str, int] = {}
+        self.streams: Dict[str, Dict[str, Any]] = {}
+        self.postprocessors: Dict[str, Dict[str, float]] = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Time a phase; the yielded dict takes attributes known only once it ran"""
+        record = dict(attributes)
+        start, cpu, child_cpu = time.perf_counter(), time.process_time(), get_child_cpu_seconds()
+        try:
+            yield record
+        finally:
+            self._add_span(name, start, cpu, child_cpu, record)
+
+    def bind(self, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
+        """Install the progress, post-processor and retry hooks into yt-dlp options"""
+        ydl_opts.setdefault('progress_hooks', []).append(self.progress_hook)
+        ydl_opts.setdefault('postprocessor_hooks', []).append(self.postprocessor_hook)
+        sleep_functions = dict(ydl_opts.get('retry_sleep_functions') or {})
+        for kind in RETRY_KINDS:
+            sleep_functions[kind] = self._counting_sleep(kind, sleep_functions.get(kind))
+        ydl_opts['retry_sleep_functions'] = sleep_functions
+        return ydl_opts
+
+    def progress_hook(self, d: Dict[str, Any]) -> None:
+        # Subtitles and thumbnails have no format ID
+        key = str((d.get('info_dict') or {}).get('format_id') or os.path.basename(d.get('filename') or ''))
+        with self.lock:
+            stream = self.streams.get(key)
+            if stream is None:
+                stream = self.streams[key] = {
+                    'start': time.perf_counter(), 'cpu': time.process_time(), 'child_cpu': get_child_cpu_seconds(),
+                }
+            stream['bytes'] = d.get('downloaded_bytes') or stream.get('bytes') or 0
+            stream['fragments'] = d.get('fragment_count') or stream.get('fragments')
+        if d.get('status') in ('finished', 'error'):
+            with self.lock:
+                stream = self.streams.pop(key)
+            attributes = {'stream': key, 'bytes': d.get('total_bytes') or stream['bytes'], 'status': d['status']}
+            if stream['fragments']:
+                attributes['fragments'] = stream['fragments']
+            self._add_span('transfer', stream['start'], stream['cpu'], stream['child_cpu'], attributes)
+
+    def postprocessor_hook(self, d: Dict[str, Any]) -> None:
+        name = d.get('postprocessor') or 'unknown'
+        if d.get('status') == 'started':
+            self.postprocessors[name] = {
+                'start': time.perf_counter(), 'cpu': time.process_time(), 'child_cpu': get_child_cpu_seconds(),
+            }
+        elif d.get('status') == 'finished' and name in self.postprocessors:
+            started = self.postprocessors.pop(name)
+            self._add_span('postprocess', started['start'], started['cpu'], started['child_cpu'], {'postprocessor': name})
+
+    def report(self, **attributes) -> Dict[str, Any]:
+        """Summarise the job: totals, counters and every span in start order"""
+        spans = sorted(self.spans, key=lambda span: span['start'])
+        transfers = [span for span in spans if span['name'] == 'transfer']
+        return dict(
+            attributes,
+            seconds=round(time.perf_counter() - self.started, 4),
+            cpu_seconds=round(time.process_time() - self.started_cpu, 4),
+            child_cpu_seconds=round(get_child_cpu_seconds() - self.started_child_cpu, 4),
+            max_rss_kb=get_max_rss_kb(),
+            bytes=sum(span.get('bytes') or 0 for span in transfers),
+            fragments=sum(span.get('fragments') or 0 for span in transfers),
+            retries=dict(self.retries),
+            spans=spans,
+        )
+
+    def export(self, path: Optional[str], report: Dict[str, Any]) -> None:
+        """Write the report to a metrics file; errors are reported but never fail the job"""
+        if not path:
+            return
+        try:
+            if path.endswith(OPENMETRICS_EXTENSIONS):
+                write_openmetrics(path, report)
+            else:
+                append_json_line(path, report)
+        except OSError as e:
+            print(f'⚠️ Could not write metrics to {path}: {e}')
+
+    def _counting_sleep(self, kind: str, sleep_function):
+        def sleep(n: int) -> float:
+            with self.lock:
+                self.retries[kind] = self.retries.get(kind, 0) + 1
+            return sleep_function(n=n) if callable(sleep_function) else (sleep_function or 0)
+        return sleep
+
+    def _add_span(self, name: str, start: float, cpu: float, child_cpu: float, attributes: Dict[str, Any]) -> None:
+        span = dict(
+            attributes,
+            name=name,
+            start=round(start - self.started, 4),
+            seconds=round(time.perf_counter() - start, 4),
+            cpu_seconds=round(time.process_time() - cpu, 4),
+            max_rss_kb=get_max_rss_kb(),
+        )
+        child_cpu = get_child_cpu_seconds() - child_cpu
+        if child_cpu:
+            span['child_cpu_seconds'] = round(child_cpu, 4)
+        with self.lock:
+            self.spans.append(span)
+
+
+class NullMetrics:
+    """Stand-in used when metrics are off; installs no hooks and records nothing"""
+
+    enabled = False
+
+    def span(self, name: str, **attributes):
+        return contextlib.nullcontext({})
+
+    def bind(self, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
+        return ydl_opts
+
+    def report(self, **attributes) -> None:
+        return None
+
+    def export(self, path: Optional[str], report: Optional[Dict[str, Any]]) -> None:
+        pass
+
+
+def create_job_metrics(enabled: bool = True):
+    """Return a metrics recorder, or a no-op one when metrics are off"""
+    return JobMetrics() if enabled else NullMetrics()
+
+
+def append_json_line(path: str, report: Dict[str, Any]) -> None:
+    """Append a report as one JSON line; a single write keeps concurrent jobs' lines intact"""
+    line = json.dumps(dict(report, time=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')), default=str)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_openmetrics(report: Dict[str, Any]) -> str:
+    """Render a report in the OpenMetrics text format"""
+    job = f'url="{escape_label(report.get("url", ""))}",status="{escape_label(report.get("status", ""))}"'
+    lines = []
+
+    def family(name: str, kind: str, help_text: str, samples: List[str]) -> None:
+        lines.extend([f'# TYPE {name} {kind}', f'# HELP {name} {help_text}', *samples])
+
+    family('video_download_job_seconds', 'gauge', 'Wall time of the job.', [f'video_download_job_seconds{{{job}}} {report["seconds"]}'])
+    family('video_download_job_cpu_seconds', 'gauge', 'CPU time of the task process during the job.',
+           [f'video_download_job_cpu_seconds{{{job}}} {report["cpu_seconds"]}'])
+    family('video_download_job_child_cpu_seconds', 'gauge', 'CPU time of child processes (ffmpeg) during the job.',
+           [f'video_download_job_child_cpu_seconds{{{job}}} {report["child_cpu_seconds"]}'])
+    if report.get('max_rss_kb') is not None:
+        family('video_download_job_max_rss_bytes', 'gauge', 'Peak resident set size.',
+               [f'video_download_job_max_rss_bytes{{{job}}} {report["max_rss_kb"] * 1024}'])
+    family('video_download_job_bytes', 'gauge', 'Bytes transferred.', [f'video_download_job_bytes{{{job}}} {report["bytes"]}'])
+    family('video_download_job_fragments', 'gauge', 'Fragments transferred.', [f'video_download_job_fragments{{{job}}} {report["fragments"]}'])
+    family('video_download_job_retries', 'gauge', 'Retries, by kind.',
+           [f'video_download_job_retries{{{job},kind="{kind}"}} {count}' for kind, count in sorted(report['retries'].items())])
+
+    phases: Dict[str, float] = {}
+    for span in report['spans']:
+        phase = span['name'] if span['name'] != 'postprocess' else f'postprocess:{span["postprocessor"]}'
+        phases[phase] = phases.get(phase, 0.0) + span['seconds']
+    family('video_download_phase_seconds', 'gauge', 'Wall time per phase of the job.',
+           [f'video_download_phase_seconds{{{job},phase="{escape_label(phase)}"}} {round(seconds, 4)}' for phase, seconds in phases.items()])
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def write_openmetrics(path: str, report: Dict[str, Any]) -> None:
+    """Replace an OpenMetrics text file with the latest job, as textfile collectors expect"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(format_openmetrics(report))
+    os.replace(tmp_path, path)
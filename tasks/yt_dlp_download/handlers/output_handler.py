@@ -0,0 +1,95 @@
+"""Output handler for video downloader"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from yt_dlp.postprocessor import PostProcessor
+
+
+def existing_path(path: Optional[str]) -> Optional[str]:
+    """Return the absolute path if the file exists"""
+    if path and os.path.isfile(path):
+        return os.path.abspath(path)
+    return None
+
+
+def collect_output_files(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect the final media path and sidecar files from a processed info dict"""
+    thumbnails = [
+        existing_path(thumbnail.get('filepath'))
+        for thumbnail in info.get('thumbnails') or []
+    ]
+    subtitles = {
+        lang: existing_path(sub_info.get('filepath'))
+        for lang, sub_info in (info.get('requested_subtitles') or {}).items()
+    }
+    return {
+        'filepath': existing_path(info.get('filepath')),
+        'info_json': existing_path(info.get('infojson_filename')),
+        'thumbnails': [path for path in thumbnails if path],
+        'subtitles': {lang: path for lang, path in subtitles.items() if path},
+    }
+
+
+class OutputCollector(PostProcessor):
+    """Post-processor recording the exact final paths written by yt-dlp
+
+    Registered to run after files are moved to their final location, so the
+    paths reported already account for merging, audio extraction and
+    embedding.
+    """
+
+    def __init__(self, downloader=None):
+        super().__init__(downloader)
+        self.outputs: List[Dict[str, Any]] = []
+
+    def run(self, info):
+        self.outputs.append(collect_output_files(info))
+        return [], info
+
+    @property
+    def primary(self) -> Optional[Dict[str, Any]]:
+        """The output files of the first downloaded video, if any"""
+        for output in self.outputs:
+            if output['filepath']:
+                return output
+        return None
+
+
+class StagedMovePP(PostProcessor):
+    """Post-processor moving files staged in local scratch into the output directory
+
+    Runs last in the post_process stage, with the files of the download
+    complete, and moves each one through the DiskIoController; yt-dlp's own
+    move that follows finds nothing left to do. Files it cannot move (e.g.
+    one that exists and must not be overwritten) are left to yt-dlp.
+    """
+
+    def __init__(self, disk_io, downloader=None):
+        super().__init__(downloader)
+        self.disk_io = disk_io
+
+    def run(self, info):
+        final_dir = info.get('__finaldir')
+        files_to_move = info.get('__files_to_move')
+        if not final_dir or files_to_move is None:
+            return [], info
+
+        moves = dict(files_to_move)
+        moves[info['filepath']] = os.path.join(final_dir, os.path.basename(info['filepath']))
+        remaining = {}
+        for source, target in moves.items():
+            target = target or os.path.join(final_dir, os.path.basename(source))
+            if (os.path.abspath(source) == os.path.abspath(target) or not os.path.isfile(source)
+                    or (os.path.exists(target) and not self.get_param('overwrites', True))):
+                remaining[source] = target
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            method = self.disk_io.move(source, target)
+            self.to_screen(f'Moved "{source}" to "{target}" ({method})')
+            if source == info['filepath']:
+                info['filepath'] = target
+
+        remaining.pop(info['filepath'], None)
+        info['__files_to_move'] = remaining
+        return [], info
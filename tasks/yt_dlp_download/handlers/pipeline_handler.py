@@ -0,0 +1,170 @@
+"""Pipelined transfers and post-processing across the jobs of a batch"""
+
+import contextlib
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics_handler import get_child_cpu_seconds
+
+# Post-processing workers of a batch, unless set by the postprocess_workers input
+DEFAULT_POSTPROCESS_WORKERS = 2
+
+
+def merge_intervals(intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Merge overlapping (start, end) intervals"""
+    merged: List[Tuple[float, float]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def busy_seconds(intervals: List[Tuple[float, float]]) -> float:
+    return sum(end - start for start, end in merge_intervals(intervals))
+
+
+def overlap_seconds(first: List[Tuple[float, float]], second: List[Tuple[float, float]]) -> float:
+    """Time during which both sets of intervals were busy"""
+    overlap = 0.0
+    second = merge_intervals(second)
+    for start, end in merge_intervals(first):
+        for other_start, other_end in second:
+            overlap += max(0.0, min(end, other_end) - max(start, other_start))
+    return overlap
+
+
+class PostprocessPipeline:
+    """Overlaps one job's transfer with another job's post-processing
+
+    A job holds a transfer slot while it downloads and a post-processing
+    slot while yt-dlp post-processes it (merging, audio extraction and
+    embedding, each an ffmpeg process). Once its transfer is done the job
+    gives its transfer slot to the next job, so the network keeps working
+    while ffmpeg runs. Transfers wait while ``max_backlog`` jobs have
+    finished downloading but not post-processing, so unprocessed media
+    cannot pile up on disk.
+
+    With no post-processing workers the pipeline only measures: jobs run
+    transfer and post-processing back to back, as on the serial path.
+    """
+
+    def __init__(self, transfer_workers: int, postprocess_workers: int, max_per_host: int, max_backlog: Optional[int] = None):
+        self.transfer_workers = max(1, transfer_workers)
+        self.postprocess_workers = max(0, postprocess_workers)
+        self.max_per_host = max(1, max_per_host)
+        self.max_backlog = max(max_backlog or 2 * self.postprocess_workers, self.postprocess_workers)
+        self.condition = threading.Condition()
+        self.transferring: Counter = Counter()
+        self.postprocessing = 0
+        self.backlog = 0
+        self.peak_backlog = 0
+        self.backpressure_seconds = 0.0
+        self.transfers: List[Tuple[float, float]] = []
+        self.postprocesses: List[Tuple[float, float]] = []
+        self.started = time.perf_counter()
+        self.started_child_cpu = get_child_cpu_seconds()
+
+    @property
+    def enabled(self) -> bool:
+        return self.postprocess_workers > 0
+
+    def job(self, host: str) -> 'PipelineJob':
+        return PipelineJob(self, host)
+
+    def report(self) -> Dict[str, Any]:
+        """Busy time and utilisation of the network and post-processing stages"""
+        with self.condition:
+            transfers, postprocesses = list(self.transfers), list(self.postprocesses)
+        seconds = time.perf_counter() - self.started
+        transfer_seconds = busy_seconds(transfers)
+        postprocess_seconds = busy_seconds(postprocesses)
+        return {
+            'mode': 'pipelined' if self.enabled else 'serial',
+            'transfer_workers': self.transfer_workers,
+            'postprocess_workers': self.postprocess_workers,
+            'max_backlog': self.max_backlog if self.enabled else None,
+            'seconds': round(seconds, 3),
+            'transfer_seconds': round(transfer_seconds, 3),
+            'postprocess_seconds': round(postprocess_seconds, 3),
+            'overlap_seconds': round(overlap_seconds(transfers, postprocesses), 3),
+            'network_utilisation': round(transfer_seconds / seconds, 3) if seconds else 0.0,
+            'postprocess_utilisation': round(postprocess_seconds / seconds, 3) if seconds else 0.0,
+            'child_cpu_seconds': round(get_child_cpu_seconds() - self.started_child_cpu, 3),
+            'peak_backlog': self.peak_backlog,
+            'backpressure_seconds': round(self.backpressure_seconds, 3),
+        }
+
+
+class PipelineJob:
+    """One job's passage through the pipeline: transfer, then post-processing
+
+    TaskYoutubeDL reads the job from its ``postprocess_pipeline`` option and
+    wraps yt-dlp's post-processing in ``postprocessing``.
+    """
+
+    def __init__(self, pipeline: PostprocessPipeline, host: str):
+        self.pipeline = pipeline
+        self.host = host
+        self.stage = None
+        self.stage_started = 0.0
+
+    def begin_transfer(self) -> None:
+        """Wait for a transfer slot of the job's host, and for the backlog to drain"""
+        pipeline = self.pipeline
+        with pipeline.condition:
+            if pipeline.enabled:
+                start, held_back = time.perf_counter(), pipeline.backlog >= pipeline.max_backlog
+                pipeline.condition.wait_for(self._may_transfer)
+                if held_back:
+                    pipeline.backpressure_seconds += time.perf_counter() - start
+                pipeline.transferring[self.host] += 1
+            self.stage, self.stage_started = 'transfer', time.perf_counter()
+
+    @contextlib.contextmanager
+    def postprocessing(self):
+        """End the transfer, then hold a post-processing slot while yt-dlp post-processes"""
+        pipeline = self.pipeline
+        with pipeline.condition:
+            self._end_stage()
+            if pipeline.enabled:
+                pipeline.backlog += 1
+                pipeline.peak_backlog = max(pipeline.peak_backlog, pipeline.backlog)
+                pipeline.condition.notify_all()
+                pipeline.condition.wait_for(lambda: pipeline.postprocessing < pipeline.postprocess_workers)
+                pipeline.postprocessing += 1
+            self.stage, self.stage_started = 'postprocess', time.perf_counter()
+        try:
+            yield
+        finally:
+            with pipeline.condition:
+                self._end_stage()
+
+    def finish(self) -> None:
+        """Release whatever the job still holds, e.g. after a failed transfer"""
+        with self.pipeline.condition:
+            self._end_stage()
+
+    def _may_transfer(self) -> bool:
+        pipeline = self.pipeline
+        return (sum(pipeline.transferring.values()) < pipeline.transfer_workers
+                and pipeline.transferring[self.host] < pipeline.max_per_host
+                and pipeline.backlog < pipeline.max_backlog)
+
+    def _end_stage(self) -> None:
+        # Called with the pipeline's condition held
+        pipeline = self.pipeline
+        if self.stage == 'transfer':
+            pipeline.transfers.append((self.stage_started, time.perf_counter()))
+            if pipeline.enabled:
+                pipeline.transferring[self.host] -= 1
+        elif self.stage == 'postprocess':
+            pipeline.postprocesses.append((self.stage_started, time.perf_counter()))
+            if pipeline.enabled:
+                pipeline.postprocessing -= 1
+                pipeline.backlog -= 1
+        self.stage = None
+        pipeline.condition.notify_all()
@@ -0,0 +1,95 @@
+"""Lazy playlist expansion and entry filters"""
+
+import itertools
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..formatters.info_record import compact_entry
+
+# Extraction result types that hold entries instead of formats
+PLAYLIST_TYPES = ('playlist', 'multi_video')
+
+# Entries resolved but not yet downloaded, per batch, unless set by the playlist_window input
+DEFAULT_PLAYLIST_WINDOW = 16
+
+
+def is_playlist_result(ie_result: Dict[str, Any]) -> bool:
+    """Check whether an unprocessed extraction result is a playlist"""
+    return ie_result.get('_type') in PLAYLIST_TYPES
+
+
+def parse_playlist_items(playlist_items: Optional[str]) -> Optional[str]:
+    """Validate an index range such as ``1-10,15,-5:`` (yt-dlp's --playlist-items syntax)"""
+    if not playlist_items or not str(playlist_items).strip():
+        return None
+    from yt_dlp.utils import PlaylistEntries
+
+    playlist_items = str(playlist_items).replace(' ', '')
+    try:
+        list(PlaylistEntries.parse_playlist_items(playlist_items))
+    except ValueError as e:
+        raise ValueError(f"Invalid playlist items: {playlist_items}. {e}") from None
+    return playlist_items
+
+
+def build_entry_filter(date_after: Optional[str] = None, date_before: Optional[str] = None, min_duration: Optional[float] = None, max_duration: Optional[float] = None) -> Optional[str]:
+    """Build a yt-dlp match filter from the date and duration inputs
+
+    Videos that do not report a field pass the condition on it.
+    """
+    conditions = []
+    for value, operator in ((date_after, '>=?'), (date_before, '<=?')):
+        if value:
+            date = str(value).strip().replace('-', '')
+            if not re.fullmatch(r'\d{8}', date):
+                raise ValueError(f"Invalid date: {value}. Use YYYYMMDD or YYYY-MM-DD")
+            conditions.append(f'upload_date {operator} {date}')
+    for value, operator in ((min_duration, '>=?'), (max_duration, '<=?')):
+        if value:
+            conditions.append(f'duration {operator} {float(value)}')
+    return ' & '.join(conditions) or None
+
+
+def check_entry(entry_filter: Optional[str], info: Dict[str, Any], incomplete: bool = False) -> Optional[str]:
+    """Return why an entry is filtered out, or None if it passes
+
+    Flat playlist entries are checked with ``incomplete``, so fields only
+    known after full extraction do not reject them.
+    """
+    from yt_dlp.utils import match_str
+
+    if entry_filter and not match_str(entry_filter, info, incomplete):
+        return f'does not match {entry_filter}'
+    return None
+
+
+def iter_playlist_entries(ydl, ie_result: Dict[str, Any], playlist_url: str, entry_filter: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (playlist index, batch item) pairs of a flat playlist, fetching pages on demand
+
+    Only the requested index range (``playlist_items`` of ``ydl``) is walked,
+    and entries failing the filter are dropped before anything is extracted
+    for them. ``ydl`` is closed once the generator finishes or is closed.
+    """
+    from yt_dlp.utils import PlaylistEntries
+
+    try:
+        for index, entry in PlaylistEntries(ydl, ie_result).get_requested_items():
+            if not entry:
+                continue
+            reason = check_entry(entry_filter, entry, incomplete=True)
+            if reason:
+                print(f'⏭️ Skipping playlist entry {index}: {entry.get("title") or entry.get("url")} {reason}')
+                continue
+            if entry.get('_type') in ('url', 'url_transparent'):
+                yield index, {'url': entry['url'], 'info': None}
+            else:
+                info = compact_entry(ydl.sanitize_info(entry), bool(ydl.params.get('writesubtitles')))
+                yield index, {'url': entry.get('webpage_url') or playlist_url, 'info': info}
+    finally:
+        ydl.close()
+
+
+def take_entries(entries: Iterator[Tuple[int, Dict[str, Any]]], count: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], bool]:
+    """Pull up to ``count`` items from a playlist iterator; also report whether it is exhausted"""
+    items = list(itertools.islice(entries, count))
+    return items, len(items) < count
@@ -0,0 +1,202 @@
+"""Latency and throughput probing of equivalent format sources"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+from ..utils.file_utils import get_default_cache_dir
+from ..utils.state_file import locked_state, read_state
+
+# Equivalent formats probed per job, unless set by the probe_candidates input
+DEFAULT_PROBE_CANDIDATES = 3
+
+# Bytes read per probe, enough to leave TCP slow start
+PROBE_BYTES = 512 * 1024
+
+# A probe stops reading after this long and measures what it got
+PROBE_MAX_SECONDS = 3.0
+
+# Probe results of a host are reused for this long
+PROBE_TTL_SECONDS = 3600
+
+# Failed probes are remembered for a shorter time
+FAILED_PROBE_TTL_SECONDS = 300
+
+# Size assumed for a format that reports none, to weigh latency against throughput
+DEFAULT_FORMAT_BYTES = 16 * 1024 * 1024
+
+# Another source must be estimated this much faster to replace the top-ranked one
+MIN_GAIN = 0.2
+
+READ_SIZE = 64 * 1024
+
+
+def get_probe_host(url: str) -> str:
+    """Host and port of a source, the unit probe results are cached by"""
+    return urlparse(url).netloc.lower()
+
+
+def get_format_bytes(fmt: Dict[str, Any], duration: Optional[float]) -> int:
+    """Known or estimated size of a format"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if not size and fmt.get('tbr') and duration:
+        size = fmt['tbr'] * 1000 / 8 * duration
+    return int(size or DEFAULT_FORMAT_BYTES)
+
+
+def get_probe_url(fmt: Dict[str, Any]) -> Optional[str]:
+    """The URL whose first bytes stand for a format: the file, or a media fragment"""
+    fragments = fmt.get('fragments')
+    if fragments:
+        # Skip the initialization segment of a fragmented stream
+        fragment = fragments[min(1, len(fragments) - 1)]
+        return fragment.get('url') or urljoin(fmt.get('fragment_base_url') or fmt.get('url') or '', fragment.get('path') or '')
+    return fmt.get('url')
+
+
+def _request(url: str, headers: Optional[Dict[str, str]], **extra_headers):
+    from yt_dlp.networking import Request
+    return Request(url, headers=dict(headers or {}, **extra_headers))
+
+
+def measure_url(ydl, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Time to first byte and short-burst throughput of a ranged request"""
+    start = time.perf_counter()
+    with ydl.urlopen(_request(url, headers, Range=f'bytes=0-{PROBE_BYTES - 1}')) as response:
+        first_byte = time.perf_counter()
+        received = 0
+        while received < PROBE_BYTES and time.perf_counter() - first_byte < PROBE_MAX_SECONDS:
+            data = response.read(min(READ_SIZE, PROBE_BYTES - received))
+            if not data:
+                break
+            received += len(data)
+        body_seconds = time.perf_counter() - first_byte
+    if not received:
+        raise ValueError('empty response')
+    return {
+        'ttfb': first_byte - start,
+        'throughput': received / max(body_seconds, 1e-3),
+    }
+
+
+def probe_format(ydl, fmt: Dict[str, Any]) -> Dict[str, Any]:
+    """Measure a format's source; HLS media playlists are timed, then their first segment is read"""
+    headers = fmt.get('http_headers')
+    url = get_probe_url(fmt)
+    if not url:
+        raise ValueError('no URL to probe')
+    if (fmt.get('protocol') or '').startswith('m3u8') and not fmt.get('fragments'):
+        start = time.perf_counter()
+        with ydl.urlopen(_request(url, headers)) as response:
+            playlist = response.read().decode('utf-8', 'replace')
+        ttfb = time.perf_counter() - start
+        segment = next((line.strip() for line in playlist.splitlines() if line.strip() and not line.startswith('#')), None)
+        if segment is None:
+            raise ValueError('no segment in playlist')
+        result = measure_url(ydl, urljoin(url, segment), headers)
+        result['ttfb'] = ttfb
+        return result
+    return measure_url(ydl, url, headers)
+
+
+class SourceProber:
+    """Pick the fastest of several equivalent formats by probing their sources
+
+    Equivalent formats (same resolution, dynamic range and frame rate, but
+    another container, protocol or CDN host) are probed concurrently with a
+    small range request each, through the job's YoutubeDL so proxies,
+    cookies and the rate scheduler apply. Each is scored by its estimated
+    download time, time to first byte plus size over throughput. Results
+    are cached per host and protocol in a state file under the cache
+    directory, so later jobs reuse them until they expire.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None, ttl: float = PROBE_TTL_SECONDS):
+        self.state_path = os.path.join(state_dir or get_default_cache_dir(), 'source_probes.json')
+        self.ttl = ttl
+
+    def choose(self, ydl, formats: List[Dict[str, Any]], duration: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Score equivalent formats, best-ranked first; return the report with the chosen format ID"""
+        if len(formats) < 2:
+            return None
+        start = time.perf_counter()
+        cached = self._cached(formats)
+        pending = {}
+        for fmt in formats:
+            key = self._key(fmt)
+            if key not in cached and key not in pending:
+                pending[key] = fmt
+
+        measured = {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='probe') as executor:
+                futures = {key: executor.submit(probe_format, ydl, fmt) for key, fmt in pending.items()}
+            for key, future in futures.items():
+                try:
+                    measured[key] = dict(future.result(), at=time.time())
+                except Exception as e:
+                    print(f'⚠️ Could not probe {key[0]}: {e}')
+                    measured[key] = {'failed': True, 'at': time.time()}
+            self._store(measured)
+
+        candidates = []
+        for fmt in formats:
+            key = self._key(fmt)
+            result = measured.get(key) or cached[key]
+            candidate = {
+                'format_id': fmt.get('format_id'),
+                'host': key[0],
+                'protocol': key[1],
+                'cached': key not in measured,
+            }
+            if not result.get('failed'):
+                candidate['ttfb'] = round(result['ttfb'], 4)
+                candidate['throughput'] = round(result['throughput'])
+                candidate['estimated_seconds'] = round(result['ttfb'] + get_format_bytes(fmt, duration) / result['throughput'], 3)
+            candidates.append(candidate)
+
+        scored = [c for c in candidates if 'estimated_seconds' in c]
+        chosen = candidates[0]
+        if scored:
+            fastest = min(scored, key=lambda c: c['estimated_seconds'])
+            if 'estimated_seconds' not in chosen or fastest['estimated_seconds'] < chosen['estimated_seconds'] * (1 - MIN_GAIN):
+                chosen = fastest
+        return {
+            'chosen': chosen['format_id'],
+            'default': candidates[0]['format_id'],
+            'probed': len(measured),
+            'seconds': round(time.perf_counter() - start, 3),
+            'candidates': candidates,
+        }
+
+    def _key(self, fmt: Dict[str, Any]):
+        return get_probe_host(get_probe_url(fmt) or ''), (fmt.get('protocol') or 'https')
+
+    def _cached(self, formats: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        state = read_state(self.state_path)
+        now = time.time()
+        cached = {}
+        for fmt in formats:
+            host, protocol = key = self._key(fmt)
+            result = state.get(host, {}).get(protocol)
+            if result and now - result['at'] < (FAILED_PROBE_TTL_SECONDS if result.get('failed') else self.ttl):
+                cached[key] = result
+        return cached
+
+    def _store(self, measured: Dict[Any, Dict[str, Any]]) -> None:
+        now = time.time()
+        with locked_state(self.state_path) as state:
+            for (host, protocol), result in measured.items():
+                state.setdefault(host, {})[protocol] = result
+            # Drop expired hosts, so the state file does not grow without bound
+            for host in list(state):
+                state[host] = {protocol: result for protocol, result in state[host].items() if now - result['at'] < self.ttl}
+                if not state[host]:
+                    del state[host]
+
+
+def create_source_prober(enabled: bool, state_dir: Optional[str] = None) -> Optional[SourceProber]:
+    """Create a prober, or None when probing is off"""
+    return SourceProber(state_dir) if enabled else None
@@ -1,9 +1,17 @@
 """Progress handler for video downloader"""
 
 import os
+import time
+from typing import Any, Dict, List, Optional
 from oocana import Context
 from ..utils.format_utils import format_file_size
 
+# Minimum interval between two progress reports
+REPORT_INTERVAL_SECONDS = 0.25
+
+# Minimum interval between two printed progress lines
+PRINT_INTERVAL_SECONDS = 5.0
+
 
 def parse_percent_str(percent_str: str) -> int:
     """Convert percentage string like '100.0%' to integer 1-100"""
@@ -18,29 +26,147 @@ def parse_percent_str(percent_str: str) -> int:
         return 0
 
 
-def create_progress_hook(context: Context):
-    """Create a progress hook function for yt-dlp"""
-    
-    def progress_hook(d):
-        if d['status'] == 'downloading':
-            percent_str = d.get('_percent_str', 'N/A')
-            speed = d.get('_speed_str', 'N/A')
-            eta = d.get('_eta_str', 'N/A')
-            total_bytes = d.get('total_bytes', 0)
-            downloaded_bytes = d.get('downloaded_bytes', 0)
-            
-            # Convert percent string to number
-            percent_num = parse_percent_str(percent_str)
-            
-            # Format file size
-            size_info = format_file_size(total_bytes, downloaded_bytes)
-            context.report_progress(percent_num)
-            print(f'Progress: {percent_num}% - {size_info} - Speed: {speed} - ETA: {eta}')
-            print(f'📥 Downloading: {percent_num}%\n📊 Size: {size_info}\n🚀 Speed: {speed}\n⏱️ ETA: {eta}')
-        elif d['status'] == 'finished':
-            filename = d.get('filename', 'Unknown file')
-            print(f'✅ Download completed: {os.path.basename(filename)}')
-        elif d['status'] == 'error':
-            print(f'❌ Download error occurred')
-    
-    return progress_hook
\ No newline at end of file
+def format_eta(eta: Optional[float]) -> str:
+    """Format an ETA in seconds as MM:SS or HH:MM:SS"""
+    if eta is None:
+        return 'N/A'
+    eta = int(eta)
+    hours, remainder = divmod(eta, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+    return f'{minutes:02d}:{seconds:02d}'
+
+
+def format_speed(speed: Optional[float]) -> str:
+    """Format a transfer rate in bytes per second"""
+    if not speed:
+        return 'N/A'
+    return f'{speed / (1024 * 1024):.2f}MiB/s'
+
+
+class ProgressReporter:
+    """Throttled progress hook aggregating all streams of a download
+
+    Separate video and audio streams are weighted by their expected size, so
+    the reported percentage grows monotonically over the whole download
+    instead of restarting at 0% for each stream. ``context.report_progress``
+    is only called when the integer percentage changes, at most once per
+    report interval, and the human-readable line is printed at a capped rate.
+
+    The streams come from ``requested_formats``, the formats selected before
+    the download: yt-dlp drops them from the info dict of each stream it
+    downloads, so a stream that has not started is otherwise unknown.
+    """
+
+    def __init__(self, context: Context, requested_formats: Optional[List[Dict[str, Any]]] = None, report_interval: float = REPORT_INTERVAL_SECONDS, print_interval: float = PRINT_INTERVAL_SECONDS, clock=time.monotonic):
+        self.context = context
+        self.report_interval = report_interval
+        self.print_interval = print_interval
+        self.clock = clock
+
+        self.streams: Dict[str, Dict[str, float]] = {}
+        self.weights = get_stream_weights(requested_formats or [])
+        self.sizes = {
+            str(fmt.get('format_id')): fmt.get('filesize') or fmt.get('filesize_approx') or 0
+            for fmt in requested_formats or []
+        }
+        self.percent = 0
+        self.speed: Optional[float] = None
+        self.eta: Optional[float] = None
+        self.started_at = None
+        self.last_report_at = None
+        self.last_reported_percent = None
+        self.last_print_at = None
+
+    def __call__(self, d: Dict[str, Any]) -> None:
+        status = d.get('status')
+        if status == 'downloading':
+            self._update_stream(d, finished=False)
+            self._emit(force=False)
+        elif status == 'finished':
+            self._update_stream(d, finished=True)
+            self._emit(force=True)
+            print(f'✅ Download completed: {os.path.basename(d.get("filename") or "Unknown file")}')
+        elif status == 'error':
+            print('❌ Download error occurred')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the structured progress numbers"""
+        downloaded = sum(stream['downloaded'] for stream in self.streams.values())
+        total = sum(stream['total'] for stream in self.streams.values())
+        elapsed = self.clock() - self.started_at if self.started_at is not None else 0.0
+        return {
+            'percent': self.percent,
+            'downloaded_bytes': int(downloaded),
+            'total_bytes': int(total),
+            'speed': self.speed,
+            'eta': self.eta,
+            'elapsed': round(elapsed, 3),
+            'average_speed': downloaded / elapsed if elapsed > 0 else None,
+        }
+
+    def _update_stream(self, d: Dict[str, Any], finished: bool) -> None:
+        if self.started_at is None:
+            self.started_at = self.clock()
+        info = d.get('info_dict') or {}
+        key = str(info.get('format_id') or d.get('filename'))
+
+        total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+        downloaded = d.get('downloaded_bytes') or 0
+        if total:
+            fraction = downloaded / total
+        elif d.get('fragment_count'):
+            fraction = (d.get('fragment_index') or 0) / d['fragment_count']
+        else:
+            fraction = 0.0
+        if finished:
+            fraction = 1.0
+            total = total or downloaded
+
+        self.streams[key] = {'downloaded': downloaded, 'total': total, 'fraction': min(1.0, fraction)}
+        # Finished events carry no speed; the last measured one still estimates the streams to come
+        self.speed = d.get('speed') or self.speed
+
+        # Streams that have not started yet still count with their weight
+        weights = dict.fromkeys(self.streams, 1.0)
+        weights.update(self.weights)
+        overall = sum(weights.get(k, 1.0) * stream['fraction'] for k, stream in self.streams.items()) / sum(weights.values())
+        self.percent = max(self.percent, min(100, int(overall * 100)))
+
+        remaining = sum(stream['total'] - stream['downloaded'] for stream in self.streams.values() if stream['total'])
+        # Expected size of the streams still to come
+        remaining += sum(size for k, size in self.sizes.items() if k not in self.streams)
+        self.eta = remaining / self.speed if self.speed and remaining > 0 else d.get('eta')
+
+    def _emit(self, force: bool) -> None:
+        now = self.clock()
+        interval_passed = self.last_report_at is None or now - self.last_report_at >= self.report_interval
+        if self.percent != self.last_reported_percent and (force or interval_passed):
+            self.context.report_progress(self.percent)
+            self.last_report_at = now
+            self.last_reported_percent = self.percent
+
+        if force or self.last_print_at is None or now - self.last_print_at >= self.print_interval:
+            stats = self.snapshot()
+            size_info = format_file_size(stats['total_bytes'], stats['downloaded_bytes'])
+            print(f'📥 Downloading: {self.percent}% - {size_info} - Speed: {format_speed(self.speed)} - ETA: {format_eta(self.eta)}')
+            self.last_print_at = now
+
+
+def get_stream_weights(formats: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Weight the requested streams by expected size, or equally if unknown"""
+    sizes = {
+        str(fmt.get('format_id')): fmt.get('filesize') or fmt.get('filesize_approx')
+        for fmt in formats
+    }
+    if not sizes:
+        return {}
+    if all(sizes.values()):
+        return {key: float(size) for key, size in sizes.items()}
+    return dict.fromkeys(sizes, 1.0)
+
+
+def create_progress_hook(context: Context, requested_formats: Optional[List[Dict[str, Any]]] = None) -> ProgressReporter:
+    """Create a progress hook function for yt-dlp, for the streams of the selected formats"""
+    return ProgressReporter(context, requested_formats)
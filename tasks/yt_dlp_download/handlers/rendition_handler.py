@@ -0,0 +1,142 @@
+"""Several renditions of one video, sharing the source streams they download"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..cache.download_archive import link_file
+
+# Inputs a rendition spec may set; the rest of the task inputs are shared
+RENDITION_KEYS = (
+    'name', 'format', 'quality', 'audio_only', 'audio_format', 'container',
+    'hdr', 'high_fps', 'codec_preference', 'bitrate_limit',
+)
+
+
+def get_rendition_name(spec: Dict[str, Any]) -> str:
+    """Default name of a rendition, e.g. "1080p", "1080p-vp9" or "audio-mp3\""""
+    if spec.get('audio_only'):
+        return f"audio-{spec.get('audio_format') or 'mp3'}"
+    name = spec.get('format') or spec.get('quality') or 'best'
+    if spec.get('codec_preference'):
+        name += f"-{spec['codec_preference']}"
+    return name
+
+
+def parse_renditions(renditions: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Validate the rendition specs and give each a unique name"""
+    specs = []
+    names = set()
+    for spec in renditions or []:
+        if not isinstance(spec, dict):
+            raise ValueError(f"Invalid rendition: {spec}. Use an object such as {{\"quality\": \"1080p\"}}")
+        unknown = set(spec) - set(RENDITION_KEYS)
+        if unknown:
+            raise ValueError(f"Invalid rendition option(s): {', '.join(sorted(unknown))}. Use {', '.join(RENDITION_KEYS)}")
+        spec = dict(spec)
+        base = re.sub(r'[^\w.-]+', '-', str(spec.get('name') or get_rendition_name(spec))).strip('-') or 'rendition'
+        name, number = base, 2
+        while name in names:
+            name, number = f'{base}-{number}', number + 1
+        names.add(name)
+        spec['name'] = name
+        specs.append(spec)
+    return specs
+
+
+def get_rendition_params(params: Dict[str, Any], spec: Dict[str, Any], filename_template: str) -> Dict[str, Any]:
+    """Task inputs of one rendition: the shared inputs, overridden by the spec"""
+    rendition = dict(params, renditions=None)
+    for key in RENDITION_KEYS:
+        if key != 'name' and key in spec:
+            rendition[key] = spec[key]
+    suffix = f" [{spec['name']}]"
+    if filename_template.endswith('.%(ext)s'):
+        rendition['filename_template'] = filename_template[:-len('.%(ext)s')] + suffix + '.%(ext)s'
+    else:
+        rendition['filename_template'] = filename_template + suffix
+    return rendition
+
+
+class RenditionProgress:
+    """Report one rendition's progress as its equal share of the task's progress"""
+
+    def __init__(self, context, index: int, count: int):
+        self.context = context
+        self.index = index
+        self.count = max(1, count)
+
+    def report_progress(self, percent: int) -> None:
+        self.context.report_progress(int((self.index * 100 + percent) / self.count))
+
+
+class SharedStreams:
+    """Source streams downloaded once and reused by every rendition that selects them
+
+    TaskYoutubeDL reads this from its ``shared_streams`` option. After a
+    stream (one format, or one time range of it) is downloaded, it is
+    linked into a scratch directory next to the partial files, before
+    merging or conversion can remove it; a later rendition selecting the
+    same stream links it from there instead of downloading it again. Hard
+    links make this free where the file system allows them.
+    """
+
+    def __init__(self, parent_dir: str):
+        self.work_dir = tempfile.mkdtemp(prefix='.streams-', dir=parent_dir)
+        self.lock = threading.Lock()
+        self.streams: Dict[Any, Dict[str, Any]] = {}
+
+    def _key(self, info: Dict[str, Any]):
+        # A time-range clip of a format is its own stream
+        return str(info.get('format_id')), info.get('clip_section')
+
+    def fetch(self, info: Dict[str, Any], filename: str) -> bool:
+        """Place an already downloaded stream at ``filename``; False if it was not downloaded yet"""
+        with self.lock:
+            stream = self.streams.get(self._key(info))
+        if stream is None:
+            return False
+        if os.path.exists(filename):
+            os.remove(filename)
+        link_file(stream['path'], filename)
+        with self.lock:
+            stream['reused'] += 1
+        return True
+
+    def store(self, info: Dict[str, Any], filename: str) -> None:
+        """Keep a newly downloaded stream for later renditions"""
+        key = self._key(info)
+        if not os.path.isfile(filename):
+            return
+        with self.lock:
+            if key in self.streams:
+                return
+            path = os.path.join(self.work_dir, f'{len(self.streams)}{os.path.splitext(filename)[1]}')
+            self.streams[key] = {'path': path, 'bytes': os.path.getsize(filename), 'reused': 0, 'vcodec': info.get('vcodec'), 'acodec': info.get('acodec')}
+        link_file(filename, path)
+
+    def audio_stream(self) -> Optional[str]:
+        """Format ID of a downloaded audio-only stream, for renditions that convert whatever audio they get"""
+        with self.lock:
+            for (format_id, clip_section), stream in self.streams.items():
+                if clip_section is None and stream['vcodec'] == 'none' and stream['acodec'] not in (None, 'none'):
+                    return format_id
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        with self.lock:
+            streams = list(self.streams.items())
+        return {
+            'streams': [
+                {'format_id': format_id, 'clip_section': clip_section, 'bytes': stream['bytes'], 'reused': stream['reused']}
+                for (format_id, clip_section), stream in streams
+            ],
+            'downloaded_bytes': sum(stream['bytes'] for _, stream in streams),
+            'bytes_reused': sum(stream['bytes'] * stream['reused'] for _, stream in streams),
+        }
+
+    def close(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
@@ -0,0 +1,110 @@
+"""Sidecar files written next to the downloaded media: info JSON and thumbnail"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .info_handler import prepare_video_info
+
+INFO_JSON_MODES = ('none', 'compact', 'full')
+
+# Fields kept for each selected format in the compact info JSON
+COMPACT_FORMAT_FIELDS = (
+    'format_id', 'ext', 'protocol', 'vcodec', 'acodec', 'width', 'height', 'fps',
+    'dynamic_range', 'tbr', 'vbr', 'abr', 'asr', 'audio_channels', 'filesize', 'filesize_approx',
+)
+
+
+def parse_info_json_mode(value: Optional[str]) -> str:
+    """Validate the info_json input; unset means no info JSON"""
+    mode = (value or 'none').strip().lower()
+    if mode not in INFO_JSON_MODES:
+        raise ValueError(f"Invalid info_json: {value}. Use one of {', '.join(INFO_JSON_MODES)}")
+    return mode
+
+
+def get_selected_formats(planned: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The formats a processed info dict will download, trimmed to COMPACT_FORMAT_FIELDS"""
+    formats = planned.get('requested_formats') or [planned]
+    return [
+        {key: f[key] for key in COMPACT_FORMAT_FIELDS if f.get(key) is not None}
+        for f in formats
+    ]
+
+
+def prepare_compact_info(info: Dict[str, Any], planned: Dict[str, Any]) -> Dict[str, Any]:
+    """What the task outputs about a video, plus the formats chosen for it"""
+    return dict(
+        prepare_video_info(info),
+        id=info.get('id'),
+        extractor=info.get('extractor_key') or info.get('extractor'),
+        format_id=planned.get('format_id'),
+        formats=get_selected_formats(planned),
+    )
+
+
+def write_compact_info_json(path: str, info: Dict[str, Any], planned: Dict[str, Any]) -> str:
+    """Write the compact info JSON and return its absolute path"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(prepare_compact_info(info, planned), f, ensure_ascii=False, separators=(',', ':'))
+    return os.path.abspath(path)
+
+
+class ThumbnailFetcher:
+    """Fetch the thumbnail on a background thread while the media downloads
+
+    yt-dlp fetches thumbnails serially before the media; here the request
+    goes through the same YoutubeDL (proxy, cookies, rate scheduler) but
+    overlaps the download. Failures only warn, as yt-dlp's do.
+    """
+
+    def __init__(self, ydl, url: str, path: str):
+        self.ydl = ydl
+        self.url = url
+        self.path = path
+        self.filepath: Optional[str] = None
+        self.seconds = 0.0
+        self.thread = threading.Thread(target=self._fetch, name='thumbnail', daemon=True)
+
+    def start(self) -> 'ThumbnailFetcher':
+        self.thread.start()
+        return self
+
+    def wait(self) -> Dict[str, Any]:
+        """Wait for the fetch and report how much of it the download hid"""
+        start = time.perf_counter()
+        self.thread.join()
+        waited = time.perf_counter() - start
+        return {
+            'filepath': self.filepath,
+            'seconds': round(self.seconds, 3),
+            'overlapped_seconds': round(max(self.seconds - waited, 0.0), 3),
+        }
+
+    def _fetch(self) -> None:
+        start = time.perf_counter()
+        try:
+            with self.ydl.urlopen(self.url) as response:
+                data = response.read()
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            self.filepath = os.path.abspath(self.path)
+        except Exception as e:
+            print(f'⚠️ Could not fetch thumbnail: {e}')
+        finally:
+            self.seconds = time.perf_counter() - start
+
+
+def start_thumbnail_fetch(ydl, planned: Dict[str, Any], stem: str) -> Optional[ThumbnailFetcher]:
+    """Start fetching the preferred thumbnail next to the media, if the video has one"""
+    from yt_dlp.utils import determine_ext
+
+    url = planned.get('thumbnail')
+    if not url:
+        return None
+    ext = determine_ext(url, 'jpg')
+    if ext not in ('jpg', 'jpeg', 'png', 'webp', 'gif'):
+        ext = 'jpg'
+    return ThumbnailFetcher(ydl, url, f'{stem}.{ext}').start()
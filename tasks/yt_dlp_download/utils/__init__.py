@@ -1,12 +1,19 @@
 """Utils module for video downloader"""
 
-from .file_utils import ensure_output_dir, find_downloaded_file, sanitize_filename
+from .file_utils import ensure_output_dir, find_downloaded_file, sanitize_filename, get_default_cache_dir, preallocate
+from .state_file import locked_state, read_state, try_lock, unlock
 from .format_utils import format_duration, format_view_count, format_file_size
 
 __all__ = [
     'ensure_output_dir',
     'find_downloaded_file',
     'sanitize_filename',
+    'get_default_cache_dir',
+    'preallocate',
+    'locked_state',
+    'read_state',
+    'try_lock',
+    'unlock',
     'format_duration',
     'format_view_count',
     'format_file_size'
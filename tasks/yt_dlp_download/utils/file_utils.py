@@ -28,6 +28,28 @@ def ensure_output_dir(output_dir: str) -> None:
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
 
+def preallocate(path: str, size: int, keep_data: bool = False) -> None:
+    """Create a file of the given size, reserving the disk space where supported
+
+    With ``keep_data``, an existing file is extended to the size instead of
+    being emptied.
+    """
+    with open(path, 'r+b' if keep_data and os.path.isfile(path) else 'wb') as f:
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        f.truncate(size)
+
+
+def get_default_cache_dir() -> str:
+    """Get the default cache directory"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return os.path.join(cache_home, 'video-downloador')
+
+
 def find_downloaded_file(filename: str, output_dir: str, title: str, audio_only: bool = False, ext: str = None) -> str:
     """Find the actual downloaded file path"""
     # Check if the expected file exists
@@ -6,6 +6,8 @@ def format_duration(duration: int) -> str:
     if duration <= 0:
         return 'Unknown'
     
+    # Extractors of HLS/DASH sites report fractional durations
+    duration = int(duration)
     hours = duration // 3600
     minutes = (duration % 3600) // 60
     seconds = duration % 60
@@ -0,0 +1,83 @@
+"""File-locked JSON state shared between concurrent processes"""
+
+import contextlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock(f) -> None:
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f) -> None:
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def try_lock(f) -> bool:
+    """Take an exclusive lock on an open file without waiting; False if another holder has it"""
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def unlock(f) -> None:
+    """Release a lock taken with try_lock"""
+    _unlock(f)
+
+
+@contextlib.contextmanager
+def locked_state(path: str) -> Iterator[Dict[str, Any]]:
+    """Load a JSON state file under an exclusive lock and write it back on exit
+
+    The lock is held on a sidecar ``.lock`` file, so readers never observe a
+    partially written state file.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(f'{path}.lock', 'a+') as lock_file:
+        _lock(lock_file)
+        try:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+
+            yield state
+
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        finally:
+            _unlock(lock_file)
+
+
+def read_state(path: str) -> Dict[str, Any]:
+    """Read a JSON state file without locking"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
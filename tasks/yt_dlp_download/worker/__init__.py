@@ -0,0 +1,12 @@
+from .client import ping_worker, run_in_worker, start_worker, stop_worker
+from .protocol import get_socket_path
+from .server import WorkerServer
+
+__all__ = [
+    'ping_worker',
+    'run_in_worker',
+    'start_worker',
+    'stop_worker',
+    'get_socket_path',
+    'WorkerServer',
+]
@@ -0,0 +1,128 @@
+"""Start the warm worker on demand and hand jobs to it"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from .protocol import PACKAGE_DIR, connect, get_code_version, get_socket_path
+from .server import DEFAULT_IDLE_SECONDS
+from ..utils.file_utils import get_default_cache_dir
+from ..utils.state_file import locked_state
+
+PING_TIMEOUT_SECONDS = 2
+
+# How long a freshly started worker may take to answer
+STARTUP_TIMEOUT_SECONDS = 20
+
+
+def ping_worker(socket_path: str) -> Optional[Dict[str, Any]]:
+    """Return the worker's status, or None if no worker answers"""
+    try:
+        channel = connect(socket_path, timeout=PING_TIMEOUT_SECONDS)
+    except OSError:
+        return None
+    try:
+        channel.send({'op': 'ping'})
+        return channel.receive()
+    except (OSError, ValueError):
+        return None
+    finally:
+        channel.close()
+
+
+def stop_worker(socket_path: str) -> Optional[Dict[str, Any]]:
+    """Ask the worker to stop taking jobs; running jobs still finish"""
+    try:
+        channel = connect(socket_path, timeout=PING_TIMEOUT_SECONDS)
+    except OSError:
+        return None
+    try:
+        channel.send({'op': 'shutdown'})
+        return channel.receive()
+    except (OSError, ValueError):
+        return None
+    finally:
+        channel.close()
+
+
+def start_worker(cache_dir: Optional[str], idle_seconds: Optional[int] = None) -> Optional[str]:
+    """Make sure a worker running the current code listens, and return its socket path"""
+    cache_dir = cache_dir or get_default_cache_dir()
+    socket_path = get_socket_path(cache_dir)
+    version = get_code_version()
+
+    # Serialise concurrent tasks, so only one of them starts a worker
+    with locked_state(os.path.join(cache_dir, 'worker.json')) as state:
+        status = ping_worker(socket_path)
+        if status and status.get('accepting') and status.get('version') == version:
+            return socket_path
+        if status:
+            print(f'♻️ Replacing warm worker {status.get("pid")} (code changed or retiring)')
+            stop_worker(socket_path)
+
+        args = [sys.executable, '-m', 'yt_dlp_download.worker', '--socket', socket_path,
+                '--idle-seconds', str(idle_seconds or DEFAULT_IDLE_SECONDS)]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PACKAGE_DIR.parent), os.environ.get('PYTHONPATH')])))
+        with open(os.path.join(cache_dir, 'worker.log'), 'ab') as log:
+            process = subprocess.Popen(args, env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        while time.monotonic() < deadline and process.poll() is None:
+            status = ping_worker(socket_path)
+            if status and status.get('version') == version:
+                print(f'🔥 Started warm worker {status["pid"]}')
+                state.update(pid=status['pid'], version=version, started_at=time.time())
+                return socket_path
+            time.sleep(0.05)
+    return None
+
+
+def run_in_worker(params: Dict[str, Any], output_dir: str, context) -> Optional[Dict[str, Any]]:
+    """Run a job in the warm worker
+
+    Returns None when the worker cannot be used, so the caller runs the job
+    itself. Errors raised by the job are raised again here as ValueError.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        print('⚠️ Warm worker needs Unix sockets, running in this process')
+        return None
+
+    socket_path = start_worker(params.get('cache_dir'), params.get('worker_idle_seconds'))
+    if socket_path is None:
+        print('⚠️ Warm worker did not start, running in this process')
+        return None
+
+    try:
+        channel = connect(socket_path)
+    except OSError:
+        print('⚠️ Warm worker is not reachable, running in this process')
+        return None
+
+    try:
+        channel.send({'op': 'run', 'params': params, 'output_dir': output_dir})
+        while True:
+            message = channel.receive()
+            if message is None:
+                break
+            event = message.get('event')
+            if event == 'log':
+                stream = sys.stderr if message.get('stream') == 'stderr' else sys.stdout
+                stream.write(message['text'])
+            elif event == 'progress':
+                context.report_progress(message['percent'])
+            elif event == 'result':
+                return message['result']
+            elif event == 'error':
+                raise ValueError(message['message'])
+            elif event == 'retired':
+                break
+    except OSError:
+        pass
+    finally:
+        channel.close()
+
+    print('⚠️ Warm worker dropped the job, running in this process')
+    return None
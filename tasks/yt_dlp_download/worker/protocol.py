@@ -0,0 +1,72 @@
+"""Line-delimited JSON messages exchanged with the warm worker"""
+
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+
+
+def get_socket_path(cache_dir: Optional[str]) -> str:
+    """Return the worker socket of a cache directory
+
+    The socket lives in the temporary directory, as Unix socket paths are
+    limited to about 100 characters.
+    """
+    from ..utils.file_utils import get_default_cache_dir
+
+    digest = hashlib.sha1(os.path.abspath(cache_dir or get_default_cache_dir()).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f'video-downloador-{os.getuid()}-{digest}.sock')
+
+
+def get_code_version() -> str:
+    """Fingerprint the package sources, so a worker running outdated code is replaced"""
+    digest = hashlib.sha1()
+    for path in sorted(PACKAGE_DIR.rglob('*.py')):
+        stat = path.stat()
+        digest.update(f'{path.relative_to(PACKAGE_DIR)}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+    return digest.hexdigest()[:16]
+
+
+class Channel:
+    """One connection to or from the worker, safe to send on from several threads"""
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.file = conn.makefile('rw', encoding='utf-8', newline='\n')
+        self.lock = threading.Lock()
+
+    def send(self, message: Dict[str, Any]) -> None:
+        line = json.dumps(message, ensure_ascii=False, default=str) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def receive(self) -> Optional[Dict[str, Any]]:
+        """Return the next message, or None once the other side has closed the connection"""
+        line = self.file.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self) -> None:
+        try:
+            self.file.close()
+        finally:
+            self.conn.close()
+
+
+def connect(socket_path: str, timeout: Optional[float] = None) -> Channel:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(socket_path)
+    except OSError:
+        conn.close()
+        raise
+    return Channel(conn)
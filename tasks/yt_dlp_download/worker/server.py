@@ -0,0 +1,230 @@
+"""Long-lived worker running download jobs handed over a Unix socket"""
+
+import argparse
+import io
+import os
+import resource
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .protocol import Channel, get_code_version, connect
+
+# The worker exits after this long without jobs
+DEFAULT_IDLE_SECONDS = 300
+
+# The worker stops taking jobs after this many, so a fresh one replaces it
+MAX_JOBS_PER_WORKER = 1000
+
+# How often the accept loop checks for idleness
+ACCEPT_TIMEOUT_SECONDS = 1.0
+
+
+class JobOutput(io.TextIOBase):
+    """Standard stream routing each job thread's output to its connection"""
+
+    def __init__(self, stream, name: str):
+        self.stream = stream
+        self.name = name
+        self.local = threading.local()
+
+    def route(self, channel: Optional[Channel]) -> None:
+        self.local.channel = channel
+
+    def write(self, text: str) -> int:
+        channel = getattr(self.local, 'channel', None)
+        if channel is None:
+            return self.stream.write(text)
+        try:
+            channel.send({'event': 'log', 'stream': self.name, 'text': text})
+        except OSError:
+            pass
+        return len(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    @property
+    def encoding(self) -> str:
+        return 'utf-8'
+
+
+class RemoteContext:
+    """Context handed to jobs, forwarding progress to the task process"""
+
+    def __init__(self, channel: Channel):
+        self.channel = channel
+
+    def report_progress(self, percent) -> None:
+        try:
+            self.channel.send({'event': 'progress', 'percent': percent})
+        except OSError:
+            pass
+
+
+class WorkerServer:
+    """Accepts jobs on a Unix socket and runs each on its own thread
+
+    The worker keeps yt-dlp imported and hands every job a warm session
+    (cookie jar, HTTP connection pools, extractor instances with their
+    player caches), leased to one job at a time. Jobs get their own option
+    dicts and YoutubeDL instances, so nothing set by one job reaches the
+    next. The worker exits after ``idle_seconds`` without jobs, and stops
+    taking jobs after ``max_jobs`` so memory does not grow without bound.
+    """
+
+    def __init__(self, socket_path: str, idle_seconds: float = DEFAULT_IDLE_SECONDS, max_jobs: int = MAX_JOBS_PER_WORKER):
+        self.socket_path = socket_path
+        self.idle_seconds = idle_seconds
+        self.max_jobs = max_jobs
+        self.version = get_code_version()
+        self.started_at = time.time()
+        self.last_activity = time.monotonic()
+        self.lock = threading.Lock()
+        self.active_jobs = 0
+        self.jobs_served = 0
+        self.accepting = True
+        self.listener: Optional[socket.socket] = None
+        self.socket_inode: Optional[int] = None
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            try:
+                connect(self.socket_path, timeout=1).close()
+                print(f'Another worker is listening on {self.socket_path}')
+                return
+            except OSError:
+                os.unlink(self.socket_path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.socket_inode = os.stat(self.socket_path).st_ino
+        self.listener.listen()
+        self.listener.settimeout(ACCEPT_TIMEOUT_SECONDS)
+        sys.stdout = JobOutput(sys.stdout, 'stdout')
+        sys.stderr = JobOutput(sys.stderr, 'stderr')
+        print(f'Worker {os.getpid()} listening on {self.socket_path}')
+
+        try:
+            while True:
+                try:
+                    conn, _ = self.listener.accept()
+                except socket.timeout:
+                    if self._should_exit():
+                        break
+                    continue
+                except OSError:
+                    # The listener was closed by a shutdown request
+                    if self._should_exit():
+                        break
+                    time.sleep(ACCEPT_TIMEOUT_SECONDS)
+                    continue
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            self.stop_accepting()
+        print(f'Worker {os.getpid()} exiting after {self.jobs_served} job(s)')
+
+    def handle(self, conn: socket.socket) -> None:
+        channel = Channel(conn)
+        try:
+            request = channel.receive()
+            op = (request or {}).get('op')
+            if op == 'ping':
+                channel.send(self.status())
+            elif op == 'shutdown':
+                self.stop_accepting()
+                channel.send(self.status())
+            elif op == 'run':
+                self.run_job(channel, request)
+        except (OSError, ValueError):
+            pass
+        finally:
+            channel.close()
+
+    def run_job(self, channel: Channel, request: Dict[str, Any]) -> None:
+        from .. import run_job
+        from ..downloaders import warm_sessions
+
+        with self.lock:
+            if not self.accepting:
+                channel.send({'event': 'retired'})
+                return
+            self.active_jobs += 1
+            self.jobs_served += 1
+            if self.jobs_served >= self.max_jobs:
+                self._close_listener()
+
+        sys.stdout.route(channel)
+        sys.stderr.route(channel)
+        start = time.perf_counter()
+        try:
+            with warm_sessions.lease():
+                result = run_job(request['params'], request['output_dir'], RemoteContext(channel))
+            if isinstance(result.get('info'), dict):
+                result['info']['worker'] = dict(self.status(), job_seconds=round(time.perf_counter() - start, 3))
+            channel.send({'event': 'result', 'result': result})
+        except Exception as e:
+            channel.send({'event': 'error', 'message': str(e)})
+        finally:
+            sys.stdout.route(None)
+            sys.stderr.route(None)
+            with self.lock:
+                self.active_jobs -= 1
+                self.last_activity = time.monotonic()
+
+    def status(self) -> Dict[str, Any]:
+        from ..downloaders import warm_sessions
+
+        return {
+            'event': 'status',
+            'pid': os.getpid(),
+            'version': self.version,
+            'accepting': self.accepting,
+            'uptime': round(time.time() - self.started_at, 1),
+            'jobs_served': self.jobs_served,
+            'active_jobs': self.active_jobs,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'sessions': warm_sessions.stats(),
+        }
+
+    def stop_accepting(self) -> None:
+        """Stop taking jobs; running jobs finish before the worker exits"""
+        with self.lock:
+            self._close_listener()
+
+    def _close_listener(self) -> None:
+        if not self.accepting:
+            return
+        self.accepting = False
+        try:
+            # Only remove the socket if a newer worker has not replaced it
+            if os.stat(self.socket_path).st_ino == self.socket_inode:
+                os.unlink(self.socket_path)
+        except OSError:
+            pass
+        self.listener.close()
+
+    def _should_exit(self) -> bool:
+        with self.lock:
+            if self.active_jobs:
+                return False
+            return not self.accepting or time.monotonic() - self.last_activity > self.idle_seconds
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Warm worker for the video download task')
+    parser.add_argument('--socket', required=True, help='Unix socket path to listen on')
+    parser.add_argument('--idle-seconds', type=float, default=DEFAULT_IDLE_SECONDS)
+    parser.add_argument('--max-jobs', type=int, default=MAX_JOBS_PER_WORKER)
+    args = parser.parse_args(argv)
+
+    # Import yt-dlp up front, so the first job does not pay for it
+    from .. import downloaders  # noqa: F401
+
+    WorkerServer(args.socket, args.idle_seconds, args.max_jobs).serve_forever()
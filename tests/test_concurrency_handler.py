@@ -0,0 +1,55 @@
+"""Tests for adaptive fragment concurrency"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp_download.handlers.concurrency_handler import DEFAULT_INITIAL_FRAGMENTS, MIN_SAMPLE_BYTES, create_fragment_controller, get_fragment_host  # noqa: E402
+
+
+def hls_info(page_host, cdn_host):
+    return {
+        'webpage_url': f'https://{page_host}/watch/video',
+        'requested_formats': [{
+            'format_id': 'hls-720p',
+            'protocol': 'm3u8_native',
+            'url': f'https://{cdn_host}/video/720p.m3u8',
+            'manifest_url': f'https://{cdn_host}/video/master.m3u8',
+        }],
+    }
+
+
+def controller_for(info, state_dir):
+    controller = create_fragment_controller(info['webpage_url'], 'auto', None, str(state_dir))
+    controller.bind({})
+    controller.use_host(get_fragment_host(info))
+    return controller
+
+
+def test_fragment_errors_from_many_threads_are_all_counted(tmp_path):
+    controller = create_fragment_controller('https://example.com/watch', 'auto', None, str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda n: controller.on_fragment_retry(n, sleep_function=lambda n: 0), [0] * 4000))
+    assert controller.errors == 4000
+
+
+def test_sites_on_one_cdn_share_what_they_learn(tmp_path):
+    first = controller_for(hls_info('site-a.example', 'cdn.example.net'), tmp_path)
+    assert first.host == 'cdn.example.net'
+    settled = first.observe(first.concurrency, MIN_SAMPLE_BYTES * 8, 1.0, 0, 100)
+    assert settled != DEFAULT_INITIAL_FRAGMENTS
+
+    second = controller_for(hls_info('site-b.example', 'cdn.example.net'), tmp_path)
+    assert second.concurrency == settled
+    assert second.ydl_params['concurrent_fragment_downloads'] == settled
+
+    other = controller_for(hls_info('site-b.example', 'other-cdn.example.net'), tmp_path)
+    assert other.concurrency == DEFAULT_INITIAL_FRAGMENTS
+
+
+def test_progressive_formats_keep_the_page_host(tmp_path):
+    info = {'webpage_url': 'https://site-a.example/watch', 'requested_formats': [{'protocol': 'https', 'url': 'https://cdn.example.net/video.mp4'}]}
+    assert get_fragment_host(info) is None
+    assert controller_for(info, tmp_path).host == 'site-a.example'
@@ -0,0 +1,71 @@
+"""Tests for expiry checks and re-extraction of signed format URLs"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp.utils import DownloadError  # noqa: E402
+from yt_dlp_download.handlers.download_handler import download_with_info, signed_urls_expired  # noqa: E402
+
+URL = 'https://example.com/watch?v=video'
+
+
+def planned_with(url):
+    return {
+        'id': 'video',
+        'format_id': '137+140',
+        'requested_formats': [{'format_id': '137', 'url': url}, {'format_id': '140', 'url': url}],
+    }
+
+
+class FakeYoutubeDL:
+    """Records downloads; the first processing of the extracted info fails with ``error``"""
+
+    def __init__(self, format_spec, error=None):
+        self.params = {'format': format_spec}
+        self.format_selector = format_spec
+        self.error = error
+        self.downloaded = []
+
+    def build_format_selector(self, format_spec):
+        return format_spec
+
+    def sanitize_info(self, info, remove_private_keys=False):
+        return info
+
+    def process_ie_result(self, info, download=True):
+        if self.error:
+            raise DownloadError(self.error)
+
+    def download(self, urls):
+        self.downloaded.append((urls, self.params['format']))
+
+
+def test_expiry_is_checked_on_the_selected_formats():
+    expired = planned_with(f'https://cdn.example.com/v?expire={int(time.time()) - 60}')
+    # The extracted info has no top-level URL; only format selection tells which URLs are used
+    info = {'id': 'video', 'formats': expired['requested_formats']}
+    assert not signed_urls_expired(info)
+    assert signed_urls_expired(expired)
+
+    ydl = FakeYoutubeDL('137+140')
+    assert download_with_info(ydl, info, URL, expired) is False
+    assert ydl.downloaded == [([URL], '137+140/best')]
+
+
+def test_rejected_signed_url_is_extracted_again_with_a_fallback():
+    signed = planned_with(f'https://cdn.example.com/v?expire={int(time.time()) + 3600}')
+    ydl = FakeYoutubeDL('137+140', error='HTTP Error 403: Forbidden')
+    assert download_with_info(ydl, {'id': 'video'}, URL, signed) is False
+    assert ydl.downloaded == [([URL], '137+140/best')]
+
+
+def test_forbidden_unsigned_url_is_not_extracted_again():
+    ydl = FakeYoutubeDL('137+140', error='HTTP Error 403: Forbidden')
+    with pytest.raises(DownloadError):
+        download_with_info(ydl, {'id': 'video'}, URL, planned_with('https://cdn.example.com/v'))
+    assert ydl.downloaded == []
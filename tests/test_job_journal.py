@@ -0,0 +1,57 @@
+"""Tests for job ownership in the resumable job journal"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp_download.cache.job_journal import JobJournal  # noqa: E402
+
+KEY = 'job'
+
+
+def start_job(journal, work_dir):
+    journal.start(KEY, 'https://example.com/watch', str(work_dir), 'video', 'best', {'id': 'video'})
+    partial = work_dir / 'video.mp4.part'
+    partial.write_bytes(b'partial')
+    return partial
+
+
+def test_running_job_is_not_claimed_twice(tmp_path):
+    first, second = JobJournal(str(tmp_path / 'cache')), JobJournal(str(tmp_path / 'cache'))
+    assert first.claim(KEY)
+    assert not second.claim(KEY)
+
+    first.close()
+    assert second.claim(KEY)
+    second.close()
+
+
+def test_finished_job_can_be_claimed_again(tmp_path):
+    journal = JobJournal(str(tmp_path / 'cache'))
+    assert journal.claim(KEY)
+    journal.finish(KEY)
+    assert not os.path.exists(journal._lock_path(KEY))
+
+    other = JobJournal(str(tmp_path / 'cache'))
+    assert other.claim(KEY)
+    other.close()
+    journal.close()
+
+
+def test_garbage_collection_keeps_running_jobs(tmp_path):
+    running = JobJournal(str(tmp_path / 'cache'), stale_seconds=0)
+    assert running.claim(KEY)
+    partial = start_job(running, tmp_path)
+    time.sleep(0.01)
+
+    collector = JobJournal(str(tmp_path / 'cache'), stale_seconds=0)
+    assert collector.collect_garbage() == 0
+    assert partial.exists()
+
+    running.close()
+    assert collector.collect_garbage() == 1
+    assert not partial.exists()
+    collector.close()
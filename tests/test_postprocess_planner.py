@@ -0,0 +1,45 @@
+"""Tests for the default outputs of the post-processing planner"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp_download.config import plan_postprocessing  # noqa: E402
+
+M4A = {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2'}
+MP3 = {'format_id': 'mp3', 'ext': 'mp3', 'vcodec': 'none', 'acodec': 'mp3'}
+H264 = {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none'}
+VP9 = {'format_id': '248', 'ext': 'webm', 'vcodec': 'vp9', 'acodec': 'none'}
+OPUS = {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus'}
+
+
+def merged(*formats):
+    return {'format_id': '+'.join(fmt['format_id'] for fmt in formats), 'ext': 'webm', 'requested_formats': list(formats)}
+
+
+def test_audio_defaults_to_mp3():
+    plan = plan_postprocessing(dict(M4A), True)
+    assert (plan['action'], plan['ext']) == ('transcode', 'mp3')
+
+    plan = plan_postprocessing(dict(MP3), True)
+    assert (plan['action'], plan['ext'], plan['postprocessors']) == ('copy', 'mp3', [])
+
+
+def test_best_audio_keeps_the_source():
+    plan = plan_postprocessing(dict(M4A), True, 'best')
+    assert (plan['action'], plan['ext']) == ('copy', 'm4a')
+
+
+def test_video_defaults_to_mp4():
+    for info in (merged(H264, M4A), merged(VP9, OPUS)):
+        plan = plan_postprocessing(info, False)
+        assert (plan['action'], plan['ext'], plan['merge_output_format']) == ('remux', 'mp4', 'mp4')
+
+    plan = plan_postprocessing(dict(H264, acodec='mp4a.40.2'), False)
+    assert (plan['action'], plan['ext']) == ('copy', 'mp4')
+
+
+def test_auto_container_keeps_native_streams():
+    plan = plan_postprocessing(merged(VP9, OPUS), False, container='auto')
+    assert plan['ext'] == 'webm'
@@ -0,0 +1,73 @@
+"""Tests for the progress reporter of merged (video + audio) downloads"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp_download.handlers.progress_handler import ProgressReporter  # noqa: E402
+from yt_dlp_download.handlers.rendition_handler import RenditionProgress  # noqa: E402
+
+VIDEO = {'format_id': '137', 'filesize': 8_000_000}
+AUDIO = {'format_id': '140', 'filesize': 2_000_000}
+
+
+class RecordingContext:
+    def __init__(self):
+        self.reported = []
+
+    def report_progress(self, percent):
+        self.reported.append(percent)
+
+
+def stream_events(fmt, steps=4):
+    """Progress hook calls yt-dlp makes for one stream; its info dict has no requested_formats"""
+    info = {'format_id': fmt['format_id']}
+    total = fmt['filesize']
+    for step in range(1, steps):
+        yield {'status': 'downloading', 'info_dict': info, 'downloaded_bytes': total * step // steps,
+               'total_bytes': total, 'speed': 1_000_000.0, 'filename': f'video.f{fmt["format_id"]}.mp4'}
+    yield {'status': 'finished', 'info_dict': info, 'downloaded_bytes': total, 'total_bytes': total,
+           'filename': f'video.f{fmt["format_id"]}.mp4'}
+
+
+def test_percent_stays_below_100_until_the_last_stream_finishes():
+    context = RecordingContext()
+    reporter = ProgressReporter(context, [VIDEO, AUDIO], report_interval=0, print_interval=float('inf'))
+
+    for event in stream_events(VIDEO):
+        reporter(event)
+    assert reporter.percent == 80
+    # The audio stream has not started, but its size still counts towards the ETA
+    assert reporter.eta == 2.0
+
+    audio_events = list(stream_events(AUDIO))
+    for event in audio_events[:-1]:
+        reporter(event)
+        assert reporter.percent < 100
+    reporter(audio_events[-1])
+
+    assert reporter.percent == 100
+    assert context.reported == sorted(context.reported)
+    assert max(context.reported[:-1]) < 100
+
+
+def test_single_stream_without_requested_formats():
+    reporter = ProgressReporter(RecordingContext(), report_interval=0, print_interval=float('inf'))
+    events = list(stream_events(VIDEO))
+    reporter(events[1])
+    assert reporter.percent == 50
+    reporter(events[-1])
+    assert reporter.percent == 100
+
+
+def test_renditions_share_the_task_progress():
+    context = RecordingContext()
+    for position in range(2):
+        reporter = ProgressReporter(RenditionProgress(context, position, 2), [VIDEO, AUDIO], report_interval=0, print_interval=float('inf'))
+        for fmt in (VIDEO, AUDIO):
+            for event in stream_events(fmt):
+                reporter(event)
+        assert context.reported[-1] == 50 * (position + 1)
+
+    assert context.reported == sorted(context.reported)
@@ -0,0 +1,62 @@
+"""Tests for fallbacks and resumes of the multi-connection ranged downloader"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+from media_server import MediaServer, MediaServerConfig, payload  # noqa: E402
+from yt_dlp import YoutubeDL  # noqa: E402
+from yt_dlp_download.downloaders import RangedHttpFD  # noqa: E402
+from yt_dlp_download.downloaders.ranged_http import SEGMENT_SIZE  # noqa: E402
+
+FILE_SIZE = 4 * SEGMENT_SIZE + 12345
+PARAMS = {'quiet': True, 'noprogress': True, 'download_connections': 4, 'retries': 0}
+
+
+class RangeIgnoredAfterProbe(RangedHttpFD):
+    """The server honours the probe's range request, then stops honouring ranges"""
+
+    config = None
+
+    def _probe_size(self, *args):
+        total = super()._probe_size(*args)
+        self.config.honor_range = False
+        return total
+
+
+def download(fd_class, server, filename):
+    with YoutubeDL(PARAMS) as ydl:
+        fd = fd_class(ydl, ydl.params)
+        info = {'url': f'{server.base_url}/video.mp4', 'http_headers': {}}
+        return fd.real_download(str(filename), info)
+
+
+def test_range_ignored_mid_download_falls_back_to_one_connection(tmp_path):
+    config = MediaServerConfig(file_size=FILE_SIZE)
+    filename = tmp_path / 'video.mp4'
+    with MediaServer(config) as server:
+        RangeIgnoredAfterProbe.config = config
+        assert download(RangeIgnoredAfterProbe, server, filename)
+
+    assert filename.read_bytes() == payload(0, FILE_SIZE)
+    assert sorted(os.listdir(tmp_path)) == ['video.mp4']
+
+
+def test_partial_file_without_segment_state_is_resumed(tmp_path):
+    config = MediaServerConfig(file_size=FILE_SIZE)
+    filename = tmp_path / 'video.mp4'
+    # A contiguous prefix, as an interrupted single-stream download leaves it
+    prefix = SEGMENT_SIZE + 1000
+    Path(f'{filename}.part').write_bytes(payload(0, prefix))
+
+    events = []
+    with MediaServer(config) as server, YoutubeDL(PARAMS) as ydl:
+        fd = RangedHttpFD(ydl, ydl.params)
+        fd.add_progress_hook(events.append)
+        assert fd.real_download(str(filename), {'url': f'{server.base_url}/video.mp4', 'http_headers': {}})
+
+    assert filename.read_bytes() == payload(0, FILE_SIZE)
+    assert min(event['downloaded_bytes'] for event in events) > prefix
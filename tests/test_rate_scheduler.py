@@ -0,0 +1,53 @@
+"""Tests for the node-wide request-rate scheduler"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp_download.downloaders.rate_scheduler import LIMIT_EXPIRY_SECONDS, RateScheduler  # noqa: E402
+from yt_dlp_download.utils.state_file import locked_state, read_state  # noqa: E402
+
+URL = 'https://cdn.example.com/video.mp4'
+
+
+class RecordingScheduler(RateScheduler):
+    """Records the waits instead of sleeping"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delays = []
+
+    def _sleep(self, delay):
+        self.delays.append(delay)
+
+
+def age_pushback(scheduler, seconds):
+    with locked_state(scheduler.state_path) as state:
+        host_state = state['hosts']['cdn.example.com']
+        for key in ('last_pushback', 'last_decrease', 'updated'):
+            host_state[key] -= seconds
+
+
+def test_retry_after_outlasts_the_rate_limit(tmp_path, capsys):
+    scheduler = RecordingScheduler(str(tmp_path))
+    scheduler.on_response(URL, 429, '300')
+    # The limit on the rate expires long before the host's Retry-After
+    age_pushback(scheduler, LIMIT_EXPIRY_SECONDS + 10)
+
+    scheduler.before_request(URL)
+    assert scheduler.delays and scheduler.delays[-1] > 300 - LIMIT_EXPIRY_SECONDS - 20
+    assert 'cdn.example.com' in read_state(scheduler.state_path)['hosts']
+
+
+def test_host_is_forgotten_once_limit_and_retry_after_are_over(tmp_path, capsys):
+    scheduler = RecordingScheduler(str(tmp_path))
+    scheduler.on_response(URL, 429, '5')
+    age_pushback(scheduler, LIMIT_EXPIRY_SECONDS + 10)
+    with locked_state(scheduler.state_path) as state:
+        state['hosts']['cdn.example.com']['blocked_until'] = time.time() - 1
+
+    scheduler.before_request(URL)
+    assert scheduler.delays == []
+    assert 'cdn.example.com' not in read_state(scheduler.state_path)['hosts']
@@ -0,0 +1,68 @@
+"""Tests for error classification, retry decisions and the host circuit breaker"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+from media_server import MediaServer, MediaServerConfig  # noqa: E402
+from yt_dlp.networking.exceptions import HTTPError  # noqa: E402
+from yt_dlp_download.downloaders import TaskYoutubeDL  # noqa: E402
+from yt_dlp_download.downloaders.retry_policy import FAILURE_THRESHOLD, CircuitOpenError, classify_error  # noqa: E402
+
+
+def scripted_server(statuses):
+    return MediaServer(MediaServerConfig(file_size=1024, status_script={'video.mp4': statuses}))
+
+
+def task_ydl(state_dir):
+    options = {'state_dir': str(state_dir)}
+    return TaskYoutubeDL({'quiet': True, 'retry_policy': options, 'rate_scheduler': options})
+
+
+def request_error(ydl, server):
+    with pytest.raises(HTTPError) as excinfo:
+        ydl.urlopen(f'{server.base_url}/video.mp4')
+    return excinfo.value
+
+
+def test_scripted_statuses_are_classified(tmp_path):
+    with scripted_server(['404', '403', '500', '429:2']) as server, task_ydl(tmp_path) as ydl:
+        not_found, forbidden, server_error, throttled = (classify_error(request_error(ydl, server)) for _ in range(4))
+
+    assert (not_found['kind'], not_found['host_failure']) == ('permanent', False)
+    # One forbidden video says nothing about the host
+    assert (forbidden['kind'], forbidden['host_failure']) == ('permanent', False)
+    assert (server_error['kind'], server_error['host_failure']) == ('transient', True)
+    assert (throttled['kind'], throttled['retry_after'], throttled['host_failure']) == ('throttled', 2.0, True)
+
+
+def test_sleep_function_stops_permanent_errors_and_waits_out_retry_after(tmp_path, capsys):
+    with scripted_server(['404', '429:2']) as server, task_ydl(tmp_path) as ydl:
+        sleep = ydl.retry_policy.sleep_function('http')
+        error = request_error(ydl, server)
+        with pytest.raises(HTTPError) as excinfo:
+            sleep(0)
+        assert excinfo.value is error
+
+        request_error(ydl, server)
+        assert 2.0 <= sleep(0) <= 2.2
+
+
+def test_circuit_opens_on_server_errors(tmp_path, capsys):
+    with scripted_server(['500*']) as server, task_ydl(tmp_path) as ydl:
+        for _ in range(FAILURE_THRESHOLD):
+            request_error(ydl, server)
+        with pytest.raises(CircuitOpenError):
+            ydl.urlopen(f'{server.base_url}/video.mp4')
+        assert server.config.scripted == FAILURE_THRESHOLD
+
+
+def test_forbidden_videos_do_not_open_the_circuit(tmp_path):
+    with scripted_server(['403*']) as server, task_ydl(tmp_path) as ydl:
+        for _ in range(FAILURE_THRESHOLD * 2):
+            request_error(ydl, server)
+        assert ydl.retry_policy.stats()['opened'] == 0
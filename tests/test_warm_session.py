@@ -0,0 +1,48 @@
+"""Tests for job isolation of warm sessions"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tasks'))
+
+from yt_dlp_download.downloaders import TaskYoutubeDL, warm_sessions  # noqa: E402
+from yt_dlp_download.downloaders.warm_session import get_session_identity  # noqa: E402
+
+PARAMS = {'quiet': True}
+
+
+def bound_ydls(director):
+    return {director.logger._ydl} | {handler._logger._ydl for handler in director.handlers.values()}
+
+
+def test_director_options_are_part_of_the_identity():
+    base = get_session_identity({})
+    for options in ({'compat_opts': {'no-certifi'}}, {'enable_file_urls': True}, {'client_certificate_password': 'secret'}):
+        assert get_session_identity(options) != base
+    assert get_session_identity({'compat_opts': {'a', 'b'}}) == get_session_identity({'compat_opts': {'b', 'a'}})
+
+
+def test_reused_director_reports_to_the_current_job():
+    with warm_sessions.lease():
+        with TaskYoutubeDL(PARAMS) as first:
+            director = first._request_director
+    # An idle session keeps no job's YoutubeDL alive
+    assert bound_ydls(director) == {None}
+
+    with warm_sessions.lease():
+        with TaskYoutubeDL(PARAMS) as second:
+            assert second._request_director is director
+            assert bound_ydls(director) == {second}
+            with TaskYoutubeDL(PARAMS) as nested:
+                assert bound_ydls(director) == {nested}
+            assert bound_ydls(director) == {second}
+
+
+def test_pool_threads_get_their_own_lease():
+    def leased():
+        return warm_sessions.leased()
+
+    with warm_sessions.lease(), ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(leased).result() is False
+        assert executor.submit(warm_sessions.propagate(leased)).result() is True